@@ -39,17 +39,12 @@ def load_history_data_AFTER(self):
 
 
 def _populate_history_table(self, entries):
-    """Método auxiliar para poblar la tabla (UI pura)."""
-    self.table_history.setRowCount(0)
-    
-    for entry in entries:
-        row_position = self.table_history.rowCount()
-        self.table_history.insertRow(row_position)
-        
-        self.table_history.setItem(row_position, 0, QTableWidgetItem(entry.invoice_id))
-        self.table_history.setItem(row_position, 1, QTableWidgetItem(entry.company))
-        self.table_history.setItem(row_position, 2, QTableWidgetItem(entry.customer))
-        # ... más columnas
+    """Método auxiliar para poblar la tabla (UI pura).
+
+    La tabla es un QTableView con HistoryTableModel: un único reset del modelo
+    en lugar de crear un QTableWidgetItem por celda.
+    """
+    self._history_model.set_entries(entries)
 
 
 # ============================================================================
@@ -134,6 +129,12 @@ def apply_history_filters_BEFORE(self):
 
 def apply_history_filters_AFTER(self):
     """Versión DESPUÉS: Separación clara de responsabilidades."""
+    # Combos y buscador llaman a esto en cada cambio: se agrupan en una consulta
+    self._filter_debounce.start()
+
+
+def _do_apply_history_filters(self):
+    """Cuerpo real del filtrado, lanzado por el timeout de `_filter_debounce` (150 ms)."""
     # 1. Construir filtros (UI logic)
     filters = self.ui_logic.build_history_filters_from_ui()
     
@@ -161,14 +162,13 @@ def select_excel_BEFORE(self, path=None):
     
     try:
         # Leer Excel
-        df_factura = pd.read_excel(path, sheet_name="Facturas")
-        df_conceptos = pd.read_excel(path, sheet_name="Conceptos")
+        df_factura, df_conceptos = load_excel_cached(path)
         
         # Validar columnas
-        required_cols = ["NumFactura", "empresa_emisora", "cliente_nombre"]
-        missing_cols = [col for col in required_cols if col not in df_factura.columns]
+        required_cols = pd.Index(["NumFactura", "empresa_emisora", "cliente_nombre"])
+        missing_cols = required_cols.difference(df_factura.columns, sort=False)
         
-        if missing_cols:
+        if len(missing_cols) > 0:
             QMessageBox.critical(
                 self,
                 "Error de Validación",
@@ -181,18 +181,18 @@ def select_excel_BEFORE(self, path=None):
             QMessageBox.warning(self, "Advertencia", "El archivo no contiene facturas")
             return
         
-        # Validar conceptos
-        for idx, row in df_factura.iterrows():
-            invoice_id = str(row["NumFactura"])
-            conceptos = df_conceptos[df_conceptos["NumFactura"] == invoice_id]
-            
-            if len(conceptos) == 0:
-                QMessageBox.warning(
-                    self,
-                    "Advertencia",
-                    f"La factura {invoice_id} no tiene conceptos asociados"
-                )
-                return
+        # Validar conceptos (diferencia de conjuntos en lugar de un filtro por factura)
+        factura_ids = df_factura["NumFactura"].astype(str)
+        concept_ids = df_conceptos["NumFactura"].astype(str)
+        missing = pd.Index(factura_ids).difference(concept_ids)
+        
+        if len(missing) > 0:
+            QMessageBox.warning(
+                self,
+                "Advertencia",
+                f"Facturas sin conceptos asociados: {', '.join(missing)}"
+            )
+            return
         
         # Guardar estado
         self.current_excel_path = path
@@ -220,9 +220,8 @@ def select_excel_AFTER(self, path=None):
         return
     
     try:
-        # 2. Leer Excel (esto podría ir a un servicio también)
-        df_factura = pd.read_excel(path, sheet_name="Facturas")
-        df_conceptos = pd.read_excel(path, sheet_name="Conceptos")
+        # 2. Leer Excel (memorizado por ruta/mtime/tamaño; Calamine si existe)
+        df_factura, df_conceptos = load_excel_cached(path)
         
         # 3. Validar usando el controlador
         is_valid, errors = self.controller.validate_excel_file(
@@ -293,7 +292,7 @@ def update_dashboard_stats_BEFORE(self):
     self.label_success_rate.setText(f"{success_rate:.1f}%")
     
     amount = row[2] or 0
-    self.label_total_amount.setText(f"{amount:,.2f}€".replace(",", "X").replace(".", ",").replace("X", "."))
+    self.label_total_amount.setText(format_currency(amount, "EUR", format="#,##0.00¤", locale=_LOCALE_ES))
 
 
 def update_dashboard_stats_AFTER(self):
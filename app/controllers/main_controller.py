@@ -4,21 +4,37 @@ Separa la lógica de negocio de la interfaz de usuario.
 """
 from __future__ import annotations
 
-from typing import List, Dict, Optional, Tuple, Callable, Any
+import os
+import sqlite3
+from collections import OrderedDict
+from functools import cached_property
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple, Callable, Any
 from datetime import datetime, timedelta
 from decimal import Decimal
-from pathlib import Path
-
-import pandas as pd
 
+from app.core.caching import versioned_cache
 from app.core.logging import get_logger
 from app.core.settings import get_settings
-from app.services.database import get_connection, fetch_all, execute_many, execute
-from app.services.invoice_processing import get_invoice_processing_service
-from app.services.offline_service import get_offline_service
-from app.services.stats import StatsService
+from app.services.database import (
+    HISTORY_FTS_MIN_CHARS,
+    db_datetime,
+    fetch_all,
+    execute_many,
+    execute,
+    history_fts_available,
+    history_fts_query,
+    iter_rows,
+)
+from app.services.excel_cache import excel_cache_key
 from app.models.invoice import InvoiceValidationError, InvoiceProcessingResult
-from app.models.history import HistoryEntry, HistoryFilter, HistoryStats
+from app.models.history import DashboardBundle, HistoryEntry, HistoryFilter, HistoryStats
+
+if TYPE_CHECKING:
+    import pandas as pd
+    
+    from app.services.invoice_processing import InvoiceProcessingService
+    from app.services.offline_service import OfflineQueueService
+    from app.services.stats import StatsService
 
 
 logger = get_logger("controllers.main")
@@ -30,12 +46,27 @@ class MainController:
     Actúa como intermediario entre los servicios y la UI.
     """
     
+    # A partir de este tamaño save_to_history prepara las filas por columnas
+    COLUMNAR_MIN_ROWS = 200
+    # Tamaño de página de load_history_page (carga incremental de la tabla)
+    HISTORY_PAGE_SIZE = 500
+    # Validaciones memorizadas como máximo (las mismas que lecturas de Excel en excel_cache)
+    VALIDATION_CACHE_SIZE = 8
+    
+    # Columnas en el orden de los campos de HistoryEntry; fecha e importe
+    # se convierten en C mediante los conversores registrados en database.py
+    _HISTORY_SELECT = """
+        SELECT id, num_factura, empresa, cliente, estado,
+               fecha_envio AS "fecha_envio [datetime]",
+               COALESCE(importe, 0.0) AS "importe [decimal]",
+               pdf_url, pdf_local_path, excel_path, detalles
+        FROM envios
+        WHERE 1=1
+    """
+    
     def __init__(self):
         """Inicializa el controlador principal."""
         self.settings = get_settings()
-        self.invoice_service = get_invoice_processing_service()
-        self.offline_service = get_offline_service()
-        self.stats_service = StatsService()
         
         # Estado actual
         self.current_excel_path: Optional[str] = None
@@ -44,6 +75,33 @@ class MainController:
         self.df_conceptos: Optional[pd.DataFrame] = None
         self.df_factura_historico: Optional[pd.DataFrame] = None
         self.df_conceptos_historico: Optional[pd.DataFrame] = None
+        
+        # Lecturas memorizadas con @versioned_cache; cada escritura en envios sube la versión
+        self._db_version: int = 0
+        self._query_cache: OrderedDict = OrderedDict()
+        
+        # (df_conceptos, totales por factura) de get_invoice_totals
+        self._totals_by_invoice: Optional[Tuple[pd.DataFrame, Dict[str, Tuple[Decimal, Decimal, Decimal]]]] = None
+        
+        # Resultados de validación por (ruta, mtime, tamaño) del Excel, junto a los
+        # DataFrames validados: solo se reutilizan si se vuelven a pasar esos mismos objetos
+        self._validation_cache: OrderedDict = OrderedDict()
+    
+    # Servicios creados (e importados) en el primer uso para no cargar pandas al arrancar
+    @cached_property
+    def invoice_service(self) -> InvoiceProcessingService:
+        from app.services.invoice_processing import get_invoice_processing_service
+        return get_invoice_processing_service()
+    
+    @cached_property
+    def offline_service(self) -> OfflineQueueService:
+        from app.services.offline_service import get_offline_service
+        return get_offline_service()
+    
+    @cached_property
+    def stats_service(self) -> StatsService:
+        from app.services.stats import StatsService
+        return StatsService()
     
     def validate_excel_file(
         self,
@@ -69,10 +127,28 @@ class MainController:
         self.df_factura = df_factura
         self.df_conceptos = df_conceptos
         
-        # Validar usando el servicio
-        is_valid, errors = self.invoice_service.validate_invoice_data(df_factura, df_conceptos)
+        # Validar usando el servicio (memorizado si el archivo no ha cambiado)
+        try:
+            cache_key = excel_cache_key(path)
+        except OSError:
+            cache_key = None
+        
+        cached = self._validation_cache.get(cache_key) if cache_key else None
+        if cached is not None and cached[0] is df_factura and cached[1] is df_conceptos:
+            _, _, is_valid, errors = cached
+            self._validation_cache.move_to_end(cache_key)
+            logger.debug(f"Validación recuperada de caché: {path}")
+        else:
+            is_valid, errors = self.invoice_service.validate_invoice_data(df_factura, df_conceptos)
+            if cache_key:
+                self._validation_cache[cache_key] = (df_factura, df_conceptos, is_valid, errors)
+                self._validation_cache.move_to_end(cache_key)
+                if len(self._validation_cache) > self.VALIDATION_CACHE_SIZE:
+                    self._validation_cache.popitem(last=False)
         
-        self.validation_errors = errors
+        # Copias: quien modifique la lista devuelta no altera la caché ni el estado
+        errors = list(errors)
+        self.validation_errors = list(errors)
         
         if is_valid:
             logger.info(f"Archivo Excel válido: {len(df_factura)} facturas")
@@ -99,10 +175,14 @@ class MainController:
                 "total": Decimal("0.0")
             }
         
-        base, iva, ret = self.invoice_service.calculate_invoice_totals(
-            self.df_conceptos,
-            invoice_id
-        )
+        # Totales de todas las facturas calculados una vez por DataFrame de conceptos
+        if self._totals_by_invoice is None or self._totals_by_invoice[0] is not self.df_conceptos:
+            self._totals_by_invoice = (
+                self.df_conceptos,
+                self.invoice_service.calculate_totals_by_invoice(self.df_conceptos),
+            )
+        zero = Decimal("0.0")
+        base, iva, ret = self._totals_by_invoice[1].get(invoice_id, (zero, zero, zero))
         
         total = base + iva - ret
         
@@ -132,40 +212,13 @@ class MainController:
             logger.warning("No hay datos para guardar en el historial")
             return 0
         
-        fecha_envio = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        fecha_envio = db_datetime(datetime.now())
         excel_path = excel_path or self.current_excel_path
         
-        rows_to_insert = []
-        
-        for item in summary_data:
-            # Extraer información del item
-            invoice_id = item.get("num_factura", item.get("NumFactura", ""))
-            invoice_id = self.invoice_service.normalize_invoice_id(invoice_id)
-            
-            company = item.get("empresa", item.get("empresa_emisora", ""))
-            customer = item.get("cliente", item.get("cliente_nombre", ""))
-            status = item.get("estado", item.get("status", "DESCONOCIDO"))
-            details = item.get("mensaje", item.get("message", ""))
-            
-            # Extraer URL del PDF
-            pdf_url = self.invoice_service.extract_pdf_url(item)
-            
-            # Parsear importe
-            raw_amount = item.get("importe", item.get("total", 0))
-            amount = float(self.invoice_service.parse_amount(raw_amount))
-            
-            rows_to_insert.append((
-                fecha_envio,
-                invoice_id,
-                company,
-                status,
-                details,
-                pdf_url,
-                excel_path,
-                None,  # pdf_local_path se actualizará después
-                amount,
-                customer
-            ))
+        if len(summary_data) >= self.COLUMNAR_MIN_ROWS and all(isinstance(item, dict) for item in summary_data):
+            rows_to_insert = self._history_rows_columnar(summary_data, fecha_envio, excel_path)
+        else:
+            rows_to_insert = [self._history_row(item, fecha_envio, excel_path) for item in summary_data]
         
         # Insertar en la base de datos
         query = """
@@ -176,10 +229,77 @@ class MainController:
         """
         
         execute_many(query, rows_to_insert)
+        self._bump_db_version()
         
         logger.info(f"Guardados {len(rows_to_insert)} registros en el historial")
         return len(rows_to_insert)
     
+    def _history_row(self, item: Dict[str, Any], fecha_envio: str, excel_path: Optional[str]) -> Tuple:
+        """Convierte un item del resumen en la tupla de inserción de `envios`."""
+        invoice_id = self.invoice_service.normalize_invoice_id(item.get("num_factura", item.get("NumFactura", "")))
+        raw_amount = item.get("importe", item.get("total", 0))
+        return (
+            fecha_envio,
+            invoice_id,
+            item.get("empresa", item.get("empresa_emisora", "")),
+            item.get("estado", item.get("status", "DESCONOCIDO")),
+            item.get("mensaje", item.get("message", "")),
+            self.invoice_service.extract_pdf_url(item),
+            excel_path,
+            None,  # pdf_local_path se actualizará después
+            float(self.invoice_service.parse_amount(raw_amount)),
+            item.get("cliente", item.get("cliente_nombre", "")),
+        )
+    
+    def _history_rows_columnar(
+        self,
+        summary_data: List[Dict[str, Any]],
+        fecha_envio: str,
+        excel_path: Optional[str]
+    ) -> List[Tuple]:
+        """
+        Variante columnar de `_history_row` para lotes grandes y homogéneos.
+        Las claves alternativas se resuelven por columna y los importes se
+        convierten de una vez con `parse_amount_series`.
+        
+        Como en `_history_row`, una clave presente gana aunque su valor sea None
+        o NaN, y los valores se conservan tal cual (sin DataFrame que convierta
+        a float una columna de enteros con huecos).
+        """
+        import pandas as pd
+        
+        count = len(summary_data)
+        
+        def column(*names: str, default: Any = "") -> pd.Series:
+            values = []
+            for item in summary_data:
+                for name in names:
+                    if name in item:
+                        values.append(item[name])
+                        break
+                else:
+                    values.append(default)
+            return pd.Series(values, dtype=object)
+        
+        invoice_ids = self.invoice_service.normalize_invoice_id_series(column("num_factura", "NumFactura"))
+        
+        amounts = self.invoice_service.parse_amount_series(column("importe", "total", default=0))
+        
+        pdf_urls = [self.invoice_service.extract_pdf_url(item) for item in summary_data]
+        
+        return list(zip(
+            [fecha_envio] * count,
+            invoice_ids,
+            column("empresa", "empresa_emisora"),
+            column("estado", "status", default="DESCONOCIDO"),
+            column("mensaje", "message"),
+            pdf_urls,
+            [excel_path] * count,
+            [None] * count,  # pdf_local_path se actualizará después
+            amounts.astype(float),
+            column("cliente", "cliente_nombre"),
+        ))
+    
     def update_pdf_paths_in_history(
         self,
         summary_data: List[Dict[str, Any]],
@@ -195,32 +315,55 @@ class MainController:
         Returns:
             Número de registros actualizados
         """
-        updated = 0
+        # Nombres comparados como los compara el sistema de archivos (y lo hacía glob):
+        # sin distinguir mayúsculas en Windows, tal cual en el resto
+        normcase = os.path.normcase
+        pdf_suffix = normcase(".pdf")
         
+        # Prefijo "{empresa}_{factura}_" buscado para cada item del resumen
+        wanted: Dict[str, Tuple[str, str]] = {}
         for item in summary_data:
             invoice_id = item.get("num_factura", item.get("NumFactura", ""))
             invoice_id = self.invoice_service.normalize_invoice_id(invoice_id)
-            
             company = item.get("empresa", item.get("empresa_emisora", ""))
-            
-            # Buscar archivo PDF en el directorio
-            pdf_pattern = f"{company}_{invoice_id}_*.pdf"
-            pdf_files = list(Path(pdf_dest_dir).glob(pdf_pattern))
-            
-            if pdf_files:
-                pdf_local_path = str(pdf_files[0])
-                
-                # Actualizar en la base de datos
-                query = """
-                    UPDATE envios 
-                    SET pdf_local_path = ?
+            wanted.setdefault(normcase(f"{company}_{invoice_id}_"), (invoice_id, company))
+        
+        # Una sola pasada por el directorio en lugar de un glob por factura
+        found: Dict[Tuple[str, str], str] = {}
+        try:
+            with os.scandir(pdf_dest_dir) as it:
+                for de in it:
+                    name = normcase(de.name)
+                    if not name.endswith(pdf_suffix) or not de.is_file():
+                        continue
+                    pos = name.find("_")
+                    while pos != -1:
+                        key = wanted.get(name[:pos + 1])
+                        if key is not None and key not in found:
+                            found[key] = de.path
+                        pos = name.find("_", pos + 1)
+        except OSError as e:
+            logger.warning(f"No se pudo leer el directorio de PDFs {pdf_dest_dir}: {e}")
+            return 0
+        
+        rows = [(path, invoice_id, company) for (invoice_id, company), path in found.items()]
+        
+        if rows:
+            # Actualizar solo el envío más reciente de cada factura, en una única transacción
+            query = """
+                UPDATE envios 
+                SET pdf_local_path = ?
+                WHERE id = (
+                    SELECT id FROM envios
                     WHERE num_factura = ? AND empresa = ?
                     ORDER BY fecha_envio DESC
                     LIMIT 1
-                """
-                
-                execute(query, (pdf_local_path, invoice_id, company))
-                updated += 1
+                )
+            """
+            execute_many(query, rows)
+            self._bump_db_version()
+        
+        updated = len(rows)
         
         logger.info(f"Actualizadas {updated} rutas de PDF en el historial")
         return updated
@@ -238,13 +381,84 @@ class MainController:
         Returns:
             Lista de entradas del historial
         """
-        query = """
-            SELECT id, num_factura, empresa, cliente, estado, fecha_envio, 
-                   importe, pdf_url, pdf_local_path, excel_path, detalles
-            FROM envios
-            WHERE 1=1
+        where, params = self._history_where(filters)
+        query = self._HISTORY_SELECT + where + " ORDER BY fecha_envio DESC"
+        entries = self._fetch_history_entries(query, params)
+        
+        logger.debug(f"Cargadas {len(entries)} entradas del historial")
+        return entries
+    
+    def load_history_matching(
+        self,
+        where: str,
+        params: List[Any],
+        limit: Optional[int] = None,
+        cursor_date: Optional[datetime] = None,
+        cursor_id: Optional[int] = None
+    ) -> List[HistoryEntry]:
         """
-        params = []
+        Carga el historial con condiciones WHERE construidas por la vista.
+        
+        Con un cursor devuelve la página siguiente a esa entrada, por clave
+        (fecha_envio, id) en lugar de OFFSET: cada página cuesta lo mismo
+        independientemente de su posición.
+        
+        Args:
+            where: Condiciones SQL encadenadas con " AND ...", con marcadores ?
+            params: Parámetros de las condiciones
+            limit: Número máximo de entradas, None para todas
+            cursor_date: Fecha de la última entrada de la página anterior (None para la primera)
+            cursor_id: ID de esa última entrada; desempata envíos con la misma fecha
+            
+        Returns:
+            Lista de entradas del historial, más recientes primero
+        """
+        params = list(params)
+        if cursor_date is not None:
+            if cursor_id is not None:
+                # Comparación de tuplas: SQLite la resuelve como un rango sobre el índice (un OR no)
+                where += " AND (fecha_envio, id) < (?, ?)"
+                params.extend([db_datetime(cursor_date), cursor_id])
+            else:
+                where += " AND fecha_envio < ?"
+                params.append(db_datetime(cursor_date))
+        
+        # idx_fecha_envio incluye el rowid (id), así que el orden sale del índice sin ordenar
+        query = self._HISTORY_SELECT + where + " ORDER BY fecha_envio DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return self._fetch_history_entries(query, params)
+    
+    def load_history_page(
+        self,
+        filters: Optional[HistoryFilter] = None,
+        cursor_date: Optional[datetime] = None,
+        limit: int = HISTORY_PAGE_SIZE,
+        cursor_id: Optional[int] = None
+    ) -> List[HistoryEntry]:
+        """
+        Carga una página del historial, de la más reciente a la más antigua.
+        
+        Usa paginación por clave (fecha_envio, id) con `load_history_matching`.
+        
+        Args:
+            filters: Filtros a aplicar
+            cursor_date: Fecha de la última entrada de la página anterior (None para la primera)
+            limit: Número máximo de entradas
+            cursor_id: ID de esa última entrada; desempata envíos con la misma fecha
+            
+        Returns:
+            Lista de entradas de la página
+        """
+        where, params = self._history_where(filters)
+        return self.load_history_matching(where, params, limit, cursor_date, cursor_id)
+    
+    @staticmethod
+    def _history_where(filters: Optional[HistoryFilter]) -> Tuple[str, List[Any]]:
+        """Construye las condiciones WHERE (y sus parámetros) de los filtros del historial."""
+        query = ""
+        params: List[Any] = []
         
         if filters:
             if filters.company:
@@ -261,41 +475,51 @@ class MainController:
             
             if filters.date_from:
                 query += " AND fecha_envio >= ?"
-                params.append(filters.date_from.strftime("%Y-%m-%d %H:%M:%S"))
+                params.append(db_datetime(filters.date_from))
             
             if filters.date_to:
                 query += " AND fecha_envio <= ?"
-                params.append(filters.date_to.strftime("%Y-%m-%d %H:%M:%S"))
+                params.append(db_datetime(filters.date_to))
             
             if filters.search_text:
-                query += " AND (num_factura LIKE ? OR cliente LIKE ? OR empresa LIKE ?)"
-                search_pattern = f"%{filters.search_text}%"
-                params.extend([search_pattern, search_pattern, search_pattern])
-        
-        query += " ORDER BY fecha_envio DESC"
-        
-        rows = fetch_all(query, params)
-        
-        entries = []
-        for row in rows:
-            entry = HistoryEntry(
-                id=row[0],
-                invoice_id=row[1],
-                company=row[2],
-                customer=row[3],
-                status=row[4],
-                send_date=datetime.strptime(row[5], "%Y-%m-%d %H:%M:%S"),
-                amount=Decimal(str(row[6])),
-                pdf_url=row[7],
-                pdf_local_path=row[8],
-                excel_path=row[9],
-                details=row[10]
-            )
-            entries.append(entry)
-        
-        logger.debug(f"Cargadas {len(entries)} entradas del historial")
-        return entries
+                # Índice de trigramas si existe; por debajo de 3 caracteres solo sirve LIKE
+                if len(filters.search_text) >= HISTORY_FTS_MIN_CHARS and history_fts_available():
+                    query += " AND id IN (SELECT rowid FROM envios_fts WHERE envios_fts MATCH ?)"
+                    params.append(history_fts_query(filters.search_text))
+                else:
+                    query += " AND (num_factura LIKE ? OR cliente LIKE ? OR empresa LIKE ?)"
+                    search_pattern = f"%{filters.search_text}%"
+                    params.extend([search_pattern, search_pattern, search_pattern])
+        
+        return query, params
     
+    @staticmethod
+    def _fetch_history_entries(query: str, params: List[Any]) -> List[HistoryEntry]:
+        # empresa/cliente/estado tienen baja cardinalidad: se comparte un único
+        # objeto str por valor distinto en lugar de uno por fila
+        pool: Dict[Any, Any] = {}
+        _i = pool.setdefault
+        return [
+            HistoryEntry(row[0], row[1], _i(row[2], row[2]), _i(row[3], row[3]), _i(row[4], row[4]), *row[5:])
+            for row in iter_rows(query, params, detect_types=sqlite3.PARSE_COLNAMES)
+        ]
+    
+    def _bump_db_version(self) -> None:
+        """Invalida las lecturas memorizadas tras modificar envios."""
+        self._db_version += 1
+        self._query_cache.clear()
+    
+    @property
+    def data_version(self) -> int:
+        """Versión de los datos de envios; cambia con cada escritura conocida."""
+        return self._db_version
+    
+    def invalidate_caches(self) -> None:
+        """Descarta las lecturas memorizadas tras una escritura hecha fuera del controlador."""
+        self._bump_db_version()
+    
+    # Las estadísticas dependen de la hora (periodo relativo a hoy): caducan antes
+    @versioned_cache(ttl=60.0)
     def get_history_stats(
         self,
         company: Optional[str] = None,
@@ -312,12 +536,7 @@ class MainController:
             Estadísticas del historial
         """
         query = """
-            SELECT 
-                COUNT(*) as total,
-                SUM(CASE WHEN estado = 'OK' THEN 1 ELSE 0 END) as success,
-                SUM(CASE WHEN estado = 'ERROR' THEN 1 ELSE 0 END) as failed,
-                SUM(CASE WHEN estado = 'PENDIENTE' THEN 1 ELSE 0 END) as pending,
-                SUM(importe) as total_amount
+            SELECT estado, COUNT(*), SUM(importe)
             FROM envios
             WHERE 1=1
         """
@@ -328,22 +547,48 @@ class MainController:
             params.append(company)
         
         if period_days:
-            date_from = (datetime.now() - timedelta(days=period_days)).strftime("%Y-%m-%d %H:%M:%S")
+            date_from = datetime.now() - timedelta(days=period_days)
             query += " AND fecha_envio >= ?"
-            params.append(date_from)
+            params.append(db_datetime(date_from))
+        
+        query += " GROUP BY estado"
         
-        row = fetch_all(query, params)[0]
+        counts: Dict[Optional[str], int] = {}
+        total_amount = 0.0
+        for estado, count, amount in fetch_all(query, params):
+            counts[estado] = count
+            total_amount += amount or 0.0
         
         stats = HistoryStats(
-            total_invoices=row[0] or 0,
-            successful_invoices=row[1] or 0,
-            failed_invoices=row[2] or 0,
-            pending_invoices=row[3] or 0,
-            total_amount=Decimal(str(row[4] or 0))
+            total_invoices=sum(counts.values()),
+            successful_invoices=counts.get("OK", 0),
+            failed_invoices=counts.get("ERROR", 0),
+            pending_invoices=counts.get("PENDIENTE", 0),
+            total_amount=Decimal(str(total_amount))
         )
         
         return stats
     
+    # No depende de la hora: solo caduca cuando cambia la versión de los datos
+    @versioned_cache(ttl=float("inf"))
+    def _get_filter_options(self) -> Dict[str, List[str]]:
+        """
+        Obtiene empresas y clientes distintos en una sola consulta (cacheada).
+        
+        Returns:
+            Diccionario con las listas "companies" y "customers"
+        """
+        query = """
+            SELECT 'e', empresa FROM envios WHERE empresa IS NOT NULL GROUP BY empresa
+            UNION ALL
+            SELECT 'c', cliente FROM envios WHERE cliente IS NOT NULL GROUP BY cliente
+            ORDER BY 1, 2
+        """
+        options: Dict[str, List[str]] = {"companies": [], "customers": []}
+        for tag, value in fetch_all(query):
+            options["companies" if tag == "e" else "customers"].append(value)
+        return options
+    
     def get_companies_list(self) -> List[str]:
         """
         Obtiene la lista de empresas emisoras únicas del historial.
@@ -351,9 +596,7 @@ class MainController:
         Returns:
             Lista de nombres de empresas
         """
-        query = "SELECT DISTINCT empresa FROM envios WHERE empresa IS NOT NULL ORDER BY empresa"
-        rows = fetch_all(query)
-        return [row[0] for row in rows]
+        return list(self._get_filter_options()["companies"])
     
     def get_customers_list(self) -> List[str]:
         """
@@ -362,14 +605,43 @@ class MainController:
         Returns:
             Lista de nombres de clientes
         """
-        query = "SELECT DISTINCT cliente FROM envios WHERE cliente IS NOT NULL ORDER BY cliente"
-        rows = fetch_all(query)
-        return [row[0] for row in rows]
+        return list(self._get_filter_options()["customers"])
+    
+    def get_dashboard_bundle(
+        self,
+        filters: Optional[HistoryFilter] = None,
+        company: Optional[str] = None,
+        period_days: Optional[int] = None,
+        with_entries: bool = True
+    ) -> DashboardBundle:
+        """
+        Reúne en una llamada todo lo que necesita un refresco completo del panel.
+        
+        Empresas y clientes salen de una única consulta y las estadísticas de una
+        agregación por estado; ambas quedan memorizadas hasta la próxima escritura.
+        
+        Args:
+            filters: Filtros del historial
+            company: Empresa de las estadísticas del dashboard
+            period_days: Últimos N días de las estadísticas del dashboard
+            with_entries: False si la vista carga el historial por páginas
+            
+        Returns:
+            Entradas, estadísticas y opciones de filtro
+        """
+        options = self._get_filter_options()
+        return DashboardBundle(
+            entries=self.load_history(filters) if with_entries else [],
+            stats=self.get_history_stats(company, period_days),
+            companies=list(options["companies"]),
+            customers=list(options["customers"]),
+        )
     
     def clear_history(self) -> None:
         """Limpia todo el historial de envíos."""
         from app.services.database import clear_history
         clear_history()
+        self._bump_db_version()
         logger.info("Historial limpiado completamente")
     
     def process_offline_queue(
@@ -394,6 +666,8 @@ class MainController:
         processed = 0
         success = 0
         failed = 0
+        # Los enviados se marcan juntos al final: una sola transacción para todo el lote
+        sent_ids: List[int] = []
         
         for item in pending_items:
             if progress_callback:
@@ -403,7 +677,7 @@ class MainController:
             # Por ahora solo simulamos el procesamiento
             try:
                 # TODO: Implementar lógica de reenvío
-                self.offline_service.mark_as_sent(item.id)
+                sent_ids.append(item.id)
                 success += 1
             except Exception as e:
                 logger.error(f"Error procesando item {item.id}: {e}")
@@ -412,6 +686,8 @@ class MainController:
             
             processed += 1
         
+        self.offline_service.mark_many_as_sent(sent_ids)
+        
         logger.info(f"Cola offline procesada: {success} éxitos, {failed} fallos")
         
         return {
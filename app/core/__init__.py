@@ -2,5 +2,5 @@
 Componentes núcleo compartidos (recursos, configuración global, logging).
 """
 
-__all__ = ["resources", "settings", "logging"]
+__all__ = ["resources", "settings", "logging", "caching"]
 
@@ -0,0 +1,55 @@
+"""
+Caché de resultados de lectura invalidada por versión de los datos.
+"""
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def versioned_cache(maxsize: int = 64, ttl: float = 300.0) -> Callable[[F], F]:
+    """
+    Memoriza un método de solo lectura por (nombre, argumentos, versión de datos).
+
+    La instancia debe exponer `_db_version` (entero que se incrementa tras cada
+    escritura) y `_query_cache` (OrderedDict compartido por los métodos decorados).
+    Las entradas caducan además a los `ttl` segundos, para consultas que
+    dependen de la hora actual; se descartan las menos usadas por encima de `maxsize`.
+
+    Args:
+        maxsize: Número máximo de resultados guardados por instancia
+        ttl: Segundos de validez de cada resultado
+
+    Returns:
+        Decorador de métodos
+    """
+    def decorator(fn: F) -> F:
+        name = fn.__name__
+
+        @wraps(fn)
+        def wrapper(self, *args: Any, **kwargs: Any) -> Any:
+            cache: OrderedDict = self._query_cache
+            key = (name, args, tuple(sorted(kwargs.items())), self._db_version)
+            now = time.monotonic()
+            hit = cache.get(key)
+            if hit is not None and now - hit[1] < ttl:
+                cache.move_to_end(key)
+                return hit[0]
+
+            result = fn(self, *args, **kwargs)
+            cache[key] = (result, now)
+            cache.move_to_end(key)
+            if len(cache) > maxsize:
+                cache.popitem(last=False)
+            return result
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+__all__ = ["versioned_cache"]
@@ -3,9 +3,13 @@ Inicialización centralizada de logging (texto y JSON opcional).
 """
 from __future__ import annotations
 
+import atexit
 import json
 import logging
 import os
+import queue
+import sys
+import threading
 from logging import Logger
 from pathlib import Path
 from typing import Any, Dict, Optional
@@ -13,31 +17,122 @@ from typing import Any, Dict, Optional
 from .resources import resource_path
 
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+
+def _dumps(data: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=str)
+        except TypeError:
+            # Claves no str o enteros de más de 64 bits: json sí los serializa
+            pass
+    return json.dumps(data, ensure_ascii=False, default=str).encode("utf-8")
+
+
+# Atributos que todo LogRecord trae de serie, y los que añaden los formatters
+_BASE_RECORD_ATTRS = frozenset(logging.LogRecord("", logging.INFO, "", 0, "", (), None).__dict__)
+_FORMATTER_ATTRS = ("message", "asctime")
+_STANDARD_RECORD_ATTRS = _BASE_RECORD_ATTRS | frozenset(_FORMATTER_ATTRS)
+
+
+_STOP = object()
+
+
 class JsonLinesHandler(logging.Handler):
     """
     Escribe eventos en un archivo .jsonl para análisis posterior.
+    `emit` solo encola el evento; un hilo de fondo los escribe por lotes, de modo
+    que el hilo de la UI no espera al disco. Si la cola se llena, se descartan.
     """
 
+    QUEUE_SIZE = 10000
+    _EMIT_FIELDS = ("name", "levelname", "pathname", "lineno", "funcName", "created", "msecs", "thread")
+
     def __init__(self, path: Path) -> None:
         super().__init__()
         self._path = path
         self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = self._path.open("ab", buffering=1 << 16)
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self._stopped = False
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._drain, name="JsonLinesHandler", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
 
     def emit(self, record: logging.LogRecord) -> None:
+        if self._stopped:
+            return
         try:
-            log_entry = self._serialize(record)
-            with self._path.open("a", encoding="utf-8") as f:
-                f.write(json.dumps(log_entry, ensure_ascii=False) + "\n")
+            self._queue.put_nowait(self._serialize(record))
+        except queue.Full:
+            self.dropped += 1
         except Exception:
             self.handleError(record)
 
+    def _drain(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(entry is _STOP for entry in batch)
+            try:
+                # Cada evento por separado: uno que no se serializa no tira el lote
+                lines = []
+                for entry in batch:
+                    if entry is _STOP:
+                        continue
+                    try:
+                        lines.append(_dumps(entry))
+                    except Exception as e:
+                        sys.stderr.write(f"JsonLinesHandler: evento descartado: {e}\n")
+                if lines:
+                    self._fh.write(b"\n".join(lines) + b"\n")
+                    self._fh.flush()
+            except Exception as e:
+                sys.stderr.write(f"JsonLinesHandler: no se pudo escribir {self._path}: {e}\n")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self) -> None:
+        """Espera a que el hilo de fondo haya escrito todo lo encolado."""
+        if self._thread.is_alive():
+            self._queue.join()
+
+    def close(self) -> None:
+        self.acquire()
+        try:
+            if not self._stopped:
+                self._stopped = True
+                atexit.unregister(self.close)
+                if self._thread.is_alive():
+                    self._queue.put(_STOP)
+                    self._thread.join()
+                self._fh.close()
+        finally:
+            self.release()
+        super().close()
+
     def _serialize(self, record: logging.LogRecord) -> Dict[str, Any]:
-        data = record.__dict__.copy()
-        data["level"] = record.levelname
+        data = {k: getattr(record, k) for k in self._EMIT_FIELDS}
         data["message"] = record.getMessage()
-        for k in list(data.keys()):
-            if k.startswith("_") or k in {"args", "exc_info", "exc_text", "stack_info"}:
-                data.pop(k, None)
+        data["level"] = record.levelname
+        # Los campos pasados con `extra=` solo se buscan si el registro trae más atributos de los estándar
+        attrs = record.__dict__
+        if len(attrs) - sum(k in attrs for k in _FORMATTER_ATTRS) > len(_BASE_RECORD_ATTRS):
+            for k in attrs.keys() - _STANDARD_RECORD_ATTRS:
+                if not k.startswith("_"):
+                    data[k] = attrs[k]
         return data
 
 
@@ -8,23 +8,36 @@ import sys
 from functools import lru_cache
 
 
-@lru_cache(maxsize=128)
+def _compute_base() -> str:
+    if getattr(sys, "frozen", False):
+        return os.path.dirname(sys.executable)
+    # __file__ apunta a app/core/, necesitamos subir al raíz del proyecto
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# Directorio base (junto al ejecutable o raíz del proyecto) y, en binarios
+# PyInstaller, el directorio de recursos empaquetados; se calculan una sola vez
+_BASE_DIR = _compute_base()
+_BUNDLE_DIR = getattr(sys, "_MEIPASS", None) if getattr(sys, "frozen", False) else None
+
+
 def resource_path(relative_path: str) -> str:
     """
     Devuelve la ruta absoluta del recurso tanto en desarrollo como en binarios.
-    Usa caché para evitar recomputar rutas con frecuencia durante el ciclo de vida.
+    En binarios, un fichero junto al ejecutable tiene prioridad sobre el empaquetado.
     """
-    if getattr(sys, "frozen", False):
-        exec_dir = os.path.dirname(sys.executable)
-        candidate = os.path.join(exec_dir, relative_path)
-        if os.path.exists(candidate) or not hasattr(sys, "_MEIPASS"):
-            return candidate
-        return os.path.join(sys._MEIPASS, relative_path)  # type: ignore[attr-defined]
+    if _BUNDLE_DIR is None:
+        return os.path.join(_BASE_DIR, relative_path)
+    return _frozen_resource_path(relative_path)
 
-    base_path = os.path.abspath(os.path.dirname(__file__))
-    # __file__ apunta a app/core/, necesitamos subir al raíz del proyecto
-    project_root = os.path.dirname(os.path.dirname(base_path))
-    return os.path.join(project_root, relative_path)
+
+@lru_cache(maxsize=128)
+def _frozen_resource_path(relative_path: str) -> str:
+    # Solo aquí hace falta comprobar el disco; el resultado se memoriza por ruta
+    candidate = os.path.join(_BASE_DIR, relative_path)
+    if os.path.exists(candidate):
+        return candidate
+    return os.path.join(_BUNDLE_DIR, relative_path)
 
 
 # Paleta de colores y constantes visuales (mantiene la estética actual)
@@ -4,16 +4,38 @@ from __future__ import annotations
 Wrapper ligero sobre QSettings para centralizar claves y valores por defecto.
 """
 
-from typing import Any, Optional
+import atexit
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Optional, Set
 
-from PySide6.QtCore import QSettings
+from PySide6.QtCore import QCoreApplication, QSettings, QTimer
+
+
+# Marca en la caché para claves que no existen en QSettings
+_MISSING = object()
+
+
+def _on_app_thread() -> bool:
+    # La QApplication vive en el hilo principal; se compara con threading para no
+    # crear un QThread adoptado (QThread.currentThread()) en cada hilo de trabajo
+    return threading.current_thread() is threading.main_thread()
 
 
 class AppSettings:
     """
     Pequeño helper para acceder a QSettings con claves centralizadas.
+    Guarda en memoria los valores ya leídos y omite escrituras que no cambian nada.
+    Las escrituras se acumulan y se vuelcan juntas a QSettings tras `FLUSH_DELAY_MS`
+    (o en `sync()` / al cerrar la aplicación).
+    
+    La instancia es única por proceso y puede crearse antes que la QApplication o
+    usarse desde hilos de trabajo: el temporizador se crea al primer cambio, siempre
+    en el hilo de la aplicación, y el estado compartido se protege con un cerrojo.
     """
 
+    FLUSH_DELAY_MS = 500
+
     ORGANIZATION = "FactuNabo"
     APPLICATION = "FactuNaboApp"
 
@@ -26,28 +48,83 @@ class AppSettings:
     KEY_API_USER = "api/user"
     KEY_API_TIMEOUT = "api/timeout"
     KEY_TEMPLATE_URL = "templates/update_url"
+    KEY_TEMPLATE_ETAG = "templates/etag"
+    KEY_TEMPLATE_ETAG_CHECKSUM = "templates/etag_sha256"
 
     def __init__(self) -> None:
         self._settings = QSettings(self.ORGANIZATION, self.APPLICATION)
+        self._cache: Dict[str, Any] = {}
+        self._dirty: Set[str] = set()
+        self._lock = threading.RLock()
+        # Se crea en el hilo de la aplicación con el primer cambio (ver _schedule_flush)
+        self._flush_timer: Optional[QTimer] = None
+        # Respaldo si no llega a emitirse aboutToQuit (p.ej. sin QApplication)
+        atexit.register(self._flush)
 
     def value(self, key: str, default: Optional[Any] = None) -> Any:
-        return self._settings.value(key, default)
+        with self._lock:
+            cached = self._cache.get(key, _MISSING)
+            if cached is _MISSING and key not in self._cache:
+                cached = self._settings.value(key) if self._settings.contains(key) else _MISSING
+                self._cache[key] = cached
+        return default if cached is _MISSING else cached
 
     def set_value(self, key: str, value: Any) -> None:
-        self._settings.setValue(key, value)
+        with self._lock:
+            if key in self._cache and self._cache[key] == value:
+                return
+            self._cache[key] = value
+            self._dirty.add(key)
+        self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        app = QCoreApplication.instance()
+        if app is None:
+            # Sin bucle de eventos no hay temporizador: se vuelca en sync() o al salir
+            return
+        if not _on_app_thread():
+            # Un QTimer solo se arranca desde su hilo: se reprograma en el de la aplicación
+            QTimer.singleShot(0, app, self._schedule_flush)
+            return
+        if self._flush_timer is None:
+            self._flush_timer = QTimer()
+            self._flush_timer.setSingleShot(True)
+            self._flush_timer.setInterval(self.FLUSH_DELAY_MS)
+            self._flush_timer.timeout.connect(self._flush)
+            app.aboutToQuit.connect(self.sync)
+        # Reiniciar el temporizador agrupa ráfagas de cambios en una sola escritura
+        self._flush_timer.start()
+
+    def _flush(self) -> None:
+        """Escribe en QSettings los valores modificados desde el último volcado."""
+        timer = self._flush_timer
+        if timer is not None and _on_app_thread():
+            timer.stop()
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            for key in dirty:
+                self._settings.setValue(key, self._cache[key])
 
     # Compatibilidad con código existente (nomenclatura Qt)
     def setValue(self, key: str, value: Any) -> None:
         self.set_value(key, value)
 
     def remove(self, key: str) -> None:
-        self._settings.remove(key)
+        with self._lock:
+            self._flush()
+            self._settings.remove(key)
+            # `key` puede ser un grupo: se olvida todo lo leído
+            self._cache.clear()
 
     def sync(self) -> None:
-        self._settings.sync()
+        with self._lock:
+            self._flush()
+            self._settings.sync()
 
 
+@lru_cache(maxsize=1)
 def get_settings() -> AppSettings:
+    """Devuelve la instancia única de AppSettings del proceso."""
     return AppSettings()
 
 
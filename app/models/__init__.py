@@ -10,7 +10,7 @@ from app.models.invoice import (
     InvoiceProcessingResult,
 )
 from app.models.user import User, UserSession
-from app.models.history import HistoryEntry, HistoryFilter, HistoryStats
+from app.models.history import HistoryEntry, HistoryFilter, HistoryStats, DashboardBundle
 from app.models.offline_queue import OfflineQueueItem
 
 __all__ = [
@@ -24,5 +24,6 @@ __all__ = [
     "HistoryEntry",
     "HistoryFilter",
     "HistoryStats",
+    "DashboardBundle",
     "OfflineQueueItem",
 ]
@@ -5,13 +5,17 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from decimal import Decimal
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class HistoryEntry:
-    """Representa una entrada en el historial de envíos."""
+    """
+    Representa una entrada en el historial de envíos.
+    
+    Se crea una por fila del historial: con slots no lleva __dict__ por instancia.
+    """
     
     id: Optional[int]
     invoice_id: str
@@ -41,7 +45,7 @@ class HistoryEntry:
         return self.status == "PENDIENTE"
 
 
-@dataclass
+@dataclass(slots=True)
 class HistoryFilter:
     """Filtros para consultar el historial."""
     
@@ -53,7 +57,7 @@ class HistoryFilter:
     search_text: Optional[str] = None
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class HistoryStats:
     """Estadísticas del historial de envíos."""
     
@@ -71,4 +75,14 @@ class HistoryStats:
         return (self.successful_invoices / self.total_invoices) * 100
 
 
-__all__ = ["HistoryEntry", "HistoryFilter", "HistoryStats"]
+@dataclass(frozen=True, slots=True)
+class DashboardBundle:
+    """Datos de un refresco completo del panel: historial, estadísticas y opciones de filtro."""
+    
+    entries: List[HistoryEntry]
+    stats: HistoryStats
+    companies: List[str]
+    customers: List[str]
+
+
+__all__ = ["HistoryEntry", "HistoryFilter", "HistoryStats", "DashboardBundle"]
@@ -5,12 +5,33 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Optional, Tuple
 from decimal import Decimal
 
+_HUNDRED = Decimal("100")
+_ZERO = Decimal("0")
 
-@dataclass(frozen=True)
-class InvoiceLine:
+
+class _CachedTotals:
+    """
+    Base con un slot para importes calculados una vez.
+    Al no ser un campo del dataclass, no aparece en fields(), asdict() ni en el
+    constructor; sin __dict__ no cabe cached_property, de ahí el slot propio.
+    """
+    
+    __slots__ = ("_cache",)
+    
+    def _cached(self) -> Optional[Tuple[Decimal, Decimal, Decimal, Decimal]]:
+        # El slot está vacío hasta el primer cálculo
+        return getattr(self, "_cache", None)
+    
+    def _store(self, values: Tuple[Decimal, Decimal, Decimal, Decimal]) -> None:
+        # Las subclases son frozen: se escribe el slot saltándose su __setattr__
+        object.__setattr__(self, "_cache", values)
+
+
+@dataclass(frozen=True, slots=True)
+class InvoiceLine(_CachedTotals):
     """Representa una línea de concepto en una factura."""
     
     description: str
@@ -19,28 +40,40 @@ class InvoiceLine:
     tax_rate: Decimal
     retention_rate: Decimal = Decimal("0.0")
     
+    @property
+    def _amounts(self) -> Tuple[Decimal, Decimal, Decimal, Decimal]:
+        # Instancia inmutable: (subtotal, IVA, retención, total) se calculan una sola vez
+        amounts = self._cached()
+        if amounts is None:
+            subtotal = self.quantity * self.unit_price
+            tax = subtotal * (self.tax_rate / _HUNDRED)
+            retention = subtotal * (self.retention_rate / _HUNDRED)
+            amounts = (subtotal, tax, retention, subtotal + tax - retention)
+            self._store(amounts)
+        return amounts
+    
     @property
     def subtotal(self) -> Decimal:
         """Calcula el subtotal sin impuestos."""
-        return self.quantity * self.unit_price
+        return self._amounts[0]
     
     @property
     def tax_amount(self) -> Decimal:
         """Calcula el importe del IVA."""
-        return self.subtotal * (self.tax_rate / Decimal("100"))
+        return self._amounts[1]
     
     @property
     def retention_amount(self) -> Decimal:
         """Calcula el importe de la retención."""
-        return self.subtotal * (self.retention_rate / Decimal("100"))
+        return self._amounts[2]
     
     @property
     def total(self) -> Decimal:
         """Calcula el total de la línea."""
-        return self.subtotal + self.tax_amount - self.retention_amount
+        return self._amounts[3]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Customer:
     """Representa un cliente de una factura."""
     
@@ -53,40 +86,61 @@ class Customer:
     email: Optional[str] = None
 
 
-@dataclass(frozen=True)
-class Invoice:
+@dataclass(frozen=True, slots=True)
+class Invoice(_CachedTotals):
     """Representa una factura completa."""
     
     invoice_id: str
     issuer_company: str
     customer: Customer
     issue_date: date
-    lines: List[InvoiceLine]
+    # Se admite cualquier secuencia; se guarda como tupla para que la factura sea
+    # inmutable de verdad (y hashable) y los totales cacheados no queden obsoletos
+    lines: Tuple[InvoiceLine, ...]
     payment_method: str = "TRANSFERENCIA"
     exercise: Optional[str] = None
     
+    def __post_init__(self) -> None:
+        if not isinstance(self.lines, tuple):
+            object.__setattr__(self, "lines", tuple(self.lines))
+    
+    @property
+    def _totals(self) -> Tuple[Decimal, Decimal, Decimal, Decimal]:
+        # Una sola pasada por las líneas: (base, IVA, retención, total) se calculan una vez
+        totals = self._cached()
+        if totals is None:
+            subtotal = tax = retention = _ZERO
+            for line in self.lines:
+                line_subtotal, line_tax, line_retention, _ = line._amounts
+                subtotal += line_subtotal
+                tax += line_tax
+                retention += line_retention
+            totals = (subtotal, tax, retention, subtotal + tax - retention)
+            self._store(totals)
+        return totals
+    
     @property
     def subtotal(self) -> Decimal:
         """Calcula la base imponible total."""
-        return sum(line.subtotal for line in self.lines)
+        return self._totals[0]
     
     @property
     def total_tax(self) -> Decimal:
         """Calcula el IVA total."""
-        return sum(line.tax_amount for line in self.lines)
+        return self._totals[1]
     
     @property
     def total_retention(self) -> Decimal:
         """Calcula la retención total."""
-        return sum(line.retention_amount for line in self.lines)
+        return self._totals[2]
     
     @property
     def total_amount(self) -> Decimal:
         """Calcula el importe total de la factura."""
-        return self.subtotal + self.total_tax - self.total_retention
+        return self._totals[3]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class InvoiceValidationError:
     """Representa un error de validación en una factura."""
     
@@ -96,7 +150,7 @@ class InvoiceValidationError:
     invoice_id: Optional[str] = None
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class InvoiceProcessingResult:
     """Resultado del procesamiento de una factura."""
     
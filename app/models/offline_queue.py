@@ -5,15 +5,16 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Union
 
 
-@dataclass
+@dataclass(slots=True)
 class OfflineQueueItem:
     """Representa un elemento en la cola de envíos offline."""
     
     id: Optional[int]
-    xml_content: bytes
+    # XML tal cual llega (bytes de SQLite o un memoryview del llamador), sin copiarlo
+    xml_content: Union[bytes, memoryview]
     invoice_id: str
     company: str
     exercise: str
@@ -8,7 +8,7 @@ from datetime import datetime
 from typing import Optional
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class User:
     """Representa un usuario del sistema."""
     
@@ -23,7 +23,7 @@ class User:
         return self.password_hash == password_hash
 
 
-@dataclass
+@dataclass(slots=True)
 class UserSession:
     """Representa una sesión de usuario activa."""
     
@@ -3,150 +3,473 @@ Servicios de acceso a la base de datos SQLite utilizados por la aplicación.
 """
 from __future__ import annotations
 
+import atexit
 import sqlite3
+import threading
 from contextlib import contextmanager
-from typing import Iterable, Optional, Sequence, Tuple, Iterator, Any
+from itertools import islice
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Iterator, Any
 
-from app.core.resources import DB_PATH
+# DB_PATH se lee de `resources` en cada llamada: una sola fuente de verdad para la ruta
+from app.core import resources
 from app.core.logging import get_logger
 
 
 logger = get_logger("services.database")
 
 
+# Conversores para columnas anotadas en la consulta (p.ej. `fecha_envio AS "fecha_envio [datetime]"`)
+# cuando la conexión se abre con detect_types=sqlite3.PARSE_COLNAMES.
+sqlite3.register_converter("datetime", lambda raw: datetime.fromisoformat(raw.decode()))
+sqlite3.register_converter("decimal", lambda raw: Decimal(raw.decode()))
+
+# Formato de texto de las fechas guardadas: mantiene el orden al comparar como texto.
+# No se registra un adaptador de datetime (sería global al proceso para todo sqlite3):
+# cada consulta formatea sus parámetros con db_datetime().
+DB_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def db_datetime(value: datetime) -> str:
+    """Texto con el que se guarda y compara una fecha en la base de datos (precisión de segundos)."""
+    return value.strftime(DB_DATETIME_FORMAT)
+
+
+# Pragmas por conexión: con WAL, synchronous=NORMAL solo sincroniza en los checkpoints
+_CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+)
+
+# Conexiones persistentes: una por hilo y por (ruta, solo lectura, detect_types).
+# `_generation` invalida las de todos los hilos cuando se cierran en bloque.
+_local = threading.local()
+_open_connections: List[sqlite3.Connection] = []
+_open_lock = threading.Lock()
+_generation = 0
+
+# Tamaño de lote de executemany para inserciones grandes
+EXECUTE_MANY_CHUNK = 500
+
+# Índice de texto del historial (FTS5 con trigramas: admite búsquedas por subcadena
+# como LIKE '%texto%', pero resueltas sobre un índice invertido)
+HISTORY_FTS_MIN_CHARS = 3
+_HISTORY_FTS_COLUMNS = "{num_factura cliente empresa}"
+_HISTORY_FTS_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS envios_fts_ai AFTER INSERT ON envios BEGIN
+        INSERT INTO envios_fts(rowid, num_factura, cliente, empresa, detalles)
+        VALUES (new.id, new.num_factura, new.cliente, new.empresa, new.detalles);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS envios_fts_ad AFTER DELETE ON envios BEGIN
+        INSERT INTO envios_fts(envios_fts, rowid, num_factura, cliente, empresa, detalles)
+        VALUES ('delete', old.id, old.num_factura, old.cliente, old.empresa, old.detalles);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS envios_fts_au AFTER UPDATE OF num_factura, cliente, empresa, detalles ON envios BEGIN
+        INSERT INTO envios_fts(envios_fts, rowid, num_factura, cliente, empresa, detalles)
+        VALUES ('delete', old.id, old.num_factura, old.cliente, old.empresa, old.detalles);
+        INSERT INTO envios_fts(rowid, num_factura, cliente, empresa, detalles)
+        VALUES (new.id, new.num_factura, new.cliente, new.empresa, new.detalles);
+    END
+    """,
+)
+
+# ¿Tiene la base de datos (por ruta) el índice envios_fts?
+_history_fts_by_db: Dict[str, bool] = {}
+
+
+def _thread_connection(key: Tuple[str, bool, int]) -> sqlite3.Connection:
+    state = _local.__dict__
+    if state.get("generation") != _generation:
+        state["generation"] = _generation
+        state["connections"] = {}
+        state["depth"] = {}
+    conn = state["connections"].get(key)
+    if conn is None:
+        path, readonly, detect_types = key
+        if path.startswith("file:"):
+            # Ruta ya en forma de URI (p. ej. base en memoria compartida de los tests):
+            # no admite un segundo `mode`, así que la lectura se limita con query_only
+            conn = sqlite3.connect(path, uri=True, detect_types=detect_types, check_same_thread=False)
+            if readonly:
+                conn.execute("PRAGMA query_only=ON")
+        elif readonly:
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, detect_types=detect_types, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(path, detect_types=detect_types, check_same_thread=False)
+        for pragma in _CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        state["connections"][key] = conn
+        with _open_lock:
+            _open_connections.append(conn)
+    return conn
+
+
 @contextmanager
-def get_connection(readonly: bool = False) -> Iterator[sqlite3.Connection]:
+def get_connection(readonly: bool = False, detect_types: int = 0) -> Iterator[sqlite3.Connection]:
     """
     Devuelve un contexto con conexión a la base de datos.
     Si `readonly` es True, abre la DB en modo inmutable.
+    `detect_types` se pasa tal cual a sqlite3 para activar los conversores registrados.
+    La conexión se reutiliza dentro del mismo hilo; al salir del bloque más externo
+    se deshace lo que no se haya confirmado, como si se hubiera cerrado.
     """
-    if readonly:
-        uri = f"file:{DB_PATH}?mode=ro"
-        conn = sqlite3.connect(uri, uri=True)
-    else:
-        conn = sqlite3.connect(DB_PATH)
+    key = (resources.DB_PATH, readonly, detect_types)
+    conn = _thread_connection(key)
+    depth = _local.depth
+    depth[key] = depth.get(key, 0) + 1
     try:
         yield conn
     finally:
-        conn.close()
+        depth[key] -= 1
+        if depth[key] == 0 and conn.in_transaction:
+            conn.rollback()
+
+
+def close_all_connections() -> None:
+    """Cierra las conexiones persistentes de todos los hilos."""
+    global _generation
+    with _open_lock:
+        _generation += 1
+        connections = list(_open_connections)
+        _open_connections.clear()
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+atexit.register(close_all_connections)
+
+
+# Versión del esquema guardada en PRAGMA user_version; con ella al día,
+# init_database no vuelve a ejecutar DDL en cada arranque
+SCHEMA_VERSION = 3
+
+_SCHEMA_TABLES = """
+CREATE TABLE IF NOT EXISTS envios (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fecha_envio TEXT NOT NULL,
+    num_factura TEXT,
+    empresa TEXT,
+    estado TEXT,
+    detalles TEXT,
+    pdf_url TEXT,
+    excel_path TEXT,
+    pdf_local_path TEXT,
+    importe REAL DEFAULT 0.0,
+    cliente TEXT
+);
+CREATE TABLE IF NOT EXISTS offline_queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    xml_content BLOB NOT NULL,
+    num_factura TEXT NOT NULL,
+    empresa TEXT NOT NULL,
+    ejercicio TEXT,
+    cliente_doc TEXT,
+    api_key TEXT,
+    fecha_creacion TEXT NOT NULL,
+    intentos INTEGER DEFAULT 0,
+    ultimo_intento TEXT,
+    estado TEXT DEFAULT 'PENDIENTE'
+);
+"""
+
+# Columnas añadidas a envios después de su primera versión (bases de datos antiguas)
+_ENVIOS_ADDED_COLUMNS = (
+    ("importe", "REAL DEFAULT 0.0"),
+    ("cliente", "TEXT"),
+    ("pdf_local_path", "TEXT"),
+)
+
+_SCHEMA_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_fecha_envio ON envios(fecha_envio);
+CREATE INDEX IF NOT EXISTS idx_empresa ON envios(empresa);
+CREATE INDEX IF NOT EXISTS idx_num_factura ON envios(num_factura);
+CREATE INDEX IF NOT EXISTS idx_cliente ON envios(cliente);
+-- Filtros combinados del historial: igualdad + rango/orden por fecha.
+-- El de empresa cubre además estado/importe para las estadísticas.
+CREATE INDEX IF NOT EXISTS idx_envios_empresa_fecha ON envios(empresa, fecha_envio DESC, estado, importe);
+CREATE INDEX IF NOT EXISTS idx_envios_cliente_fecha ON envios(cliente, fecha_envio DESC);
+CREATE INDEX IF NOT EXISTS idx_envios_estado_fecha ON envios(estado, fecha_envio DESC);
+-- Listado general sin filtros: se resuelve solo con el índice.
+-- idx_fecha_envio se mantiene porque (fecha_envio, rowid) sirve a la paginación por cursor.
+CREATE INDEX IF NOT EXISTS idx_envios_fecha_cover ON envios(fecha_envio DESC, empresa, estado, num_factura, importe);
+CREATE INDEX IF NOT EXISTS idx_queue_estado_intentos ON offline_queue(estado, intentos);
+-- Sondeo de la cola: solo los pendientes, ya ordenados por antigüedad. `estado` va
+-- delante para que el planificador lo elija por igualdad incluso sin ANALYZE
+CREATE INDEX IF NOT EXISTS idx_queue_pending ON offline_queue(estado, fecha_creacion) WHERE estado = 'PENDIENTE';
+-- Sustituidos por los índices compuestos que empiezan por la misma columna
+DROP INDEX IF EXISTS idx_estado;
+DROP INDEX IF EXISTS idx_queue_estado;
+CREATE INDEX IF NOT EXISTS idx_queue_fecha ON offline_queue(fecha_creacion);
+"""
 
 
 def init_database() -> None:
     """
     Crea tablas e índices requeridos. Idempotente.
+    Todo el DDL va en un único script y transacción, y solo se ejecuta si
+    `PRAGMA user_version` es anterior a SCHEMA_VERSION.
     """
     with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS envios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                fecha_envio TEXT NOT NULL,
-                num_factura TEXT,
-                empresa TEXT,
-                estado TEXT,
-                detalles TEXT,
-                pdf_url TEXT,
-                excel_path TEXT,
-                pdf_local_path TEXT,
-                importe REAL DEFAULT 0.0,
-                cliente TEXT
-            )
-            """
+        # Solo surte efecto en un fichero nuevo y debe preceder al cambio a WAL,
+        # que ya escribe la cabecera; en bases antiguas lo aplica compact_database(),
+        # que solo se lanza a petición del usuario desde la página de configuración
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        # WAL es persistente en el fichero: lectores concurrentes y un solo fsync por transacción
+        conn.execute("PRAGMA journal_mode=WAL")
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            # Esquema al día: la disponibilidad de FTS se consulta a demanda
+            _history_fts_by_db.pop(resources.DB_PATH, None)
+            return
+
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(envios)")}
+        alters = "".join(
+            f"ALTER TABLE envios ADD COLUMN {name} {decl};\n"
+            for name, decl in _ENVIOS_ADDED_COLUMNS
+            if existing and name not in existing
         )
+        conn.executescript("BEGIN;\n" + _SCHEMA_TABLES + alters + _SCHEMA_INDEXES + "COMMIT;")
+
+        _history_fts_by_db[resources.DB_PATH] = _init_history_fts(conn.cursor())
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
 
-        for stmt in [
-            "ALTER TABLE envios ADD COLUMN importe REAL DEFAULT 0.0",
-            "ALTER TABLE envios ADD COLUMN cliente TEXT",
-            "ALTER TABLE envios ADD COLUMN pdf_local_path TEXT",
-        ]:
-            try:
-                cursor.execute(stmt)
-            except sqlite3.OperationalError:
-                pass
-
-        for stmt in [
-            "CREATE INDEX IF NOT EXISTS idx_fecha_envio ON envios(fecha_envio)",
-            "CREATE INDEX IF NOT EXISTS idx_empresa ON envios(empresa)",
-            "CREATE INDEX IF NOT EXISTS idx_estado ON envios(estado)",
-            "CREATE INDEX IF NOT EXISTS idx_num_factura ON envios(num_factura)",
-            "CREATE INDEX IF NOT EXISTS idx_cliente ON envios(cliente)",
-        ]:
-            try:
-                cursor.execute(stmt)
-            except sqlite3.OperationalError as e:
-                logger.warning("Error creando índice: %s", e)
-
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS offline_queue (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                xml_content BLOB NOT NULL,
-                num_factura TEXT NOT NULL,
-                empresa TEXT NOT NULL,
-                ejercicio TEXT,
-                cliente_doc TEXT,
-                api_key TEXT,
-                fecha_creacion TEXT NOT NULL,
-                intentos INTEGER DEFAULT 0,
-                ultimo_intento TEXT,
-                estado TEXT DEFAULT 'PENDIENTE'
+
+def _init_history_fts(cursor: sqlite3.Cursor) -> bool:
+    """Crea el índice FTS5 del historial y sus triggers; False si SQLite no trae FTS5."""
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'envios_fts'"
+    ).fetchone() is not None
+    try:
+        if not exists:
+            cursor.execute(
+                """
+                CREATE VIRTUAL TABLE envios_fts USING fts5(
+                    num_factura, cliente, empresa, detalles,
+                    content='envios', content_rowid='id', tokenize='trigram'
+                )
+                """
             )
-            """
-        )
-        for stmt in [
-            "CREATE INDEX IF NOT EXISTS idx_queue_estado ON offline_queue(estado)",
-            "CREATE INDEX IF NOT EXISTS idx_queue_fecha ON offline_queue(fecha_creacion)",
-        ]:
-            try:
-                cursor.execute(stmt)
-            except sqlite3.OperationalError as e:
-                logger.warning("Error creando índice cola offline: %s", e)
+            # Historial previo a la creación del índice
+            cursor.execute("INSERT INTO envios_fts(envios_fts) VALUES ('rebuild')")
+        for stmt in _HISTORY_FTS_TRIGGERS:
+            cursor.execute(stmt)
+    except sqlite3.OperationalError as e:
+        logger.warning("Búsqueda de texto sin FTS5 (se usará LIKE): %s", e)
+        return False
+    return True
+
+
+def history_fts_available() -> bool:
+    """Indica si la base de datos actual tiene el índice de texto envios_fts."""
+    available = _history_fts_by_db.get(resources.DB_PATH)
+    if available is None:
+        available = fetch_one(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'envios_fts'"
+        ) is not None
+        _history_fts_by_db[resources.DB_PATH] = available
+    return available
+
+
+def history_fts_query(search_text: str) -> str:
+    """
+    Construye la expresión MATCH de envios_fts equivalente a LIKE '%search_text%'
+    sobre num_factura, cliente y empresa.
+    """
+    phrase = search_text.replace('"', '""')
+    return f'{_HISTORY_FTS_COLUMNS} : "{phrase}"'
+
+
+def execute_many(
+    query: str,
+    params_seq: Iterable[Sequence],
+    conn: Optional[sqlite3.Connection] = None,
+) -> None:
+    """
+    Ejecuta `query` para cada juego de parámetros en una única transacción.
+    Los lotes grandes se envían en bloques de EXECUTE_MANY_CHUNK filas.
+    Si se pasa `conn`, se reutiliza esa conexión en lugar de abrir una nueva.
+    """
+    if conn is None:
+        with get_connection() as own_conn:
+            _execute_many_in_transaction(own_conn, query, params_seq)
+    else:
+        _execute_many_in_transaction(conn, query, params_seq)
+
+
+def _execute_many_in_transaction(conn: sqlite3.Connection, query: str, params_seq: Iterable[Sequence]) -> None:
+    # Si el llamador ya tiene una transacción abierta, él decide cuándo confirmarla
+    owns_transaction = not conn.in_transaction
+    if owns_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    it = iter(params_seq)
+    try:
+        while True:
+            chunk = list(islice(it, EXECUTE_MANY_CHUNK))
+            if not chunk:
+                break
+            conn.executemany(query, chunk)
+    except Exception:
+        if owns_transaction:
+            conn.rollback()
+        raise
+    if owns_transaction:
         conn.commit()
 
 
-def execute_many(query: str, params_seq: Iterable[Sequence]) -> None:
+def execute_many_chunked(query: str, params_seq: Iterable[Sequence], chunk: int = 5000) -> int:
+    """
+    Ejecuta `query` para cada juego de parámetros confirmando cada `chunk` filas.
+    Para importaciones muy grandes: acota el crecimiento del WAL a costa de no
+    ser atómica (si falla un bloque, los anteriores quedan guardados).
+    
+    Args:
+        query: Sentencia con parámetros
+        params_seq: Juegos de parámetros
+        chunk: Filas por transacción
+    
+    Returns:
+        Número de filas procesadas
+    """
+    total = 0
+    it = iter(params_seq)
     with get_connection() as conn:
-        conn.executemany(query, params_seq)
+        while block := list(islice(it, chunk)):
+            _execute_many_in_transaction(conn, query, block)
+            total += len(block)
+    return total
+
+
+@contextmanager
+def bulk_transaction() -> Iterator[sqlite3.Connection]:
+    """
+    Agrupa varias escrituras (incluso en tablas distintas) en una sola transacción.
+    Dentro del bloque, execute() y execute_many() no confirman por su cuenta:
+    se confirma una única vez al salir y se deshace todo si hay una excepción.
+    """
+    with get_connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
         conn.commit()
 
 
 def execute(query: str, params: Optional[Sequence] = None) -> None:
     with get_connection() as conn:
+        # Dentro de bulk_transaction() confirma quien abrió la transacción
+        owns_transaction = not conn.in_transaction
         conn.execute(query, params or [])
-        conn.commit()
+        if owns_transaction:
+            conn.commit()
 
 
-def fetch_all(query: str, params: Optional[Sequence] = None) -> Sequence[Tuple]:
-    with get_connection(readonly=True) as conn:
+def iter_rows(
+    query: str,
+    params: Optional[Sequence] = None,
+    batch: int = 1000,
+    detect_types: int = 0,
+    as_rows: bool = False,
+) -> Iterator[Tuple]:
+    """
+    Ejecuta una consulta de lectura y produce las filas en bloques de `batch`,
+    sin materializar todo el resultado.
+    Con `as_rows` las filas son sqlite3.Row (acceso por nombre de columna, sin crear dicts).
+    """
+    with get_connection(readonly=True, detect_types=detect_types) as conn:
         cur = conn.cursor()
-        cur.execute(query, params or [])
-        return cur.fetchall()
+        if as_rows:
+            cur.row_factory = sqlite3.Row
+        try:
+            cur.execute(query, params or [])
+            while rows := cur.fetchmany(batch):
+                yield from rows
+        finally:
+            cur.close()
+
+
+def fetch_all(
+    query: str,
+    params: Optional[Sequence] = None,
+    detect_types: int = 0,
+    as_rows: bool = False,
+) -> Sequence[Tuple]:
+    """Ejecuta una consulta de lectura y devuelve todas las filas en una lista."""
+    return list(iter_rows(query, params, detect_types=detect_types, as_rows=as_rows))
 
 
-def fetch_one(query: str, params: Optional[Sequence] = None) -> Optional[Tuple[Any, ...]]:
-    with get_connection(readonly=True) as conn:
+def fetch_one(
+    query: str,
+    params: Optional[Sequence] = None,
+    detect_types: int = 0,
+    as_rows: bool = False,
+) -> Optional[Tuple[Any, ...]]:
+    with get_connection(readonly=True, detect_types=detect_types) as conn:
         cur = conn.cursor()
+        if as_rows:
+            cur.row_factory = sqlite3.Row
         cur.execute(query, params or [])
         return cur.fetchone()
 
 
 def clear_history() -> None:
+    """
+    Borra el historial y devuelve al sistema las páginas liberadas.
+    Con auto_vacuum=INCREMENTAL no reescribe el fichero como haría VACUUM; en
+    las bases creadas sin él las páginas quedan en la lista libre y SQLite las
+    reutiliza. Nunca lanza compact_database(): eso es una acción del usuario.
+    """
     with get_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM envios")
-        conn.commit()
-        cursor.execute("VACUUM")
+        conn.execute("DELETE FROM envios")
         conn.commit()
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            # El pragma libera una página por paso y sqlite3 solo da el primero con
+            # execute(); executescript lo ejecuta hasta el final
+            conn.executescript("PRAGMA incremental_vacuum;")
+
+
+def compact_database() -> None:
+    """
+    Reescribe la base de datos con VACUUM y activa auto_vacuum=INCREMENTAL.
+    Bloquea a los escritores y necesita el doble de espacio en disco: solo
+    debe lanzarse a petición del usuario, nunca como parte de otra operación.
+    """
+    with get_connection() as conn:
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+        # En WAL la copia compactada queda en el -wal: volcarla para que el fichero encoja
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
 
 
 __all__ = [
     "get_connection",
+    "close_all_connections",
     "init_database",
     "execute_many",
+    "execute_many_chunked",
+    "bulk_transaction",
     "execute",
+    "iter_rows",
     "fetch_all",
     "fetch_one",
     "clear_history",
+    "compact_database",
+    "history_fts_available",
+    "history_fts_query",
+    "HISTORY_FTS_MIN_CHARS",
+    "DB_DATETIME_FORMAT",
+    "db_datetime",
 ]
 
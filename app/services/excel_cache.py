@@ -0,0 +1,126 @@
+"""
+Caché de lecturas de Excel de facturas.
+Memoriza en memoria (LRU) y en disco los DataFrames leídos, indexados por
+ruta, fecha de modificación y tamaño, de modo que reseleccionar el mismo
+archivo no vuelve a parsear el libro. En disco se guarda solo la última
+versión de cada ruta, y las entradas sin usar caducan a los
+EXCEL_CACHE_MAX_AGE_DAYS días.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from contextlib import suppress
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Tuple
+
+from app.core.logging import get_logger
+from app.core.resources import resource_path
+from app.services.excel_loader import read_invoice_workbook
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+logger = get_logger("services.excel_cache")
+
+CACHE_DIR = Path(resource_path("cache"))
+# Días sin leerse tras los que se borra una entrada de la caché en disco
+EXCEL_CACHE_MAX_AGE_DAYS = 30
+
+ExcelCacheKey = Tuple[str, int, int]
+
+
+def excel_cache_key(path: str) -> ExcelCacheKey:
+    """Devuelve la clave (ruta absoluta, mtime en ns, tamaño) del archivo."""
+    st = os.stat(path)
+    return os.path.abspath(path), st.st_mtime_ns, st.st_size
+
+
+def _disk_cache_prefix(path: str) -> str:
+    return "excel_" + hashlib.sha1(path.encode("utf-8")).hexdigest()[:16] + "_"
+
+
+def _disk_cache_path(key: ExcelCacheKey) -> Path:
+    digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+    return CACHE_DIR / f"{_disk_cache_prefix(key[0])}{digest}.pkl"
+
+
+def _prune_disk_cache(path: str, current: Path) -> None:
+    """
+    Borra las versiones anteriores de `path` y las entradas caducadas de cualquier ruta.
+    
+    Args:
+        path: Ruta absoluta del Excel recién guardado
+        current: Entrada recién escrita, que se conserva
+    """
+    prefix = _disk_cache_prefix(path)
+    expiry = time.time() - EXCEL_CACHE_MAX_AGE_DAYS * 86400
+    for entry in CACHE_DIR.glob("excel_*.pkl"):
+        if entry == current:
+            continue
+        try:
+            if entry.name.startswith(prefix) or entry.stat().st_mtime < expiry:
+                entry.unlink()
+        except OSError:
+            logger.debug("No se pudo borrar la entrada de caché %s", entry, exc_info=True)
+
+
+def _store(key: ExcelCacheKey, frames: Tuple[pd.DataFrame, pd.DataFrame]) -> None:
+    import pandas as pd
+    
+    disk_path = _disk_cache_path(key)
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        pd.to_pickle(frames, disk_path)
+    except Exception:
+        logger.warning("No se pudo guardar la caché de Excel en disco", exc_info=True)
+        return
+    _prune_disk_cache(key[0], disk_path)
+
+
+@lru_cache(maxsize=8)
+def _load_by_key(path: str, mtime_ns: int, size: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    import pandas as pd
+    
+    disk_path = _disk_cache_path((path, mtime_ns, size))
+    if disk_path.exists():
+        try:
+            df_factura, df_conceptos = pd.read_pickle(disk_path)
+        except Exception:
+            logger.warning("Caché de Excel corrupta, se vuelve a leer el archivo", exc_info=True)
+        else:
+            # Entrada en uso: se renueva su fecha para que no caduque
+            with suppress(OSError):
+                os.utime(disk_path)
+            logger.debug(f"Excel recuperado de la caché en disco: {path}")
+            return df_factura, df_conceptos
+
+    df_factura, df_conceptos = read_invoice_workbook(path)
+    _store((path, mtime_ns, size), (df_factura, df_conceptos))
+    return df_factura, df_conceptos
+
+
+def load_excel_cached(path: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Lee (o recupera de caché) las hojas de facturas y conceptos.
+    
+    Los DataFrames devueltos se comparten entre llamadas: no deben modificarse in situ.
+    
+    Args:
+        path: Ruta al archivo Excel
+        
+    Returns:
+        Tupla (df_factura, df_conceptos)
+    """
+    return _load_by_key(*excel_cache_key(path))
+
+
+def clear_excel_cache() -> None:
+    """Vacía la caché en memoria (la de disco se invalida sola por mtime/tamaño y se poda al escribir)."""
+    _load_by_key.cache_clear()
+
+
+__all__ = ["excel_cache_key", "load_excel_cached", "clear_excel_cache"]
@@ -0,0 +1,45 @@
+"""
+Lectura de libros Excel de facturas (hojas "Facturas" y "Conceptos").
+Usa el motor Calamine (Rust) si está instalado y recurre a openpyxl en caso contrario.
+"""
+from __future__ import annotations
+
+import importlib.util
+from typing import TYPE_CHECKING, Tuple
+
+from app.core.logging import get_logger
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+logger = get_logger("services.excel_loader")
+
+EXCEL_ENGINE = "calamine" if importlib.util.find_spec("python_calamine") else "openpyxl"
+
+SHEET_FACTURAS = "Facturas"
+SHEET_CONCEPTOS = "Conceptos"
+
+
+def read_invoice_workbook(path: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Lee las hojas de facturas y conceptos abriendo el libro una sola vez.
+    
+    Args:
+        path: Ruta al archivo Excel
+        
+    Returns:
+        Tupla (df_factura, df_conceptos)
+    """
+    import pandas as pd
+    
+    sheets = pd.read_excel(
+        path,
+        sheet_name=[SHEET_FACTURAS, SHEET_CONCEPTOS],
+        engine=EXCEL_ENGINE,
+    )
+    logger.debug(f"Excel leído con motor {EXCEL_ENGINE}: {path}")
+    return sheets[SHEET_FACTURAS], sheets[SHEET_CONCEPTOS]
+
+
+__all__ = ["EXCEL_ENGINE", "SHEET_FACTURAS", "SHEET_CONCEPTOS", "read_invoice_workbook"]
@@ -7,18 +7,86 @@ from __future__ import annotations
 import os
 import re
 import json
-from typing import List, Dict, Optional, Tuple, Any
+import math
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple, Any
 from datetime import datetime
-from decimal import Decimal
-
-import pandas as pd
+from decimal import Decimal, InvalidOperation
 
 from app.core.logging import get_logger
 from app.models.invoice import InvoiceProcessingResult, InvoiceValidationError
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 logger = get_logger("services.invoice_processing")
 
+# "1,234.56" -> "1.234,56": intercambio de separadores en una sola pasada
+_EUR_TRANS = str.maketrans({",": ".", ".": ","})
+
+# parse_amount: símbolos de moneda y espacios (también el no separable) eliminados en una pasada
+_AMOUNT_STRIP_TRANS = str.maketrans("", "", "€$ \u00a0")
+# Formato inglés con miles agrupados ("1,234.56"); el resto de comas se leen como decimales
+_EN_AMOUNT_RE = re.compile(r"-?\d{1,3}(?:,\d{3})+\.\d+")
+_DEC_ZERO = Decimal("0.0")
+
+# ID numérico, con o sin ".0" final (p.ej. "25042" o "25042.0")
+_NUM_RE = re.compile(r"\d+(?:\.0+)?")
+
+
+# Búsqueda de la URL del PDF en respuestas de la API
+_PDF_URL_KEYS = ("pdf_url", "url_pdf", "pdf", "url", "enlace_pdf", "link")
+_URL_RE = re.compile(r"https?://[^\s\"'>)]+")
+# "pdf" ya cubre ".pdf"
+_PDF_KEYWORDS = ("pdf", "download", "descarga", "ver_afc_api.php")
+
+
+def _iter_strings(root: Any):
+    # Recorrido en profundidad con pila explícita (sin un generador por contenedor);
+    # se apila al revés para visitar en el mismo orden que el recorrido recursivo
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, str):
+            yield obj
+        elif isinstance(obj, dict):
+            stack.extend(reversed(obj.values()))
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(reversed(obj))
+
+
+def _loads(raw: bytes) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # orjson es estricto (p.ej. rechaza NaN); json acepta lo que se aceptaba antes
+            pass
+    return json.loads(raw)
+
+
+@lru_cache(maxsize=4096)
+def _format_eur(v: float) -> str:
+    # La tabla de historial vuelve a pedir los mismos importes en cada repintado
+    return f"{v:,.2f}".translate(_EUR_TRANS) + "€"
+
+
+@lru_cache(maxsize=8192)
+def _normalize_invoice_id_str(s: str) -> str:
+    # Cada NumFactura se repite en todas sus líneas: la regex se evalúa una vez por valor
+    if _NUM_RE.fullmatch(s):
+        try:
+            return str(int(float(s)))
+        except Exception:
+            return s
+    return s
+
 
 class InvoiceProcessingService:
     """Servicio para procesamiento de facturas."""
@@ -38,15 +106,37 @@ class InvoiceProcessingService:
         Returns:
             ID normalizado como string
         """
-        s = str(invoice_id).strip()
-        # Si es numérico (incluye "25042.0"), devolvemos entero sin .0
-        if re.fullmatch(r"\d+(?:\.0+)?", s):
-            try:
-                return str(int(float(s)))
-            except Exception:
-                return s
-        # Si es alfanumérico (p.ej. "Int_25003"), devolvemos tal cual
-        return s
+        # Numérico (incluye "25042.0") -> entero sin .0; alfanumérico (p.ej. "Int_25003") tal cual.
+        # Se normaliza a str antes de la caché: NaN o floats no son buenas claves.
+        return _normalize_invoice_id_str(str(invoice_id).strip())
+    
+    @staticmethod
+    def normalize_invoice_id_series(invoice_ids: pd.Series) -> pd.Series:
+        """
+        Versión vectorizada de `normalize_invoice_id` para una columna completa.
+        Las operaciones de texto se aplican solo a los valores distintos (en conceptos
+        el mismo NumFactura se repite en cada línea) y se reexpanden por código.
+        
+        Args:
+            invoice_ids: Serie con IDs de factura
+            
+        Returns:
+            Serie de strings normalizados
+        """
+        import pandas as pd
+        
+        codes, uniques = pd.factorize(invoice_ids)
+        s = pd.Series(uniques, dtype=object).map(str).str.strip()
+        numeric = s.str.fullmatch(_NUM_RE)
+        if numeric.any():
+            digits = s[numeric].str.replace(r"\.0+$", "", regex=True).str.lstrip("0")
+            s = s.mask(numeric, digits.mask(digits == "", "0"))
+        result = pd.Series(s.to_numpy(dtype=object)[codes], index=invoice_ids.index, name=invoice_ids.name)
+        # Vacíos (None/NaN) no entran en factorize: se resuelven con la versión escalar
+        missing = codes == -1
+        if missing.any():
+            result[missing] = invoice_ids[missing].map(InvoiceProcessingService.normalize_invoice_id)
+        return result
     
     @staticmethod
     def format_currency_eur(value: Any) -> str:
@@ -63,9 +153,10 @@ class InvoiceProcessingService:
             v = float(value)
         except Exception:
             return ""
-        s = f"{v:,.2f}"
-        s = s.replace(",", "X").replace(".", ",").replace("X", ".")
-        return f"{s}€"
+        if not math.isfinite(v):
+            return ""
+        # -0.0 y 0.0 son la misma clave de caché: se normaliza a 0.0
+        return _format_eur(v + 0.0)
     
     @staticmethod
     def parse_amount(raw_amount: Any) -> Decimal:
@@ -84,24 +175,59 @@ class InvoiceProcessingService:
         if isinstance(raw_amount, (int, float)):
             return Decimal(str(raw_amount))
         
-        if isinstance(raw_amount, str):
-            # Eliminar símbolos de moneda y espacios
-            cleaned = raw_amount.replace("€", "").replace("$", "").strip()
-            # Convertir formato español a formato estándar
-            if "," in cleaned and "." in cleaned:
-                # Formato: 1.234,56 -> 1234.56
-                cleaned = cleaned.replace(".", "").replace(",", ".")
-            elif "," in cleaned:
+        if not isinstance(raw_amount, str):
+            return _DEC_ZERO
+        
+        # Eliminar símbolos de moneda y espacios
+        cleaned = raw_amount.strip().translate(_AMOUNT_STRIP_TRANS)
+        if "," in cleaned:
+            if _EN_AMOUNT_RE.fullmatch(cleaned):
+                # Formato inglés: 1,234.56 -> 1234.56
+                cleaned = cleaned.replace(",", "")
+            else:
+                # Convertir formato español a formato estándar
+                if "." in cleaned:
+                    # Formato: 1.234,56 -> 1234.56
+                    cleaned = cleaned.replace(".", "")
                 # Formato: 1234,56 -> 1234.56
                 cleaned = cleaned.replace(",", ".")
+        
+        try:
+            return Decimal(cleaned)
+        except InvalidOperation:
+            logger.warning(f"No se pudo parsear el importe: {raw_amount}")
+            return _DEC_ZERO
+    
+    @staticmethod
+    def parse_amount_series(raw_amounts: pd.Series) -> pd.Series:
+        """
+        Versión vectorizada de `parse_amount` para una columna completa.
+        
+        Args:
+            raw_amounts: Serie con importes (números o textos como "1.234,56 €")
             
-            try:
-                return Decimal(cleaned)
-            except Exception:
-                logger.warning(f"No se pudo parsear el importe: {raw_amount}")
-                return Decimal("0.0")
+        Returns:
+            Serie de floats; los valores no parseables quedan a 0.0 y un float NaN
+            se mantiene como NaN, igual que en `parse_amount`
+        """
+        import pandas as pd
         
-        return Decimal("0.0")
+        amounts = pd.to_numeric(raw_amounts, errors="coerce")
+        float_nan = amounts.isna()
+        if float_nan.any():
+            float_nan[float_nan] = raw_amounts[float_nan].map(lambda value: isinstance(value, float))
+        is_text = raw_amounts.map(type).eq(str)
+        if is_text.any():
+            text = raw_amounts[is_text].astype(str).str.strip().str.translate(_AMOUNT_STRIP_TRANS)
+            english = text.str.fullmatch(_EN_AMOUNT_RE)
+            text = text.mask(english, text.str.replace(",", "", regex=False))
+            has_comma = text.str.contains(",", regex=False)
+            # 1.234,56 -> 1234.56 (ambos separadores); 1234,56 -> 1234.56 (solo coma)
+            both = has_comma & text.str.contains(".", regex=False)
+            text = text.mask(both, text.str.replace(".", "", regex=False))
+            text = text.mask(has_comma, text.str.replace(",", ".", regex=False))
+            amounts[is_text] = pd.to_numeric(text, errors="coerce")
+        return amounts.astype(float).fillna(0.0).mask(float_nan)
     
     @staticmethod
     def extract_pdf_url(item: Dict[str, Any]) -> Optional[str]:
@@ -115,31 +241,19 @@ class InvoiceProcessingService:
             URL del PDF si se encuentra, None en caso contrario
         """
         # Buscar en campos comunes
-        for key in ["pdf_url", "url_pdf", "pdf", "url", "enlace_pdf", "link"]:
-            if key in item:
-                url = item[key]
-                if isinstance(url, str) and url.startswith("http"):
-                    return url
-        
-        # Buscar recursivamente en el diccionario
-        def _iter_scalars(obj: Any):
-            if isinstance(obj, dict):
-                for v in obj.values():
-                    yield from _iter_scalars(v)
-            elif isinstance(obj, (list, tuple)):
-                for v in obj:
-                    yield from _iter_scalars(v)
-            else:
-                yield obj
+        for key in _PDF_URL_KEYS:
+            url = item.get(key)
+            if isinstance(url, str) and url.startswith("http"):
+                return url
         
-        # Buscar URLs que parezcan PDFs
-        for scalar in _iter_scalars(item):
-            if isinstance(scalar, str):
-                match = re.search(r"https?://[^\s\"'>)]+", scalar)
+        # Buscar recursivamente URLs que parezcan PDFs; la regex solo corre si hay "http"
+        for scalar in _iter_strings(item):
+            if "http" in scalar:
+                match = _URL_RE.search(scalar)
                 if match:
                     url = match.group(0)
                     url_lower = url.lower()
-                    if any(keyword in url_lower for keyword in [".pdf", "pdf", "download", "descarga", "ver_afc_api.php"]):
+                    if any(keyword in url_lower for keyword in _PDF_KEYWORDS):
                         return url
         
         return None
@@ -156,8 +270,8 @@ class InvoiceProcessingService:
             Lista de diccionarios con información de facturas
         """
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            with open(path, "rb") as f:
+                data = _loads(f.read())
             
             if isinstance(data, dict):
                 if "proformas_procesadas" in data and isinstance(data["proformas_procesadas"], list):
@@ -189,36 +303,52 @@ class InvoiceProcessingService:
         Returns:
             Tupla (es_valido, lista_de_errores)
         """
+        import pandas as pd
+        
         errors: List[InvoiceValidationError] = []
         
-        # Validar columnas requeridas en facturas
-        required_factura_cols = ["NumFactura", "empresa_emisora", "cliente_nombre"]
-        for col in required_factura_cols:
-            if col not in df_factura.columns:
-                errors.append(InvoiceValidationError(
-                    row_index=-1,
-                    field_name=col,
-                    error_message=f"Falta la columna requerida: {col}"
-                ))
+        # Validar columnas requeridas en facturas (búsqueda por hash sobre el índice de columnas)
+        required_factura_cols = pd.Index(["NumFactura", "empresa_emisora", "cliente_nombre"])
+        for col in required_factura_cols.difference(df_factura.columns, sort=False):
+            errors.append(InvoiceValidationError(
+                row_index=-1,
+                field_name=col,
+                error_message=f"Falta la columna requerida: {col}"
+            ))
         
         # Validar columnas requeridas en conceptos
-        required_conceptos_cols = ["NumFactura", "descripcion", "cantidad", "precio_unitario"]
-        for col in required_conceptos_cols:
-            if col not in df_conceptos.columns:
-                errors.append(InvoiceValidationError(
-                    row_index=-1,
-                    field_name=col,
-                    error_message=f"Falta la columna requerida en conceptos: {col}"
-                ))
+        required_conceptos_cols = pd.Index(["NumFactura", "descripcion", "cantidad", "precio_unitario"])
+        for col in required_conceptos_cols.difference(df_conceptos.columns, sort=False):
+            errors.append(InvoiceValidationError(
+                row_index=-1,
+                field_name=col,
+                error_message=f"Falta la columna requerida en conceptos: {col}"
+            ))
         
         # Si faltan columnas críticas, no continuar
         if errors:
             return False, errors
         
-        # Validar cada factura
-        for idx, row in df_factura.iterrows():
-            invoice_id = InvoiceProcessingService.normalize_invoice_id(row.get("NumFactura", ""))
-            
+        # Todas las comprobaciones por fila se evalúan por columnas en una sola pasada;
+        # las facturas huérfanas salen de un anti-join por hash contra los IDs de conceptos
+        normalize = InvoiceProcessingService.normalize_invoice_id_series
+        factura_ids = normalize(df_factura["NumFactura"])
+        concept_ids = pd.Index(normalize(pd.Series(df_conceptos["NumFactura"].unique())).unique())
+        has_id = factura_ids.str.len() > 0
+        has_conceptos = factura_ids.isin(concept_ids)
+        has_empresa = _has_value(df_factura["empresa_emisora"])
+        has_cliente = _has_value(df_factura["cliente_nombre"])
+        row_ok = (has_id & has_empresa & has_cliente & has_conceptos).to_numpy(dtype=bool)
+        
+        # Solo se recorren las filas con algún fallo (mismo orden de errores que fila a fila)
+        bad = ~row_ok
+        for idx, invoice_id, empresa_ok, cliente_ok, conceptos_ok in zip(
+            df_factura.index[bad],
+            factura_ids.to_numpy()[bad],
+            has_empresa.to_numpy()[bad],
+            has_cliente.to_numpy()[bad],
+            has_conceptos.to_numpy()[bad],
+        ):
             # Validar que tenga número de factura
             if not invoice_id:
                 errors.append(InvoiceValidationError(
@@ -228,7 +358,7 @@ class InvoiceProcessingService:
                 ))
             
             # Validar que tenga empresa emisora
-            if not row.get("empresa_emisora"):
+            if not empresa_ok:
                 errors.append(InvoiceValidationError(
                     row_index=idx,
                     field_name="empresa_emisora",
@@ -237,7 +367,7 @@ class InvoiceProcessingService:
                 ))
             
             # Validar que tenga cliente
-            if not row.get("cliente_nombre"):
+            if not cliente_ok:
                 errors.append(InvoiceValidationError(
                     row_index=idx,
                     field_name="cliente_nombre",
@@ -246,11 +376,7 @@ class InvoiceProcessingService:
                 ))
             
             # Validar que tenga conceptos asociados
-            conceptos_factura = df_conceptos[
-                df_conceptos["NumFactura"].map(InvoiceProcessingService.normalize_invoice_id) == invoice_id
-            ]
-            
-            if len(conceptos_factura) == 0:
+            if not conceptos_ok:
                 errors.append(InvoiceValidationError(
                     row_index=idx,
                     field_name="conceptos",
@@ -276,37 +402,83 @@ class InvoiceProcessingService:
         Returns:
             Tupla (base_imponible, total_iva, total_retencion)
         """
-        # Normalizar IDs en el DataFrame
-        df_conceptos_norm = df_conceptos.copy()
-        df_conceptos_norm["__id_norm__"] = df_conceptos_norm["NumFactura"].map(
-            InvoiceProcessingService.normalize_invoice_id
-        )
+        ids = InvoiceProcessingService.normalize_invoice_id_series(df_conceptos["NumFactura"])
+        mask = (ids == invoice_id).to_numpy(dtype=bool)
+        base, iva, ret = InvoiceProcessingService._concept_amounts(df_conceptos[mask], invoice_id)
+        return _to_decimal(base.sum()), _to_decimal(iva.sum()), _to_decimal(ret.sum())
+    
+    @staticmethod
+    def calculate_all_totals(df_conceptos: pd.DataFrame) -> pd.DataFrame:
+        """
+        Calcula los totales de todas las facturas en una sola pasada agrupada.
+        Los importes quedan en float64, para procesos por lotes que no necesitan Decimal.
+        
+        Args:
+            df_conceptos: DataFrame con conceptos
+            
+        Returns:
+            DataFrame indexado por NumFactura normalizado (en orden de aparición) con
+            las columnas base_imponible, total_iva y total_retencion
+        """
+        import pandas as pd
         
-        # Filtrar conceptos de esta factura
-        conceptos_factura = df_conceptos_norm[df_conceptos_norm["__id_norm__"] == invoice_id]
+        ids = InvoiceProcessingService.normalize_invoice_id_series(df_conceptos["NumFactura"])
+        base, iva, ret = InvoiceProcessingService._concept_amounts(df_conceptos)
+        sums = pd.DataFrame(
+            {"base_imponible": base, "total_iva": iva, "total_retencion": ret}
+        ).groupby(ids.to_numpy(), sort=False).sum()
+        sums.index.name = "NumFactura"
+        return sums
+    
+    @staticmethod
+    def calculate_totals_by_invoice(df_conceptos: pd.DataFrame) -> Dict[str, Tuple[Decimal, Decimal, Decimal]]:
+        """
+        Calcula los totales de todas las facturas en una sola pasada agrupada.
         
-        base_sum = Decimal("0.0")
-        iva_sum = Decimal("0.0")
-        ret_sum = Decimal("0.0")
+        Args:
+            df_conceptos: DataFrame con conceptos
+            
+        Returns:
+            Diccionario {id_normalizado: (base_imponible, total_iva, total_retencion)}
+        """
+        # La conversión a Decimal se hace una vez por factura, no por concepto
+        sums = InvoiceProcessingService.calculate_all_totals(df_conceptos)
+        return {
+            invoice_id: (_to_decimal(b), _to_decimal(i), _to_decimal(r))
+            for invoice_id, b, i, r in sums.itertuples()
+        }
+    
+    @staticmethod
+    def _concept_amounts(df_conceptos: pd.DataFrame, invoice_id: Optional[str] = None) -> Tuple[Any, Any, Any]:
+        """Base, IVA y retención por concepto como arrays float64 (valores no numéricos = 0)."""
+        import numpy as np
+        import pandas as pd
         
-        for _, concepto in conceptos_factura.iterrows():
-            try:
-                cantidad = Decimal(str(concepto.get("cantidad", 0)))
-                precio = Decimal(str(concepto.get("precio_unitario", 0)))
-                iva_pct = Decimal(str(concepto.get("iva_porcentaje", 0)))
-                ret_pct = Decimal(str(concepto.get("retencion_porcentaje", 0)))
-                
-                base = cantidad * precio
-                iva = base * (iva_pct / Decimal("100"))
-                ret = base * (ret_pct / Decimal("100"))
-                
-                base_sum += base
-                iva_sum += iva
-                ret_sum += ret
-            except Exception as e:
-                logger.warning(f"Error calculando totales para factura {invoice_id}: {e}")
+        def column(name: str) -> np.ndarray:
+            if name not in df_conceptos.columns:
+                return np.zeros(len(df_conceptos))
+            raw = df_conceptos[name]
+            values = pd.to_numeric(raw, errors="coerce")
+            if (values.isna() & raw.notna()).any():
+                logger.warning(
+                    f"Valores no numéricos en '{name}' tratados como 0"
+                    + (f" (factura {invoice_id})" if invoice_id else "")
+                )
+            return values.fillna(0.0).to_numpy(dtype="float64")
         
-        return base_sum, iva_sum, ret_sum
+        base = column("cantidad") * column("precio_unitario")
+        return base, base * column("iva_porcentaje") / 100.0, base * column("retencion_porcentaje") / 100.0
+
+
+def _has_value(values: pd.Series) -> pd.Series:
+    # Mismo criterio que `not row.get(col)` fila a fila (None, "" y 0 faltan; NaN,
+    # verdadero para bool(), cuenta como presente), convertido por numpy en bloque
+    return values.astype(bool)
+
+
+def _to_decimal(value: float) -> Decimal:
+    # Los importes se suman en float64; se redondea el ruido binario antes de pasar a Decimal
+    return Decimal(str(round(float(value), 6)))
 
 
 # Instancia global del servicio
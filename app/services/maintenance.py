@@ -3,20 +3,50 @@ Servicios de mantenimiento: health checks, copias de seguridad y actualización
 """
 from __future__ import annotations
 
+import hashlib
+import json
+import mmap
 import os
+import sqlite3
+import sys
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 
 import requests
 
+try:
+    from blake3 import blake3
+except ImportError:  # pragma: no cover - dependencia opcional
+    blake3 = None
+
 from app.core.logging import get_logger
-from app.core.resources import DB_PATH, USERS_PATH, resource_path
+# DB_PATH y USERS_PATH se leen de `resources` en cada llamada, como en database
+from app.core import resources
+from app.core.resources import resource_path
 from app.services.database import get_connection
 
 
 logger = get_logger("services.maintenance")
 
+# Carpetas de trabajo, resueltas una vez al importar el módulo
+LOGS_DIR = Path(resource_path("logs"))
+BACKUPS_DIR = Path(resource_path("backups"))
+# Firmas de plantillas ya calculadas, por ruta, mtime y tamaño
+TEMPLATE_CHECKSUMS_PATH = Path(resource_path("cache")) / "template_checksums.json"
+
+# Bloque de lectura para el cálculo manual del SHA256 (Python < 3.11)
+HASH_BUFFER_SIZE = 1 << 20
+# A partir de este tamaño el SHA256 se calcula sobre el fichero mapeado en memoria
+MMAP_HASH_THRESHOLD = 16 * 1024 * 1024
+# Bloque de escritura al descargar plantillas
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+# Por encima de este tamaño la base de datos se guarda sin comprimir en el backup
+BACKUP_STORE_THRESHOLD = 100 * 1024 * 1024
+BACKUP_COMPRESSIONS = ("deflate-fast", "deflate", "stored", "zstd")
+
 
 def run_health_checks(pdf_destination: str, browser_info: str) -> List[Dict[str, str]]:
     """
@@ -34,12 +64,10 @@ def run_health_checks(pdf_destination: str, browser_info: str) -> List[Dict[str,
         results.append({"nombre": "Base de datos", "estado": "ERROR", "detalle": str(exc)})
 
     # Carpeta de logs
-    logs_dir = Path(resource_path("logs"))
+    logs_dir = LOGS_DIR
     try:
         logs_dir.mkdir(parents=True, exist_ok=True)
-        test_file = logs_dir / ".write_test"
-        test_file.write_text("ok", encoding="utf-8")
-        test_file.unlink(missing_ok=True)
+        _check_writable(logs_dir, ".write_test")
         results.append({"nombre": "Carpeta de logs", "estado": "OK", "detalle": str(logs_dir)})
     except Exception as exc:
         logger.exception("Health check logs falló")
@@ -50,9 +78,7 @@ def run_health_checks(pdf_destination: str, browser_info: str) -> List[Dict[str,
         pdf_path = Path(pdf_destination or "")
         if not pdf_path.exists():
             pdf_path.mkdir(parents=True, exist_ok=True)
-        test_file = pdf_path / ".pdf_write_test"
-        test_file.write_text("ok", encoding="utf-8")
-        test_file.unlink(missing_ok=True)
+        _check_writable(pdf_path, ".pdf_write_test")
         results.append({"nombre": "Destino PDFs", "estado": "OK", "detalle": str(pdf_path)})
     except Exception as exc:
         logger.exception("Health check destino PDF falló")
@@ -67,77 +93,271 @@ def run_health_checks(pdf_destination: str, browser_info: str) -> List[Dict[str,
     return results
 
 
-def create_backup(backup_dir: Optional[Path] = None) -> Path:
+def _check_writable(directory: Path, probe_name: str) -> None:
+    """
+    Lanza OSError si no se puede escribir en `directory`.
+    Se crea y borra un fichero vacío: os.access puede dar permiso de escritura donde
+    no lo hay (unidades de red, ACL de Windows, medios de solo lectura).
+    """
+    probe = directory / probe_name
+    os.close(os.open(probe, os.O_WRONLY | os.O_CREAT | os.O_TRUNC))
+    os.unlink(probe)
+
+
+def _backup_compression(compression: str, size: int) -> Tuple[int, Optional[int]]:
+    """Devuelve (compress_type, compresslevel) de zipfile para un fichero de `size` bytes."""
+    if compression not in BACKUP_COMPRESSIONS:
+        raise ValueError(f"Compresión de backup desconocida: {compression}")
+    if compression == "stored":
+        return zipfile.ZIP_STORED, None
+    if compression == "deflate":
+        return zipfile.ZIP_DEFLATED, None
+    if compression == "zstd" and hasattr(zipfile, "ZIP_ZSTANDARD"):
+        return zipfile.ZIP_ZSTANDARD, None
+    # deflate-fast (y zstd en Python < 3.14): el nivel 1 comprime casi igual con mucha menos CPU
+    if size > BACKUP_STORE_THRESHOLD:
+        return zipfile.ZIP_STORED, None
+    return zipfile.ZIP_DEFLATED, 1
+
+
+def create_backup(backup_dir: Optional[Path] = None, compression: str = "deflate-fast") -> Path:
     """
     Crea un backup comprimido de la base de datos y users.json.
+    La base de datos se copia con VACUUM INTO: una instantánea consistente y
+    compactada, sin leer el fichero vivo mientras otros escriben en él.
+    Incluye un manifest.sha256 con la firma de cada fichero copiado.
+
+    Args:
+        backup_dir: Carpeta de destino (por defecto, BACKUPS_DIR)
+        compression: "deflate-fast" (nivel 1; sin comprimir por encima de
+            BACKUP_STORE_THRESHOLD), "deflate", "stored" o "zstd" (Python 3.14+)
+
+    Returns:
+        Ruta del fichero zip creado
     """
-    backup_dir = backup_dir or Path(resource_path("backups"))
+    backup_dir = backup_dir or BACKUPS_DIR
     backup_dir.mkdir(parents=True, exist_ok=True)
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     archive_path = backup_dir / f"backup_factunabo_{timestamp}.zip"
 
-    import zipfile
+    snapshot = archive_path.with_suffix(".db.tmp")
+    members: Dict[Path, str] = {}
+    try:
+        if os.path.exists(resources.DB_PATH):
+            members[_snapshot_database(snapshot)] = "factunabo_history.db"
+        if os.path.exists(resources.USERS_PATH):
+            members[Path(resources.USERS_PATH)] = "users.json"
+        checksums = hash_files(list(members))
 
-    with zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-        if os.path.exists(DB_PATH):
-            zf.write(DB_PATH, arcname="factunabo_history.db")
-        if os.path.exists(USERS_PATH):
-            zf.write(USERS_PATH, arcname="users.json")
+        with zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for path, arcname in members.items():
+                compress_type, compresslevel = _backup_compression(compression, path.stat().st_size)
+                zf.write(path, arcname=arcname, compress_type=compress_type, compresslevel=compresslevel)
+            # Mismo formato que `sha256sum`, para poder verificar el backup con `sha256sum -c`
+            manifest = "".join(f"{checksums[path]}  {arcname}\n" for path, arcname in members.items())
+            zf.writestr("manifest.sha256", manifest)
+    finally:
+        snapshot.unlink(missing_ok=True)
 
     logger.info("Backup creado en %s", archive_path)
     return archive_path
 
 
-def check_remote_template_version(url: str, current_checksum: str) -> Dict[str, str]:
+def _snapshot_database(destination: Path) -> Path:
     """
-    Comprueba la versión remota de la plantilla comparando firmas SHA256.
+    Vuelca la base de datos en `destination` con VACUUM INTO y devuelve la ruta a copiar.
+    Si SQLite no admite VACUUM INTO (anterior a 3.27), se copia el fichero tal cual.
+    """
+    destination.unlink(missing_ok=True)
+    try:
+        with get_connection() as conn:
+            conn.execute("VACUUM INTO ?", (str(destination),))
+    except sqlite3.OperationalError:
+        logger.warning("VACUUM INTO no disponible; se copia la base de datos en uso", exc_info=True)
+        return Path(resources.DB_PATH)
+    return destination
+
+
+def check_remote_template_version(
+    url: str,
+    current_checksum: str,
+    etag: str = "",
+    download_to: Optional[Path] = None,
+) -> Dict[str, str]:
+    """
+    Comprueba la versión remota de la plantilla con un único GET condicional.
+
+    Con el `etag` de la última descarga el servidor responde 304 si no hay cambios.
+    Si hay una versión distinta y se indica `download_to`, la respuesta se guarda
+    ya en ese fichero, sin necesidad de volver a pedirla para descargarla.
+
+    Args:
+        url: URL de la plantilla
+        current_checksum: SHA256 de la plantilla local
+        etag: ETag devuelto por el servidor en la última descarga
+        download_to: Fichero donde dejar la versión nueva, si la hay
+
+    Returns:
+        Diccionario con "estado" y "detalle"; además "etag" si el servidor lo envía
+        y "descarga" con la ruta del fichero descargado
     """
     result = {"estado": "ERROR", "detalle": "URL no configurada"}
     if not url:
         return result
 
+    headers = {"If-None-Match": etag} if etag else {}
     try:
-        response = requests.head(url, timeout=10)
-        response.raise_for_status()
-        remote_checksum = response.headers.get("X-Checksum-SHA256", "")
-        if remote_checksum and remote_checksum == current_checksum:
-            result = {"estado": "OK", "detalle": "La plantilla está actualizada."}
-        else:
-            result = {"estado": "ADVERTENCIA", "detalle": "Hay una versión diferente disponible."}
+        with requests.get(url, headers=headers, stream=True, timeout=10) as response:
+            if response.status_code == 304:
+                return {"estado": "OK", "detalle": "La plantilla está actualizada.", "etag": etag}
+            response.raise_for_status()
+
+            up_to_date = {"estado": "OK", "detalle": "La plantilla está actualizada."}
+            outdated = {"estado": "ADVERTENCIA", "detalle": "Hay una versión diferente disponible."}
+            remote_etag = response.headers.get("ETag", "")
+            if remote_etag:
+                up_to_date["etag"] = outdated["etag"] = remote_etag
+
+            # Con la firma en cabecera no hace falta leer el cuerpo si no cambió
+            remote_checksum = response.headers.get("X-Checksum-SHA256", "")
+            if remote_checksum and remote_checksum == current_checksum:
+                return up_to_date
+            if download_to is None:
+                return outdated
+
+            if _stream_to_file(response, download_to) == current_checksum:
+                download_to.unlink(missing_ok=True)
+                return up_to_date
+            outdated["descarga"] = str(download_to)
+            result = outdated
     except Exception as exc:
         logger.exception("Error comprobando la versión remota de la plantilla")
         result = {"estado": "ERROR", "detalle": str(exc)}
     return result
 
 
-def download_template(url: str, destination: Path) -> Path:
+def _stream_to_file(response: requests.Response, destination: Path) -> str:
+    """Vuelca una respuesta en `destination` por bloques y devuelve su SHA256."""
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    sha = hashlib.sha256()
+    with destination.open("wb", buffering=DOWNLOAD_CHUNK_SIZE) as out:
+        for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+            out.write(chunk)
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def download_template(url: str, destination: Path) -> Tuple[Path, str]:
     """
     Descarga una plantilla desde la URL indicada y la guarda en destino.
+    El cuerpo se escribe a disco por bloques mientras se calcula su SHA256.
+
+    Returns:
+        Tupla (ruta de destino, SHA256 del fichero descargado)
     """
     if not url:
         raise ValueError("La URL de actualización no está configurada.")
-    destination.parent.mkdir(parents=True, exist_ok=True)
 
-    response = requests.get(url, timeout=30)
-    response.raise_for_status()
+    # Se descarga aparte y se sustituye al final: un fallo a medias no deja la plantilla rota
+    partial = destination.with_name(destination.name + ".part")
+    try:
+        with requests.get(url, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            checksum = _stream_to_file(response, partial)
+        os.replace(partial, destination)
+    finally:
+        partial.unlink(missing_ok=True)
 
-    destination.write_bytes(response.content)
     logger.info("Plantilla descargada en %s", destination)
-    return destination
+    return destination, checksum
 
 
-def compute_file_checksum(path: Path) -> str:
+def compute_file_checksum(path: Path, algorithm: str = "sha256") -> str:
     """
-    Calcula el SHA256 del fichero indicado.
+    Calcula la firma del fichero indicado.
+
+    Args:
+        path: Fichero a firmar
+        algorithm: "sha256" (el que publica el servidor de plantillas) o "blake3",
+            más rápido y multihilo, disponible si está instalado el paquete `blake3`
+
+    Returns:
+        Firma en hexadecimal
     """
-    import hashlib
+    if algorithm == "blake3":
+        if blake3 is None:
+            raise RuntimeError("El paquete 'blake3' no está instalado.")
+        return blake3(max_threads=blake3.AUTO).update_mmap(str(path)).hexdigest()
+    if algorithm != "sha256":
+        raise ValueError(f"Algoritmo de firma desconocido: {algorithm}")
 
-    sha = hashlib.sha256()
-    with path.open("rb") as fh:
-        for chunk in iter(lambda: fh.read(65536), b""):
-            sha.update(chunk)
-    return sha.hexdigest()
+    with path.open("rb", buffering=0) as fh:
+        if os.fstat(fh.fileno()).st_size >= MMAP_HASH_THRESHOLD:
+            # hashlib recorre las páginas mapeadas directamente, sin copiarlas a objetos bytes
+            try:
+                with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return hashlib.sha256(mm).hexdigest()
+            except (OSError, ValueError):
+                # Sin espacio de direcciones para mapearlo (p.ej. Python de 32 bits en Windows)
+                logger.debug("No se pudo mapear %s; se lee por bloques", path)
+        if sys.version_info >= (3, 11):
+            # Lectura y hash en C, sin pasar cada bloque por el intérprete
+            return hashlib.file_digest(fh, "sha256").hexdigest()
+        # Un único búfer reutilizado: sin crear un bytes nuevo por bloque
+        sha = hashlib.sha256()
+        buf = bytearray(HASH_BUFFER_SIZE)
+        view = memoryview(buf)
+        while n := fh.readinto(buf):
+            sha.update(view[:n])
+        return sha.hexdigest()
+
+
+def get_cached_template_checksum(path: Path) -> str:
+    """
+    Devuelve el SHA256 de una plantilla sin recalcularlo si no ha cambiado.
+    La firma se guarda en TEMPLATE_CHECKSUMS_PATH junto al mtime y el tamaño
+    del fichero; basta un stat para saber si sigue siendo válida.
+
+    Args:
+        path: Fichero de la plantilla
+
+    Returns:
+        SHA256 en hexadecimal
+    """
+    st = path.stat()
+    key = os.path.abspath(path)
+    try:
+        cache = json.loads(TEMPLATE_CHECKSUMS_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        cache = {}
+
+    entry = cache.get(key)
+    if entry and entry.get("mtime_ns") == st.st_mtime_ns and entry.get("size") == st.st_size:
+        return entry["checksum"]
+
+    checksum = compute_file_checksum(path)
+    cache[key] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "checksum": checksum}
+    try:
+        TEMPLATE_CHECKSUMS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        # Escritura atómica: un lector nunca ve el JSON a medias
+        tmp = TEMPLATE_CHECKSUMS_PATH.with_suffix(".tmp")
+        tmp.write_text(json.dumps(cache), encoding="utf-8")
+        os.replace(tmp, TEMPLATE_CHECKSUMS_PATH)
+    except OSError:
+        logger.warning("No se pudo guardar la firma de la plantilla en caché", exc_info=True)
+    return checksum
+
+
+def hash_files(paths: Sequence[Path]) -> Dict[Path, str]:
+    """
+    Calcula el SHA256 de varios ficheros en paralelo.
+    hashlib libera el GIL mientras calcula, así que los hilos avanzan a la vez.
+    """
+    if not paths:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(8, len(paths))) as pool:
+        return dict(zip(paths, pool.map(compute_file_checksum, paths)))
 
 
 __all__ = [
@@ -146,5 +366,7 @@ __all__ = [
     "check_remote_template_version",
     "download_template",
     "compute_file_checksum",
+    "get_cached_template_checksum",
+    "hash_files",
 ]
 
@@ -4,12 +4,12 @@ Refactorizado para usar el gestor de conexiones centralizado.
 """
 from __future__ import annotations
 
+import sqlite3
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Iterable, List, Dict, Optional, Sequence, Union
 
 from app.core.logging import get_logger
-from app.core.resources import DB_PATH
-from app.services.database import get_connection, execute, fetch_all, fetch_one
+from app.services.database import db_datetime, get_connection, execute, execute_many, fetch_all, fetch_one
 from app.models.offline_queue import OfflineQueueItem
 
 
@@ -19,13 +19,48 @@ logger = get_logger("services.offline")
 class OfflineQueueService:
     """Servicio para gestionar la cola de envíos offline."""
     
+    # Sentencias fijas: el mismo texto en cada llamada reutiliza la sentencia ya
+    # preparada en la caché de la conexión persistente del hilo
+    _SQL_INSERT = """
+        INSERT INTO offline_queue 
+        (xml_content, num_factura, empresa, ejercicio, cliente_doc, api_key, fecha_creacion, estado)
+        VALUES (?, ?, ?, ?, ?, ?, ?, 'PENDIENTE')
+    """
+    _SQL_PENDING = """
+        SELECT id, xml_content, num_factura, empresa, ejercicio, 
+               cliente_doc, api_key, intentos,
+               fecha_creacion AS "fecha_creacion [datetime]",
+               ultimo_intento AS "ultimo_intento [datetime]"
+        FROM offline_queue
+        WHERE estado = 'PENDIENTE'
+        ORDER BY fecha_creacion ASC
+        LIMIT ?
+    """
+    _SQL_MARK_SENT = """
+        UPDATE offline_queue
+        SET estado = 'ENVIADO', ultimo_intento = ?
+        WHERE id = ?
+    """
+    # Un solo UPDATE atómico; RETURNING (SQLite >= 3.35) da el resultado para el log
+    _SQL_MARK_FAILED = """
+        UPDATE offline_queue
+        SET intentos = intentos + 1,
+            estado = CASE WHEN intentos + 1 >= ? THEN 'FALLIDO' ELSE 'PENDIENTE' END,
+            ultimo_intento = ?
+        WHERE id = ?
+        RETURNING intentos, estado
+    """
+    _SQL_CLEAR_SENT = "DELETE FROM offline_queue WHERE estado = 'ENVIADO'"
+    _SQL_STATS = "SELECT estado, COUNT(*) FROM offline_queue GROUP BY estado"
+    _SQL_TOTAL_PENDING = "SELECT COUNT(*) FROM offline_queue WHERE estado = 'PENDIENTE'"
+    
     def __init__(self):
         """Inicializa el servicio de cola offline."""
         pass
     
     def add_to_queue(
         self,
-        xml_content: bytes,
+        xml_content: Union[bytes, bytearray, memoryview],
         invoice_id: str,
         company: str,
         exercise: str,
@@ -36,7 +71,8 @@ class OfflineQueueService:
         Añade un envío a la cola offline.
         
         Args:
-            xml_content: Contenido XML de la factura
+            xml_content: Contenido XML de la factura; cualquier buffer se guarda
+                como BLOB sin convertirlo antes a bytes
             invoice_id: Número de factura
             company: Empresa emisora
             exercise: Ejercicio fiscal
@@ -46,18 +82,12 @@ class OfflineQueueService:
         Returns:
             ID del elemento en la cola
         """
-        fecha_creacion = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        query = """
-            INSERT INTO offline_queue 
-            (xml_content, num_factura, empresa, ejercicio, cliente_doc, api_key, fecha_creacion, estado)
-            VALUES (?, ?, ?, ?, ?, ?, ?, 'PENDIENTE')
-        """
+        fecha_creacion = db_datetime(datetime.now())
         
         with get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                query,
+                self._SQL_INSERT,
                 (xml_content, invoice_id, company, exercise, customer_doc, api_key, fecha_creacion)
             )
             queue_id = cursor.lastrowid
@@ -66,6 +96,26 @@ class OfflineQueueService:
         logger.info(f"Factura {invoice_id} añadida a cola offline con ID {queue_id}")
         return queue_id
     
+    def add_many_to_queue(self, entries: Iterable[Sequence]) -> int:
+        """
+        Añade varios envíos a la cola en una sola transacción.
+        
+        Args:
+            entries: Tuplas (xml_content, invoice_id, company, exercise, customer_doc, api_key)
+            
+        Returns:
+            Número de elementos añadidos
+        """
+        fecha_creacion = db_datetime(datetime.now())
+        params = [(*entry, fecha_creacion) for entry in entries]
+        if not params:
+            return 0
+        
+        execute_many(self._SQL_INSERT, params)
+        
+        logger.info(f"{len(params)} facturas añadidas a cola offline")
+        return len(params)
+    
     def get_pending_items(self, limit: int = 50) -> List[OfflineQueueItem]:
         """
         Obtiene items pendientes de la cola.
@@ -76,16 +126,7 @@ class OfflineQueueService:
         Returns:
             Lista de items pendientes
         """
-        query = """
-            SELECT id, xml_content, num_factura, empresa, ejercicio, 
-                   cliente_doc, api_key, intentos, fecha_creacion, ultimo_intento
-            FROM offline_queue
-            WHERE estado = 'PENDIENTE'
-            ORDER BY fecha_creacion ASC
-            LIMIT ?
-        """
-        
-        rows = fetch_all(query, (limit,))
+        rows = fetch_all(self._SQL_PENDING, (limit,), detect_types=sqlite3.PARSE_COLNAMES)
         
         items = []
         for row in rows:
@@ -98,8 +139,8 @@ class OfflineQueueService:
                 customer_doc=row[5],
                 api_key=row[6],
                 attempts=row[7],
-                created_at=datetime.strptime(row[8], "%Y-%m-%d %H:%M:%S"),
-                last_attempt=datetime.strptime(row[9], "%Y-%m-%d %H:%M:%S") if row[9] else None,
+                created_at=row[8],
+                last_attempt=row[9],
                 status="PENDIENTE"
             )
             items.append(item)
@@ -114,14 +155,23 @@ class OfflineQueueService:
         Args:
             queue_id: ID del elemento en la cola
         """
-        query = """
-            UPDATE offline_queue
-            SET estado = 'ENVIADO', ultimo_intento = ?
-            WHERE id = ?
+        execute(self._SQL_MARK_SENT, (db_datetime(datetime.now()), queue_id))
+        logger.info(f"Item {queue_id} marcado como enviado")
+    
+    def mark_many_as_sent(self, queue_ids: Iterable[int]) -> None:
         """
+        Marca varios items como enviados con una única transacción.
         
-        execute(query, (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), queue_id))
-        logger.info(f"Item {queue_id} marcado como enviado")
+        Args:
+            queue_ids: IDs de los elementos en la cola
+        """
+        now = db_datetime(datetime.now())
+        params = [(now, queue_id) for queue_id in queue_ids]
+        if not params:
+            return
+        
+        execute_many(self._SQL_MARK_SENT, params)
+        logger.info(f"{len(params)} items marcados como enviados")
     
     def mark_as_failed(self, queue_id: int, error_msg: str, max_retries: int = 3) -> None:
         """
@@ -132,25 +182,12 @@ class OfflineQueueService:
             error_msg: Mensaje de error
             max_retries: Número máximo de reintentos
         """
-        # Obtener intentos actuales
-        query_select = "SELECT intentos FROM offline_queue WHERE id = ?"
-        row = fetch_one(query_select, (queue_id,))
+        with get_connection() as conn:
+            row = conn.execute(self._SQL_MARK_FAILED, (max_retries, db_datetime(datetime.now()), queue_id)).fetchone()
+            conn.commit()
         
         if row:
-            intentos = row[0] + 1
-            estado = "FALLIDO" if intentos >= max_retries else "PENDIENTE"
-            
-            query_update = """
-                UPDATE offline_queue
-                SET estado = ?, intentos = ?, ultimo_intento = ?
-                WHERE id = ?
-            """
-            
-            execute(
-                query_update,
-                (estado, intentos, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), queue_id)
-            )
-            
+            intentos, estado = row
             logger.warning(
                 f"Item {queue_id} marcado como {estado} "
                 f"(intento {intentos}/{max_retries}): {error_msg}"
@@ -163,12 +200,10 @@ class OfflineQueueService:
         Returns:
             Número de items eliminados
         """
-        query_count = "SELECT COUNT(*) FROM offline_queue WHERE estado = 'ENVIADO'"
-        count_row = fetch_one(query_count)
-        count = count_row[0] if count_row else 0
-        
-        query_delete = "DELETE FROM offline_queue WHERE estado = 'ENVIADO'"
-        execute(query_delete)
+        # rowcount del DELETE da el número de filas borradas sin un COUNT previo
+        with get_connection() as conn:
+            count = conn.execute(self._SQL_CLEAR_SENT).rowcount
+            conn.commit()
         
         logger.info(f"Eliminados {count} items enviados de la cola")
         return count
@@ -180,8 +215,7 @@ class OfflineQueueService:
         Returns:
             Diccionario con estadísticas por estado
         """
-        query = "SELECT estado, COUNT(*) FROM offline_queue GROUP BY estado"
-        rows = fetch_all(query)
+        rows = fetch_all(self._SQL_STATS)
         
         stats = {}
         for row in rows:
@@ -197,8 +231,7 @@ class OfflineQueueService:
         Returns:
             Número de items pendientes
         """
-        query = "SELECT COUNT(*) FROM offline_queue WHERE estado = 'PENDIENTE'"
-        row = fetch_one(query)
+        row = fetch_one(self._SQL_TOTAL_PENDING)
         return row[0] if row else 0
 
 
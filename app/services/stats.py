@@ -8,7 +8,7 @@ from datetime import datetime, timedelta
 from typing import Dict, Optional
 
 from app.core.logging import get_logger
-from app.services.database import get_connection
+from app.services.database import db_datetime, get_connection
 
 
 logger = get_logger("services.stats")
@@ -44,28 +44,30 @@ class StatsService:
         ):
             return self._cache
 
+        # Rango [inicio de mes, inicio del mes siguiente): comparable con el índice de fecha_envio
+        month_start = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
         try:
             with get_connection(readonly=True) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT COUNT(*) FROM envios WHERE estado = 'ÉXITO'")
-                total_success = cursor.fetchone()[0] or 0
-
-                month_key = datetime.now().strftime("%Y-%m")
-                cursor.execute(
+                # Una sola sentencia: el total sale de idx_envios_estado_fecha y el mes
+                # de un recorrido por rango del índice de fecha (cubre estado e importe)
+                total_success, month_count, month_total = conn.execute(
                     """
-                    SELECT COUNT(*), COALESCE(SUM(importe), 0.0)
+                    SELECT
+                        (SELECT COUNT(*) FROM envios WHERE estado = 'ÉXITO'),
+                        COUNT(*),
+                        COALESCE(SUM(importe), 0.0)
                     FROM envios
-                    WHERE (estado LIKE 'ÉXITO%' OR estado IN ('OK', 'SUCCESS'))
-                      AND strftime('%Y-%m', fecha_envio) = ?
+                    WHERE fecha_envio >= ? AND fecha_envio < ?
+                      AND (estado LIKE 'ÉXITO%' OR estado IN ('OK', 'SUCCESS'))
                     """,
-                    (month_key,),
-                )
-                month_count, month_total = cursor.fetchone() or (0, 0.0)
+                    (db_datetime(month_start), db_datetime(next_month)),
+                ).fetchone()
         except Exception:
             logger.exception("Error calculando estadísticas de dashboard")
             return DashboardStats(0, 0, 0.0)
 
-        stats = DashboardStats(total_success=total_success, month_count=month_count or 0, month_total=float(month_total or 0.0))
+        stats = DashboardStats(total_success=total_success or 0, month_count=month_count or 0, month_total=float(month_total or 0.0))
         self._cache = stats
         self._last_updated = datetime.now()
         return stats
@@ -2,5 +2,5 @@
 Componentes de interfaz reutilizables (widgets, diálogos, secciones).
 """
 
-__all__ = ["widgets", "dialogs", "pages"]
+__all__ = ["widgets", "dialogs", "pages", "history_model", "throttling"]
 
@@ -7,7 +7,8 @@ import json
 from pathlib import Path
 from typing import Iterable, List, Optional
 
-from PySide6.QtCore import Qt
+from PySide6.QtCore import QObject, QRunnable, Qt, QThreadPool, Signal
+from PySide6.QtGui import QBrush
 from PySide6.QtWidgets import (
     QDialog,
     QDialogButtonBox,
@@ -16,14 +17,62 @@ from PySide6.QtWidgets import (
     QLabel,
     QListWidget,
     QListWidgetItem,
+    QPlainTextEdit,
     QPushButton,
-    QTextEdit,
     QVBoxLayout,
     QWidget,
 )
 
 from app.ui.widgets import AnimatedButton
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+# Por encima de este tamaño el JSON se muestra tal cual, sin reformatear
+JSON_REFORMAT_LIMIT = 5 * 1024 * 1024
+
+# Color de cada resultado del health check; cualquier otro estado se muestra en rojo
+_STATUS_BRUSHES = {
+    "OK": QBrush(Qt.darkGreen),
+    "ADVERTENCIA": QBrush(Qt.darkYellow),
+}
+_ERROR_BRUSH = QBrush(Qt.red)
+
+
+def _format_json(raw: bytes) -> str:
+    """Devuelve el JSON indentado a 2 espacios (o tal cual si es muy grande)."""
+    if len(raw) > JSON_REFORMAT_LIMIT:
+        return raw.decode("utf-8")
+    if orjson is not None:
+        try:
+            return orjson.dumps(orjson.loads(raw), option=orjson.OPT_INDENT_2).decode("utf-8")
+        except orjson.JSONDecodeError:
+            # orjson es estricto (p.ej. rechaza NaN); json acepta lo que se aceptaba antes
+            pass
+    return json.dumps(json.loads(raw), indent=2, ensure_ascii=False)
+
+
+class _JsonLoadSignals(QObject):
+    loaded = Signal(str)
+
+
+class _JsonLoadTask(QRunnable):
+    """Lee y formatea un JSON fuera del hilo de la interfaz."""
+
+    def __init__(self, json_path: Path):
+        super().__init__()
+        self.json_path = json_path
+        self.signals = _JsonLoadSignals()
+
+    def run(self) -> None:
+        try:
+            text = _format_json(self.json_path.read_bytes())
+        except Exception as exc:
+            text = f"No se pudo cargar el JSON:\n{exc}"
+        self.signals.loaded.emit(text)
+
 
 class HealthCheckDialog(QDialog):
     def __init__(self, results: Iterable[dict], parent: Optional[QWidget] = None):
@@ -43,20 +92,21 @@ class HealthCheckDialog(QDialog):
         self.list_widget.setProperty("class", "ModernList")
         layout.addWidget(self.list_widget)
 
-        for item in results:
-            nombre = item.get("nombre", "Chequeo")
-            estado = item.get("estado", "DESCONOCIDO")
-            detalle = item.get("detalle", "")
-            text = f"{nombre} – {estado}\n{detalle}"
-            lw_item = QListWidgetItem(text)
-            lw_item.setData(Qt.UserRole, item)
-            if estado.upper() == "OK":
-                lw_item.setForeground(Qt.darkGreen)
-            elif estado.upper() == "ADVERTENCIA":
-                lw_item.setForeground(Qt.darkYellow)
-            else:
-                lw_item.setForeground(Qt.red)
-            self.list_widget.addItem(lw_item)
+        # Alta en bloque sin repintar ni emitir señales por cada elemento
+        self.list_widget.setUpdatesEnabled(False)
+        self.list_widget.blockSignals(True)
+        try:
+            for item in results:
+                nombre = item.get("nombre", "Chequeo")
+                estado = item.get("estado", "DESCONOCIDO")
+                detalle = item.get("detalle", "")
+                lw_item = QListWidgetItem(f"{nombre} – {estado}\n{detalle}")
+                lw_item.setData(Qt.UserRole, item)
+                lw_item.setForeground(_STATUS_BRUSHES.get(estado.upper(), _ERROR_BRUSH))
+                self.list_widget.addItem(lw_item)
+        finally:
+            self.list_widget.blockSignals(False)
+            self.list_widget.setUpdatesEnabled(True)
 
         button_box = QDialogButtonBox(QDialogButtonBox.Close)
         button_box.rejected.connect(self.reject)
@@ -69,6 +119,8 @@ class JsonViewerDialog(QDialog):
         super().__init__(parent)
         self.setWindowTitle(json_path.name)
         self.setMinimumSize(600, 500)
+        self._json_path = json_path
+        self._load_started = False
 
         layout = QVBoxLayout(self)
         layout.setContentsMargins(16, 16, 16, 16)
@@ -79,8 +131,11 @@ class JsonViewerDialog(QDialog):
         header.addStretch()
         layout.addLayout(header)
 
-        self.text_edit = QTextEdit()
+        # QPlainTextEdit sin ajuste de línea: maqueta documentos grandes mucho más rápido
+        self.text_edit = QPlainTextEdit()
         self.text_edit.setReadOnly(True)
+        self.text_edit.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.text_edit.setPlaceholderText("Cargando…")
         layout.addWidget(self.text_edit, 1)
 
         button_box = QDialogButtonBox(QDialogButtonBox.Close)
@@ -88,12 +143,14 @@ class JsonViewerDialog(QDialog):
         button_box.accepted.connect(self.accept)
         layout.addWidget(button_box)
 
-        try:
-            data = json.loads(json_path.read_text(encoding="utf-8"))
-            formatted = json.dumps(data, indent=2, ensure_ascii=False)
-            self.text_edit.setPlainText(formatted)
-        except Exception as exc:
-            self.text_edit.setPlainText(f"No se pudo cargar el JSON:\n{exc}")
+    def showEvent(self, event) -> None:
+        super().showEvent(event)
+        # El fichero se lee y formatea en segundo plano la primera vez que se muestra
+        if not self._load_started:
+            self._load_started = True
+            task = _JsonLoadTask(self._json_path)
+            task.signals.loaded.connect(self.text_edit.setPlainText)
+            QThreadPool.globalInstance().start(task)
 
 
 class BackupSummaryDialog(QDialog):
@@ -0,0 +1,230 @@
+"""
+Modelo Qt para la tabla de historial (QTableView + QAbstractTableModel).
+Evita crear un QTableWidgetItem por celda: Qt solo consulta `data()` de las celdas visibles.
+Con un cargador de páginas, las filas se piden a SQLite a medida que la vista se desplaza.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from operator import attrgetter
+from typing import Any, Callable, List, Optional, Sequence
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+from app.models.history import HistoryEntry
+from app.services.invoice_processing import InvoiceProcessingService
+
+# (cursor_date, cursor_id, limit) -> entradas siguientes, más recientes primero
+PageLoader = Callable[[Optional[datetime], Optional[int], int], List[HistoryEntry]]
+
+
+def _fmt_text(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+def _fmt_date(value: Any) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S") if value is not None else ""
+
+
+class HistoryTableModel(QAbstractTableModel):
+    """Expone una lista de `HistoryEntry` como modelo de tabla de solo lectura."""
+
+    # Mismas columnas que la tabla de historial de la ventana principal
+    HEADERS = (
+        "ID",
+        "Fecha",
+        "Factura",
+        "Empresa Emisora",
+        "Cliente",
+        "Importe",
+        "Estado",
+        "Detalles",
+        "PDF",
+    )
+
+    # Un getter y un formateador por columna, indexados por número de columna.
+    # Estado y PDF los pintan delegados; la columna PDF no tiene texto propio
+    _GETTERS = (
+        attrgetter("id"),
+        attrgetter("send_date"),
+        attrgetter("invoice_id"),
+        attrgetter("company"),
+        attrgetter("customer"),
+        attrgetter("amount"),
+        attrgetter("status"),
+        attrgetter("details"),
+        lambda entry: None,
+    )
+    _FORMATTERS = (
+        _fmt_text,
+        _fmt_date,
+        _fmt_text,
+        _fmt_text,
+        _fmt_text,
+        InvoiceProcessingService.format_currency_eur,
+        _fmt_text,
+        _fmt_text,
+        _fmt_text,
+    )
+    AMOUNT_COLUMN = 5
+    STATUS_COLUMN = 6
+    PDF_COLUMN = 8
+    PAGE_SIZE = 500
+
+    def __init__(self, entries: Optional[Sequence[HistoryEntry]] = None, parent=None):
+        super().__init__(parent)
+        self._entries: List[HistoryEntry] = list(entries or [])
+        self._page_loader: Optional[PageLoader] = None
+        self._page_size = self.PAGE_SIZE
+        self._has_more = False
+
+    def set_entries(
+        self,
+        entries: Sequence[HistoryEntry],
+        page_loader: Optional[PageLoader] = None,
+        page_size: int = PAGE_SIZE
+    ) -> None:
+        """
+        Sustituye el contenido del modelo con un único reset.
+        
+        Args:
+            entries: Nuevas entradas (la primera página si hay `page_loader`)
+            page_loader: Función que devuelve la página siguiente a un cursor (fecha, id)
+            page_size: Número de entradas por página
+        """
+        self.beginResetModel()
+        self._entries = list(entries)
+        self._page_loader = page_loader
+        self._page_size = page_size
+        self._has_more = page_loader is not None and len(self._entries) >= page_size
+        self.endResetModel()
+
+    def update_entries(
+        self,
+        entries: Sequence[HistoryEntry],
+        page_loader: Optional[PageLoader] = None,
+        page_size: int = PAGE_SIZE
+    ) -> None:
+        """
+        Actualiza el contenido aplicando solo las diferencias por id.
+        
+        Las filas desaparecidas se eliminan, las nuevas se insertan en su posición
+        y las modificadas emiten `dataChanged`; la vista conserva selección y scroll.
+        Si no se puede casar por id (ids nulos o repetidos, orden distinto) se
+        recurre a `set_entries`.
+        
+        Con `page_loader`, `entries` es la primera página (ya cargada, p.ej. fuera
+        del hilo de la UI) y las siguientes se piden con `fetchMore` al desplazarse;
+        las filas de páginas posteriores ya cargadas se eliminan como desaparecidas.
+        
+        Args:
+            entries: Nuevas entradas, en el orden en que deben mostrarse
+            page_loader: Función que devuelve la página siguiente a un cursor (fecha, id)
+            page_size: Número de entradas por página
+        """
+        new_entries = list(entries)
+        new_ids = [entry.id for entry in new_entries]
+        new_id_set = set(new_ids)
+        old_ids = [entry.id for entry in self._entries]
+        old_id_set = set(old_ids)
+        if (
+            not self._entries
+            or None in new_id_set
+            or len(new_id_set) != len(new_ids)
+            or len(old_id_set) != len(old_ids)
+        ):
+            self.set_entries(new_entries, page_loader, page_size)
+            return
+
+        kept_ids = [entry_id for entry_id in old_ids if entry_id in new_id_set]
+        if kept_ids != [entry_id for entry_id in new_ids if entry_id in old_id_set]:
+            # Las filas comunes cambiaron de orden: no compensa moverlas una a una
+            self.set_entries(new_entries, page_loader, page_size)
+            return
+
+        # Eliminar bloques contiguos de filas desaparecidas, de abajo arriba
+        row = len(self._entries) - 1
+        while row >= 0:
+            if self._entries[row].id in new_id_set:
+                row -= 1
+                continue
+            last = row
+            while row >= 0 and self._entries[row].id not in new_id_set:
+                row -= 1
+            self.beginRemoveRows(QModelIndex(), row + 1, last)
+            del self._entries[row + 1:last + 1]
+            self.endRemoveRows()
+
+        # Insertar bloques contiguos de filas nuevas ya en su posición final
+        row = 0
+        while row < len(new_entries):
+            if new_ids[row] in old_id_set:
+                row += 1
+                continue
+            first = row
+            while row < len(new_entries) and new_ids[row] not in old_id_set:
+                row += 1
+            self.beginInsertRows(QModelIndex(), first, row - 1)
+            self._entries[first:first] = new_entries[first:row]
+            self.endInsertRows()
+
+        # Avisar solo de las filas cuyo contenido cambió
+        last_column = len(self.HEADERS) - 1
+        for row, entry in enumerate(new_entries):
+            if self._entries[row] != entry:
+                self._entries[row] = entry
+                self.dataChanged.emit(self.index(row, 0), self.index(row, last_column))
+        self._page_loader = page_loader
+        self._page_size = page_size
+        self._has_more = page_loader is not None and len(new_entries) >= page_size
+
+    def canFetchMore(self, parent: QModelIndex = QModelIndex()) -> bool:
+        return not parent.isValid() and self._has_more
+
+    def fetchMore(self, parent: QModelIndex = QModelIndex()) -> None:
+        if not self.canFetchMore(parent):
+            return
+        last = self._entries[-1]
+        page = self._page_loader(last.send_date, last.id, self._page_size)
+        # Una página incompleta indica el final del historial
+        self._has_more = len(page) >= self._page_size
+        if not page:
+            return
+        first = len(self._entries)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self._entries.extend(page)
+        self.endInsertRows()
+
+    def entry_at(self, row: int) -> Optional[HistoryEntry]:
+        if 0 <= row < len(self._entries):
+            return self._entries[row]
+        return None
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._entries)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+        col = index.column()
+        if role == Qt.DisplayRole:
+            value = self._GETTERS[col](self._entries[index.row()])
+            return self._FORMATTERS[col](value)
+        if role == Qt.UserRole:
+            return self._entries[index.row()]
+        if role == Qt.TextAlignmentRole and col == self.AMOUNT_COLUMN:
+            return Qt.AlignRight | Qt.AlignVCenter
+        if role == Qt.ToolTipRole and col == self.PDF_COLUMN:
+            return "Abrir PDF"
+        return None
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.DisplayRole) -> Any:
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal and 0 <= section < len(self.HEADERS):
+            return self.HEADERS[section]
+        return None
+
+
+__all__ = ["HistoryTableModel"]
@@ -4,16 +4,23 @@ Maneja eventos de UI y actualización de vistas sin lógica de negocio.
 """
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Optional, List, Dict, Any
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Tuple, Callable
 from datetime import datetime
+from functools import partial
+from types import SimpleNamespace
 
-from PySide6.QtCore import QTimer
-from PySide6.QtWidgets import QMessageBox
+from PySide6.QtCore import (
+    QObject, QRunnable, QSignalBlocker, QSortFilterProxyModel, QThreadPool, QTimer, Signal,
+)
+from PySide6.QtWidgets import QComboBox, QMessageBox, QTableView, QTableWidget
 
 from app.core.logging import get_logger
-from app.core.settings import get_settings
+from app.core.settings import AppSettings, get_settings
 from app.controllers.main_controller import MainController
-from app.models.history import HistoryFilter
+from app.models.history import HistoryEntry, HistoryFilter, HistoryStats
+from app.services.invoice_processing import InvoiceProcessingService
+from app.ui.history_model import HistoryTableModel, PageLoader
+from app.ui.throttling import throttled
 
 if TYPE_CHECKING:
     from PySide6.QtWidgets import QMainWindow
@@ -21,6 +28,90 @@ if TYPE_CHECKING:
 
 logger = get_logger("ui.main_window_logic")
 
+# Formateador estático ligado una vez; el módulo ya lo carga history_model
+_format_eur = InvoiceProcessingService.format_currency_eur
+
+
+def _sync_combo_items(combo: QComboBox, sentinel: str, items: List[str]) -> None:
+    """
+    Ajusta los elementos de un combo de filtro tocando solo los que cambian.
+    
+    El elemento centinela (índice 0) se conserva; se eliminan los que ya no
+    existen y se insertan los nuevos en su posición, sin emitir señales. Si la
+    selección actual desaparece se vuelve al centinela emitiendo la señal normal,
+    ya que el filtro sí ha cambiado.
+    
+    Args:
+        combo: Combo a actualizar
+        sentinel: Texto del primer elemento ("Todas", "Todos")
+        items: Elementos que debe mostrar el combo tras el centinela, en orden
+    """
+    current = combo.currentText()
+    existing = [combo.itemText(i) for i in range(1, combo.count())]
+    if combo.count() and combo.itemText(0) == sentinel and existing == items:
+        return
+    
+    wanted = set(items)
+    with QSignalBlocker(combo):
+        if not combo.count() or combo.itemText(0) != sentinel:
+            combo.clear()
+            combo.addItem(sentinel)
+            existing = []
+        
+        # Eliminar los que ya no existen, de abajo arriba para no desplazar índices
+        for index in range(len(existing), 0, -1):
+            if existing[index - 1] not in wanted:
+                combo.removeItem(index)
+        kept = [text for text in existing if text in wanted]
+        kept_set = set(kept)
+        
+        if kept != [text for text in items if text in kept_set]:
+            # Orden distinto: más simple repoblar que mover elementos
+            while combo.count() > 1:
+                combo.removeItem(combo.count() - 1)
+            combo.addItems(items)
+        else:
+            for index, text in enumerate(items, start=1):
+                if text not in kept_set:
+                    combo.insertItem(index, text)
+        
+        # Si la selección desapareció se deja sin selección para que el paso al
+        # centinela emita la señal de cambio al desbloquear
+        index = combo.findText(current)
+        combo.setCurrentIndex(index)
+    
+    if index < 0:
+        combo.setCurrentIndex(0)
+
+
+class _HistoryLoadSignals(QObject):
+    loaded = Signal(int, list)
+
+
+class _HistoryLoadTask(QRunnable):
+    """Consulta el historial fuera del hilo de la interfaz."""
+
+    def __init__(
+        self,
+        load: Callable[[], List[HistoryEntry]],
+        generation: int,
+        signals: _HistoryLoadSignals
+    ):
+        super().__init__()
+        self.load = load
+        self.generation = generation
+        # Objeto de señales del hilo de la UI que sobrevive a la tarea: la entrega
+        # encolada se pierde si el emisor se destruye antes de procesarse
+        self.signals = signals
+
+    def run(self) -> None:
+        try:
+            entries = self.load()
+        except Exception:
+            logger.exception("Error cargando el historial")
+            return
+        self.signals.loaded.emit(self.generation, entries)
+
 
 class MainWindowLogic:
     """
@@ -28,6 +119,53 @@ class MainWindowLogic:
     Actúa como intermediario entre la UI y el controlador de negocio.
     """
     
+    # Espera tras el último cambio de filtro antes de consultar el historial
+    FILTER_DEBOUNCE_MS = 150
+    HISTORY_RELOAD_DEBOUNCE_MS = 500
+    
+    # Opciones de apariencia: tamaño de fuente (pt) y espaciado (px) por etiqueta
+    FONT_SIZES = {
+        "Pequeño": 10,
+        "Mediano": 12,
+        "Grande": 14,
+        "Muy Grande": 16
+    }
+    SPACINGS = {
+        "Compacto": 4,
+        "Normal": 8,
+        "Amplio": 12,
+        "Muy Amplio": 16
+    }
+    
+    # Periodos del dashboard: etiqueta y días hacia atrás (None = todo el historial)
+    DASHBOARD_PERIODS = (
+        ("Todo", None),
+        ("Últimos 30 días", 30),
+        ("Últimos 7 días", 7),
+    )
+    
+    # Botones del diálogo de confirmación, combinados una vez
+    _YES_NO = QMessageBox.Yes | QMessageBox.No
+    
+    # Widgets y métodos opcionales de la ventana, resueltos una vez en `_bind_widgets`
+    _WIDGET_NAMES = (
+        'combo_filter_company',
+        'combo_filter_customer',
+        'combo_filter_status',
+        'history_search',
+        'table_history',
+        'combo_dashboard_company',
+        'combo_dashboard_period',
+        'label_total_invoices',
+        'label_success_rate',
+        'label_total_amount',
+        'toast_widget',
+        '_update_send_badge',
+        '_refresh_styles',
+        '_history_table_updated',
+        'load_history',
+    )
+    
     def __init__(self, main_window: QMainWindow):
         """
         Inicializa la lógica de UI.
@@ -37,18 +175,80 @@ class MainWindowLogic:
         """
         self.ui = main_window
         self.settings = get_settings()
+        # Método ligado una vez: los manejadores de señales lo llaman directamente
+        self._set_setting = self.settings.set_value
         self.controller = MainController()
+        self.history_model = HistoryTableModel()
+        self._bind_widgets()
         
         # Estado de la UI
         self.current_page_index: int = 0
-        self.history_reload_timer: Optional[QTimer] = None
         self.toast_timer: Optional[QTimer] = None
+        # Versión de datos del controlador con la que se poblaron los combos de filtro
+        self._filter_combos_version: Optional[int] = None
+        # Número de la última carga de historial lanzada; las respuestas anteriores se descartan
+        self._history_generation: int = 0
+        # Cargador de páginas (y tamaño) de la carga en curso; None si no es paginada
+        self._history_pager: Optional[Tuple[PageLoader, int]] = None
+        self._history_signals = _HistoryLoadSignals()
+        self._history_signals.loaded.connect(self._on_history_loaded)
+        
+        # Cambios rápidos en los filtros se agrupan en una sola consulta
+        self._filter_debounce = QTimer()
+        self._filter_debounce.setSingleShot(True)
+        self._filter_debounce.setInterval(self.FILTER_DEBOUNCE_MS)
+        self._filter_debounce.timeout.connect(self._do_apply_history_filters)
+        
+        # Ráfagas de escrituras en el historial se agrupan en una sola recarga
+        self._reload_debounce = QTimer()
+        self._reload_debounce.setSingleShot(True)
+        self._reload_debounce.setInterval(self.HISTORY_RELOAD_DEBOUNCE_MS)
+        self._reload_debounce.timeout.connect(self._execute_history_reload)
+    
+    def _bind_widgets(self) -> None:
+        """Resuelve los widgets opcionales de la ventana; los ausentes quedan en None."""
+        self._w = SimpleNamespace(**{name: getattr(self.ui, name, None) for name in self._WIDGET_NAMES})
     
     def setup_connections(self) -> None:
         """Configura las conexiones de señales y slots."""
         # Este método se llamaría desde MainWindow.__init__
-        # para conectar señales a métodos de esta clase
-        pass
+        # para conectar señales a métodos de esta clase.
+        # La UI ya está construida: se vuelven a resolver sus widgets
+        self._bind_widgets()
+        w = self._w
+        if self._accepts_history_model(w.table_history):
+            self._adopt_history_model(w.table_history)
+        
+        if w.load_history is None:
+            # Una ventana con su propio load_history conecta también sus filtros;
+            # aquí solo se repetiría la carga con un subconjunto de ellos
+            for combo in (w.combo_filter_company, w.combo_filter_customer, w.combo_filter_status):
+                if combo is not None:
+                    combo.currentTextChanged.connect(self._filter_debounce.start)
+            
+            if w.history_search is not None:
+                w.history_search.textChanged.connect(self._filter_debounce.start)
+        
+        if w.combo_dashboard_period is not None:
+            self._setup_dashboard_periods(w.combo_dashboard_period)
+    
+    def _setup_dashboard_periods(self, combo: QComboBox) -> None:
+        """
+        Puebla el combo con DASHBOARD_PERIODS, con los días de cada periodo como dato del elemento.
+        Si la vista ya lo había poblado se sustituyen sus elementos, conservando la selección.
+        
+        Args:
+            combo: Combo de periodo del dashboard
+        """
+        current = combo.currentText()
+        blocker = QSignalBlocker(combo)
+        try:
+            combo.clear()
+            for label, days in self.DASHBOARD_PERIODS:
+                combo.addItem(label, days)
+            combo.setCurrentIndex(max(combo.findText(current), 0))
+        finally:
+            blocker.unblock()
     
     def change_page(self, index: int) -> None:
         """
@@ -58,11 +258,11 @@ class MainWindowLogic:
             index: Índice de la página a mostrar
         """
         self.current_page_index = index
-        logger.debug(f"Cambiando a página {index}")
+        logger.debug("Cambiando a página %d", index)
         
         # Actualizar badge de notificaciones si es necesario
-        if hasattr(self.ui, '_update_send_badge'):
-            self.ui._update_send_badge()
+        if self._w._update_send_badge is not None:
+            self._w._update_send_badge()
     
     def toggle_theme(self, checked: bool) -> None:
         """
@@ -72,50 +272,67 @@ class MainWindowLogic:
             checked: True para tema oscuro, False para tema claro
         """
         theme = "dark" if checked else "light"
-        self.settings.set_value(self.settings.KEY_THEME, theme)
+        self._set_setting(AppSettings.KEY_THEME, theme)
         
-        logger.info(f"Tema cambiado a: {theme}")
+        logger.info("Tema cambiado a: %s", theme)
         
         # Refrescar estilos
-        if hasattr(self.ui, '_refresh_styles'):
-            self.ui._refresh_styles()
+        if self._w._refresh_styles is not None:
+            self._w._refresh_styles()
     
     def apply_history_filters(self) -> None:
+        """Programa la aplicación de los filtros (con debouncing de FILTER_DEBOUNCE_MS)."""
+        self._filter_debounce.start()
+    
+    def _do_apply_history_filters(self) -> None:
         """Aplica los filtros seleccionados al historial."""
         # Construir objeto de filtros desde los widgets de la UI
         filters = HistoryFilter()
+        w = self._w
         
         # Obtener valores de los combos/inputs de filtro
-        if hasattr(self.ui, 'combo_filter_company'):
-            company = self.ui.combo_filter_company.currentText()
+        if w.combo_filter_company is not None:
+            company = w.combo_filter_company.currentText()
             if company and company != "Todas":
                 filters.company = company
         
-        if hasattr(self.ui, 'combo_filter_customer'):
-            customer = self.ui.combo_filter_customer.currentText()
+        if w.combo_filter_customer is not None:
+            customer = w.combo_filter_customer.currentText()
             if customer and customer != "Todos":
                 filters.customer = customer
         
-        if hasattr(self.ui, 'combo_filter_status'):
-            status = self.ui.combo_filter_status.currentText()
+        if w.combo_filter_status is not None:
+            status = w.combo_filter_status.currentText()
             if status and status != "Todos":
                 filters.status = status
         
+        if w.history_search is not None:
+            search_text = w.history_search.text().strip()
+            if search_text:
+                filters.search_text = search_text
+        
         # Cargar historial con filtros
         self.load_history_with_filters(filters)
     
     def clear_history_filters(self) -> None:
         """Limpia todos los filtros del historial."""
-        if hasattr(self.ui, 'combo_filter_company'):
-            self.ui.combo_filter_company.setCurrentIndex(0)
-        
-        if hasattr(self.ui, 'combo_filter_customer'):
-            self.ui.combo_filter_customer.setCurrentIndex(0)
-        
-        if hasattr(self.ui, 'combo_filter_status'):
-            self.ui.combo_filter_status.setCurrentIndex(0)
-        
-        # Recargar sin filtros
+        # Con las señales bloqueadas los combos no programan recargas intermedias
+        w = self._w
+        combos = [
+            combo
+            for combo in (w.combo_filter_company, w.combo_filter_customer, w.combo_filter_status)
+            if combo is not None
+        ]
+        blockers = [QSignalBlocker(combo) for combo in combos]
+        try:
+            for combo in combos:
+                combo.setCurrentIndex(0)
+        finally:
+            for blocker in blockers:
+                blocker.unblock()
+        
+        # Recargar sin filtros una sola vez
+        self._filter_debounce.stop()
         self.load_history_with_filters(None)
     
     def load_history_with_filters(self, filters: Optional[HistoryFilter]) -> None:
@@ -125,77 +342,189 @@ class MainWindowLogic:
         Args:
             filters: Filtros a aplicar, None para cargar todo
         """
-        entries = self.controller.load_history(filters)
+        if self._accepts_history_model(self._w.table_history):
+            # Vista con modelo propio: se cargan páginas a medida que se desplaza
+            self.load_history_pages(
+                lambda cursor_date, cursor_id, limit: self.controller.load_history_page(
+                    filters, cursor_date, limit, cursor_id
+                )
+            )
+            return
         
-        # Actualizar tabla de historial
-        if hasattr(self.ui, 'table_history'):
-            self.ui.table_history.setRowCount(0)
-            
-            for entry in entries:
-                row_position = self.ui.table_history.rowCount()
-                self.ui.table_history.insertRow(row_position)
-                
-                # Aquí iría el código para poblar la tabla
-                # (simplificado para este ejemplo)
+        self.load_history_async(partial(self.controller.load_history, filters))
+    
+    def load_history_pages(self, page_loader: PageLoader, page_size: Optional[int] = None) -> None:
+        """
+        Carga el historial por páginas: la primera en el pool de hilos, el resto con `fetchMore`.
+        
+        Args:
+            page_loader: Función (fecha, id, límite) que devuelve la página siguiente al cursor
+            page_size: Número de entradas por página; por defecto el del controlador
+        """
+        if page_size is None:
+            page_size = self.controller.HISTORY_PAGE_SIZE
+        self.load_history_async(partial(page_loader, None, None, page_size))
+        self._history_pager = (page_loader, page_size)
+    
+    def load_history_async(self, load: Callable[[], List[HistoryEntry]]) -> None:
+        """
+        Ejecuta una carga del historial en el pool de hilos y rellena la tabla al llegar.
         
-        logger.info(f"Historial cargado: {len(entries)} entradas")
+        Args:
+            load: Función sin argumentos que devuelve las entradas; corre fuera del hilo de la UI
+        """
+        # La tabla se rellena en el hilo de la UI; una carga posterior descarta esta
+        self._history_generation += 1
+        self._history_pager = None
+        task = _HistoryLoadTask(load, self._history_generation, self._history_signals)
+        QThreadPool.globalInstance().start(task)
+    
+    def _on_history_loaded(self, generation: int, entries: List[HistoryEntry]) -> None:
+        """
+        Recibe en el hilo de la UI el resultado de una carga del historial.
+        
+        Args:
+            generation: Número de la carga que produjo las entradas
+            entries: Entradas devueltas por el controlador
+        """
+        if generation != self._history_generation:
+            # Otra carga más reciente está en curso o ya se aplicó
+            return
+        if self._history_pager is not None:
+            page_loader, page_size = self._history_pager
+            self._populate_history_table(entries, page_loader, page_size)
+        else:
+            self._populate_history_table(entries)
+        
+        logger.info("Historial cargado: %d entradas", len(entries))
+    
+    def _populate_history_table(
+        self,
+        entries: List[HistoryEntry],
+        page_loader: Optional[PageLoader] = None,
+        page_size: int = HistoryTableModel.PAGE_SIZE
+    ) -> None:
+        """
+        Vuelca las entradas en el modelo de la tabla de historial.
+        Solo se tocan las filas añadidas, eliminadas o modificadas desde la última carga.
+        
+        Args:
+            entries: Entradas devueltas por el controlador (la primera página si se pagina)
+            page_loader: Cargador de las páginas siguientes, None si `entries` es el total
+            page_size: Número de entradas por página
+        """
+        self.history_model.update_entries(entries, page_loader, page_size)
+        
+        table = self._w.table_history
+        if self._accepts_history_model(table):
+            self._attach_history_model(table)
+        if self._w._history_table_updated is not None:
+            self._w._history_table_updated(entries)
+    
+    @staticmethod
+    def _accepts_history_model(table: Any) -> bool:
+        # QTableWidget gestiona su propio modelo; solo las vistas puras aceptan uno externo
+        return isinstance(table, QTableView) and not isinstance(table, QTableWidget)
+    
+    def _adopt_history_model(self, table: QTableView) -> None:
+        """Usa el HistoryTableModel que ya trae la vista (delegados y cabecera configurados)."""
+        model = table.model()
+        if isinstance(model, QSortFilterProxyModel):
+            model = model.sourceModel()
+        if isinstance(model, HistoryTableModel):
+            self.history_model = model
+    
+    def _attach_history_model(self, table: QTableView) -> None:
+        model = table.model()
+        if isinstance(model, QSortFilterProxyModel):
+            # Búsqueda de TableTools intercalada: el modelo va detrás del proxy
+            if model.sourceModel() is not self.history_model:
+                model.setSourceModel(self.history_model)
+        elif model is not self.history_model:
+            table.setModel(self.history_model)
+    
+    def invalidate_stats_cache(self) -> None:
+        """Fuerza a que la próxima consulta de estadísticas y listas vaya a la base de datos."""
+        self.controller.invalidate_caches()
     
     def queue_history_reload(self, apply_filters: bool = True, immediate: bool = False) -> None:
         """
         Programa una recarga del historial con debouncing.
+        Se llama tras escribir en el historial, así que invalida las lecturas memorizadas.
         
         Args:
             apply_filters: Si se deben aplicar los filtros actuales
             immediate: Si se debe recargar inmediatamente
         """
-        if self.history_reload_timer is None:
-            self.history_reload_timer = QTimer()
-            self.history_reload_timer.setSingleShot(True)
-            self.history_reload_timer.timeout.connect(self._execute_history_reload)
+        self.invalidate_stats_cache()
         
         if immediate:
+            # Cancelar la recarga pendiente para no repetirla al vencer el temporizador
+            self._reload_debounce.stop()
             self._execute_history_reload()
         else:
-            # Debouncing: esperar 500ms antes de recargar
-            self.history_reload_timer.start(500)
+            # start() reinicia el temporizador: solo se recarga tras la última llamada
+            self._reload_debounce.start()
     
     def _execute_history_reload(self) -> None:
         """Ejecuta la recarga del historial."""
-        self.apply_history_filters()
+        self._do_apply_history_filters()
     
-    def update_dashboard_stats(self) -> None:
-        """Actualiza las estadísticas del dashboard."""
-        # Obtener filtros del dashboard
+    def refresh_all(self, filters: Optional[HistoryFilter]) -> None:
+        """
+        Refresca historial, dashboard y combos de filtro con una sola llamada al controlador.
+        
+        Args:
+            filters: Filtros del historial, None para cargar todo
+        """
+        self.invalidate_stats_cache()
+        company, period_days = self._dashboard_filters()
+        paged = self._accepts_history_model(self._w.table_history)
+        bundle = self.controller.get_dashboard_bundle(filters, company, period_days, with_entries=not paged)
+        
+        if paged:
+            self.load_history_with_filters(filters)
+        else:
+            # Una carga en segundo plano anterior ya no debe sobrescribir este resultado
+            self._history_generation += 1
+            self._history_pager = None
+            self._populate_history_table(bundle.entries)
+        self._show_dashboard_stats(bundle.stats)
+        self._filter_combos_version = self.controller.data_version
+        self._apply_filter_options(bundle.companies, bundle.customers)
+    
+    def _dashboard_filters(self) -> Tuple[Optional[str], Optional[int]]:
+        """Devuelve (empresa, días del periodo) seleccionados en el dashboard."""
+        w = self._w
         company = None
         period_days = None
         
-        if hasattr(self.ui, 'combo_dashboard_company'):
-            company_text = self.ui.combo_dashboard_company.currentText()
+        if w.combo_dashboard_company is not None:
+            company_text = w.combo_dashboard_company.currentText()
             if company_text and company_text != "Todas":
                 company = company_text
         
-        if hasattr(self.ui, 'combo_dashboard_period'):
-            period_text = self.ui.combo_dashboard_period.currentText()
-            if "30 días" in period_text:
-                period_days = 30
-            elif "7 días" in period_text:
-                period_days = 7
-        
-        # Obtener estadísticas
-        stats = self.controller.get_history_stats(company, period_days)
-        
-        # Actualizar widgets del dashboard
-        if hasattr(self.ui, 'label_total_invoices'):
-            self.ui.label_total_invoices.setText(str(stats.total_invoices))
+        if w.combo_dashboard_period is not None:
+            period_days = w.combo_dashboard_period.currentData()
+        return company, period_days
+    
+    @throttled(200)
+    def update_dashboard_stats(self) -> None:
+        """Actualiza las estadísticas del dashboard (como mucho una vez cada 200 ms)."""
+        company, period_days = self._dashboard_filters()
+        self._show_dashboard_stats(self.controller.get_history_stats(company, period_days))
+    
+    def _show_dashboard_stats(self, stats: HistoryStats) -> None:
+        """Vuelca unas estadísticas en las etiquetas del dashboard."""
+        w = self._w
+        if w.label_total_invoices is not None:
+            w.label_total_invoices.setText(str(stats.total_invoices))
         
-        if hasattr(self.ui, 'label_success_rate'):
-            self.ui.label_success_rate.setText(f"{stats.success_rate:.1f}%")
+        if w.label_success_rate is not None:
+            w.label_success_rate.setText(f"{stats.success_rate:.1f}%")
         
-        if hasattr(self.ui, 'label_total_amount'):
-            from app.services.invoice_processing import get_invoice_processing_service
-            service = get_invoice_processing_service()
-            amount_text = service.format_currency_eur(stats.total_amount)
-            self.ui.label_total_amount.setText(amount_text)
+        if w.label_total_amount is not None:
+            w.label_total_amount.setText(_format_eur(stats.total_amount))
         
         logger.debug("Dashboard actualizado")
     
@@ -213,13 +542,14 @@ class MainWindowLogic:
             duration: Duración en milisegundos
             color_class: Clase de color (info, success, warning, error)
         """
-        if not hasattr(self.ui, 'toast_widget'):
+        toast = self._w.toast_widget
+        if toast is None:
             return
         
         # Configurar el widget toast
-        self.ui.toast_widget.setText(message)
-        self.ui.toast_widget.setProperty("class", f"toast-{color_class}")
-        self.ui.toast_widget.setVisible(True)
+        toast.setText(message)
+        toast.setProperty("class", f"toast-{color_class}")
+        toast.setVisible(True)
         
         # Programar ocultación
         if self.toast_timer is None:
@@ -229,12 +559,12 @@ class MainWindowLogic:
         
         self.toast_timer.start(duration)
         
-        logger.debug(f"Toast mostrado: {message}")
+        logger.debug("Toast mostrado: %s", message)
     
     def hide_toast(self) -> None:
         """Oculta la notificación toast."""
-        if hasattr(self.ui, 'toast_widget'):
-            self.ui.toast_widget.setVisible(False)
+        if self._w.toast_widget is not None:
+            self._w.toast_widget.setVisible(False)
     
     def show_error_dialog(self, title: str, message: str) -> None:
         """
@@ -245,7 +575,7 @@ class MainWindowLogic:
             message: Mensaje de error
         """
         QMessageBox.critical(self.ui, title, message)
-        logger.error(f"Error mostrado: {title} - {message}")
+        logger.error("Error mostrado: %s - %s", title, message)
     
     def show_success_dialog(self, title: str, message: str) -> None:
         """
@@ -256,7 +586,7 @@ class MainWindowLogic:
             message: Mensaje de éxito
         """
         QMessageBox.information(self.ui, title, message)
-        logger.info(f"Éxito mostrado: {title} - {message}")
+        logger.info("Éxito mostrado: %s - %s", title, message)
     
     def show_confirmation_dialog(
         self,
@@ -277,44 +607,38 @@ class MainWindowLogic:
             self.ui,
             title,
             message,
-            QMessageBox.Yes | QMessageBox.No,
+            self._YES_NO,
             QMessageBox.No
         )
         
         confirmed = reply == QMessageBox.Yes
-        logger.debug(f"Confirmación: {title} - {'Aceptado' if confirmed else 'Cancelado'}")
+        logger.debug("Confirmación: %s - %s", title, "Aceptado" if confirmed else "Cancelado")
         
         return confirmed
     
     def populate_filter_combos(self) -> None:
-        """Puebla los combos de filtro con datos del historial."""
-        # Obtener listas únicas
-        companies = self.controller.get_companies_list()
-        customers = self.controller.get_customers_list()
+        """
+        Puebla los combos de filtro con datos del historial.
+        No hace nada si el historial no ha cambiado desde la última vez.
+        """
+        version = self.controller.data_version
+        if version == self._filter_combos_version:
+            return
+        self._filter_combos_version = version
         
+        # Obtener listas únicas
+        self._apply_filter_options(self.controller.get_companies_list(), self.controller.get_customers_list())
+    
+    def _apply_filter_options(self, companies: List[str], customers: List[str]) -> None:
+        """Actualiza los combos de filtro con las empresas y clientes dados."""
         # Actualizar combo de empresas
-        if hasattr(self.ui, 'combo_filter_company'):
-            current_company = self.ui.combo_filter_company.currentText()
-            self.ui.combo_filter_company.clear()
-            self.ui.combo_filter_company.addItem("Todas")
-            self.ui.combo_filter_company.addItems(companies)
-            
-            # Restaurar selección si existe
-            index = self.ui.combo_filter_company.findText(current_company)
-            if index >= 0:
-                self.ui.combo_filter_company.setCurrentIndex(index)
+        # Solo se añaden o quitan los elementos que cambian, conservando la selección
+        if self._w.combo_filter_company is not None:
+            _sync_combo_items(self._w.combo_filter_company, "Todas", companies)
         
         # Actualizar combo de clientes
-        if hasattr(self.ui, 'combo_filter_customer'):
-            current_customer = self.ui.combo_filter_customer.currentText()
-            self.ui.combo_filter_customer.clear()
-            self.ui.combo_filter_customer.addItem("Todos")
-            self.ui.combo_filter_customer.addItems(customers)
-            
-            # Restaurar selección si existe
-            index = self.ui.combo_filter_customer.findText(current_customer)
-            if index >= 0:
-                self.ui.combo_filter_customer.setCurrentIndex(index)
+        if self._w.combo_filter_customer is not None:
+            _sync_combo_items(self._w.combo_filter_customer, "Todos", customers)
         
         logger.debug("Combos de filtro poblados")
     
@@ -325,21 +649,14 @@ class MainWindowLogic:
         Args:
             size_text: Texto del tamaño (ej: "Mediano")
         """
-        size_map = {
-            "Pequeño": 10,
-            "Mediano": 12,
-            "Grande": 14,
-            "Muy Grande": 16
-        }
-        
-        size = size_map.get(size_text, 12)
+        size = self.FONT_SIZES.get(size_text, 12)
         
         # Aplicar tamaño de fuente
         if hasattr(self.ui, 'setStyleSheet'):
             # Aquí iría la lógica para actualizar el stylesheet
             pass
         
-        logger.info(f"Tamaño de fuente cambiado a: {size_text} ({size}pt)")
+        logger.info("Tamaño de fuente cambiado a: %s (%spt)", size_text, size)
     
     def apply_spacing(self, spacing_text: str) -> None:
         """
@@ -348,21 +665,14 @@ class MainWindowLogic:
         Args:
             spacing_text: Texto del espaciado (ej: "Normal")
         """
-        spacing_map = {
-            "Compacto": 4,
-            "Normal": 8,
-            "Amplio": 12,
-            "Muy Amplio": 16
-        }
-        
-        spacing = spacing_map.get(spacing_text, 8)
+        spacing = self.SPACINGS.get(spacing_text, 8)
         
         # Aplicar espaciado
         if hasattr(self.ui, 'setStyleSheet'):
             # Aquí iría la lógica para actualizar el stylesheet
             pass
         
-        logger.info(f"Espaciado cambiado a: {spacing_text} ({spacing}px)")
+        logger.info("Espaciado cambiado a: %s (%spx)", spacing_text, spacing)
 
 
 __all__ = ["MainWindowLogic"]
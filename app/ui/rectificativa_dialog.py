@@ -5,12 +5,13 @@ Asistente gráfico para crear facturas rectificativas en FactuNabo
 
 from PySide6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, 
-    QPushButton, QLineEdit, QTextEdit, QGroupBox, QRadioButton,
-    QButtonGroup, QWidget, QStackedWidget, QMessageBox, QCompleter
+    QPushButton, QLineEdit, QGroupBox, QRadioButton, QScrollArea, QFrame,
+    QButtonGroup, QWidget, QStackedWidget, QMessageBox, QCompleter, QFormLayout,
+    QGridLayout, QListView
 )
-from PySide6.QtCore import Qt, Signal
+from PySide6.QtCore import Qt, Signal, QStringListModel, QTimer, QSignalBlocker
 from PySide6.QtGui import QFont
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 import pandas as pd
 
 
@@ -27,17 +28,154 @@ class RectificativaDialog(QDialog):
     
     factura_created = Signal(dict)  # Emite los datos de la factura rectificativa creada
     
+    # El desplegable solo muestra las primeras coincidencias con lo escrito
+    MAX_FACTURA_ITEMS = 50
+    FACTURA_FILTER_MS = 150
+    COMPLETER_VISIBLE_ITEMS = 15
+    
+    # Textos del botón de avance
+    _NEXT_TEXT = "Siguiente ➡️"
+    _CREATE_TEXT = "✅ Crear Rectificativa"
+    
+    # Textos fijos del asistente: se definen una vez y no en cada señal
+    _EXPLICACIONES_HTML = {
+        "R1": """<h3>Error en IVA, descuentos o devoluciones (R1)</h3>
+<p><b>Cuándo usar:</b></p>
+<ul>
+<li>Has aplicado un tipo de IVA incorrecto</li>
+<li>Necesitas aplicar un descuento posterior a la emisión</li>
+<li>El cliente devuelve mercancía (factura de abono)</li>
+<li>Error fundado en derecho</li>
+</ul>
+<p><b>Base legal:</b> Art. 80.1, 80.2 y 80.6 de la Ley del IVA</p>""",
+        
+        "R2": """<h3>Cliente en concurso de acreedores (R2)</h3>
+<p><b>Cuándo usar:</b></p>
+<ul>
+<li>El cliente ha entrado en concurso de acreedores</li>
+<li>No puede pagar la factura por esta causa</li>
+</ul>
+<p><b>Base legal:</b> Art. 80.3 de la Ley del IVA</p>""",
+        
+        "R3": """<h3>Crédito incobrable (R3)</h3>
+<p><b>Cuándo usar:</b></p>
+<ul>
+<li>Has agotado las vías de reclamación</li>
+<li>El crédito se declara total o parcialmente incobrable</li>
+</ul>
+<p><b>Base legal:</b> Art. 80.4 de la Ley del IVA</p>""",
+        
+        "R4": """<h3>Error en datos o descripción (R4)</h3>
+<p><b>Cuándo usar:</b></p>
+<ul>
+<li>Error en el NIF, nombre o dirección del cliente</li>
+<li>Error en la descripción del producto/servicio</li>
+<li>Error en la fecha o número de factura</li>
+<li>Cualquier otro error no incluido en R1, R2 o R3</li>
+</ul>
+<p><b>Base legal:</b> Resto de causas de rectificación</p>"""
+    }
+    
+    # Columnas de la factura que usa el asistente y su valor si faltan
+    _FACTURA_COLUMNS = {"NumFactura": "", "cliente_nombre": "", "fecha_emision": "", "total_ah": 0}
+    
+    # Estilos del resumen en un único bloque <style> en lugar de repetirlos en cada
+    # celda, así el HTML que se analiza en cada paso es mucho más corto
+    _RESUMEN_CSS = (
+        "td { padding: 10px; border: 1px solid #ddd; }"
+        " tr.alt { background-color: #f0f0f0; }"
+    )
+    _RESUMEN_STYLE = f"<style>{_RESUMEN_CSS}</style>"
+    _RESUMEN_HTML = """
+<h2>Resumen de la Factura Rectificativa</h2>
+
+<table style="width: 100%; border-collapse: collapse; margin-top: 20px;">
+<tr class="alt"><td><b>Motivo:</b></td><td>{motivo_text}</td></tr>
+<tr><td><b>Código:</b></td><td>{motivo_code}</td></tr>
+<tr class="alt"><td><b>Factura Original:</b></td><td>{num_factura}</td></tr>
+<tr><td><b>Cliente:</b></td><td>{cliente}</td></tr>
+<tr class="alt"><td><b>Modalidad:</b></td><td>{modalidad_text}</td></tr>
+</table>
+
+<div style="margin-top: 20px; padding: 15px; background-color: #e8f5e9; border-left: 4px solid #4caf50;">
+<p><b>✅ Todo listo para crear la factura rectificativa</b></p>
+<p>Al hacer clic en "Crear Rectificativa", se generará una nueva factura con los datos correctos.</p>
+</div>
+"""
+    
+    # Fuentes compartidas; QFont necesita una QApplication, por eso se crean
+    # en el primer __init__ y no al definir la clase
+    _TITLE_FONT: Optional[QFont] = None
+    _STEP_FONT: Optional[QFont] = None
+    _BOLD_FONT: Optional[QFont] = None
+    
     def __init__(self, parent=None, facturas_disponibles: Optional[pd.DataFrame] = None):
         super().__init__(parent)
-        self.facturas_disponibles = facturas_disponibles if facturas_disponibles is not None else pd.DataFrame()
-        self.factura_seleccionada = None
+        self._source_facturas = facturas_disponibles
+        self.facturas_disponibles = self._prepare_facturas(facturas_disponibles)
+        self._selected_row: Optional[int] = None
+        # Último motivo mostrado: setHtml vuelve a maquetar aunque el texto no cambie
+        self._last_motivo: Optional[str] = None
         self.datos_rectificativa = {}
+        # Etiqueta de cada factura (por fila del DataFrame) y su versión para búsqueda
+        self._facturas_list: List[str] = []
+        self._facturas_folded: List[str] = []
+        # Columnas usadas de cada factura como tuplas con nombre, indexadas por fila
+        self._facturas_rows: List[tuple] = []
         
         self.setWindowTitle("Crear Factura Rectificativa")
         self.setMinimumSize(700, 600)
         self.setModal(True)
         
+        self._init_fonts()
         self._init_ui()
+    
+    @staticmethod
+    def _prepare_facturas(facturas: Optional[pd.DataFrame]) -> pd.DataFrame:
+        """
+        Deja el histórico listo para el asistente en una sola pasada.
+        
+        Quita las filas vacías y ordena por fecha de emisión descendente, de modo
+        que el desplegable limitado muestre primero las facturas más recientes.
+        Las fechas que no se pueden interpretar quedan al final en su orden original.
+        
+        Args:
+            facturas: Histórico de facturas o None
+            
+        Returns:
+            DataFrame nuevo con índice posicional (el original no se modifica)
+        """
+        if facturas is None or facturas.empty:
+            return pd.DataFrame()
+        
+        facturas = facturas.dropna(how="all").reset_index(drop=True)
+        if "fecha_emision" in facturas.columns:
+            fechas = pd.to_datetime(facturas["fecha_emision"], errors="coerce", format="ISO8601")
+            order = fechas.sort_values(ascending=False, kind="stable", na_position="last").index
+            facturas = facturas.iloc[order].reset_index(drop=True)
+        return facturas
+    
+    @property
+    def factura_seleccionada(self) -> Optional[pd.Series]:
+        """Fila completa de la factura elegida; se obtiene del DataFrame solo al pedirla"""
+        if self._selected_row is None:
+            return None
+        return self.facturas_disponibles.iloc[self._selected_row]
+    
+    @classmethod
+    def _init_fonts(cls) -> None:
+        """Crea las fuentes compartidas la primera vez que se abre el asistente"""
+        if cls._TITLE_FONT is not None:
+            return
+        title_font = QFont()
+        title_font.setPointSize(16)
+        title_font.setBold(True)
+        step_font = QFont()
+        step_font.setPointSize(12)
+        step_font.setBold(True)
+        bold_font = QFont()
+        bold_font.setBold(True)
+        cls._TITLE_FONT, cls._STEP_FONT, cls._BOLD_FONT = title_font, step_font, bold_font
         
     def _init_ui(self):
         """Inicializa la interfaz del asistente"""
@@ -45,10 +183,7 @@ class RectificativaDialog(QDialog):
         
         # Título
         title = QLabel("Asistente de Factura Rectificativa")
-        title_font = QFont()
-        title_font.setPointSize(16)
-        title_font.setBold(True)
-        title.setFont(title_font)
+        title.setFont(self._TITLE_FONT)
         title.setAlignment(Qt.AlignCenter)
         layout.addWidget(title)
         
@@ -58,24 +193,23 @@ class RectificativaDialog(QDialog):
         subtitle.setStyleSheet("color: #666; margin-bottom: 20px;")
         layout.addWidget(subtitle)
         
-        # Contenedor de pasos
+        # Contenedor de pasos: cada página se construye al llegar a ella por primera
+        # vez (la de factura rellena el combo con todo el histórico)
         self.stacked_widget = QStackedWidget()
-        
-        # Paso 1: Selección del motivo
-        self.page_motivo = self._create_page_motivo()
-        self.stacked_widget.addWidget(self.page_motivo)
-        
-        # Paso 2: Selección de factura original
-        self.page_factura = self._create_page_factura()
-        self.stacked_widget.addWidget(self.page_factura)
-        
-        # Paso 3: Modalidad de rectificación
-        self.page_modalidad = self._create_page_modalidad()
-        self.stacked_widget.addWidget(self.page_modalidad)
-        
-        # Paso 4: Confirmación
-        self.page_confirmacion = self._create_page_confirmacion()
-        self.stacked_widget.addWidget(self.page_confirmacion)
+        self._page_builders = (
+            ("page_motivo", self._create_page_motivo),              # Paso 1: Motivo
+            ("page_factura", self._create_page_factura),            # Paso 2: Factura original
+            ("page_modalidad", self._create_page_modalidad),        # Paso 3: Modalidad
+            ("page_confirmacion", self._create_page_confirmacion),  # Paso 4: Confirmación
+        )
+        self._n_pages = len(self._page_builders)
+        self._pages_built = [False] * self._n_pages
+        for _ in self._page_builders:
+            self.stacked_widget.addWidget(QWidget())
+        self._ensure_page(0)
+        # El resumen se rehace al llegar al último paso solo si algo cambió
+        self._resumen_dirty = True
+        self.stacked_widget.currentChanged.connect(self._on_page_changed)
         
         layout.addWidget(self.stacked_widget)
         
@@ -86,7 +220,7 @@ class RectificativaDialog(QDialog):
         self.btn_anterior.clicked.connect(self._go_previous)
         self.btn_anterior.setEnabled(False)
         
-        self.btn_siguiente = QPushButton("Siguiente ➡️")
+        self.btn_siguiente = QPushButton(self._NEXT_TEXT)
         self.btn_siguiente.clicked.connect(self._go_next)
         
         self.btn_cancelar = QPushButton("Cancelar")
@@ -101,6 +235,71 @@ class RectificativaDialog(QDialog):
         
         self.setLayout(layout)
     
+    def _ensure_page(self, index: int) -> None:
+        """Sustituye el marcador de la página `index` por la página real si aún no existe"""
+        if self._pages_built[index]:
+            return
+        attr, builder = self._page_builders[index]
+        page = builder()
+        setattr(self, attr, page)
+        
+        was_current = self.stacked_widget.currentIndex() == index
+        placeholder = self.stacked_widget.widget(index)
+        self.stacked_widget.insertWidget(index, page)
+        self.stacked_widget.removeWidget(placeholder)
+        placeholder.deleteLater()
+        if was_current:
+            self.stacked_widget.setCurrentIndex(index)
+        self._pages_built[index] = True
+    
+    def _discard_page(self, index: int) -> None:
+        """Vuelve a poner un marcador en la página `index` para que se construya de nuevo"""
+        if not self._pages_built[index]:
+            return
+        page = self.stacked_widget.widget(index)
+        self.stacked_widget.insertWidget(index, QWidget())
+        self.stacked_widget.removeWidget(page)
+        page.deleteLater()
+        self._pages_built[index] = False
+    
+    def reset(self, facturas_disponibles: Optional[pd.DataFrame] = None) -> None:
+        """
+        Prepara el asistente para una nueva rectificativa reutilizando sus páginas.
+        
+        Si el histórico es el mismo objeto que en la apertura anterior se conservan
+        el combo y el autocompletado ya construidos; si ha cambiado, la página de
+        factura se vuelve a construir al llegar a ella.
+        
+        Args:
+            facturas_disponibles: Histórico de facturas o None
+        """
+        self.stacked_widget.setCurrentIndex(0)
+        
+        if self._pages_built[1]:
+            self._factura_timer.stop()
+            if self._facturas_list:
+                self._factura_filter_timer.stop()
+        
+        if facturas_disponibles is not self._source_facturas:
+            self._source_facturas = facturas_disponibles
+            self.facturas_disponibles = self._prepare_facturas(facturas_disponibles)
+            self._facturas_list, self._facturas_folded, self._facturas_rows = [], [], []
+            self._discard_page(1)
+        elif self._pages_built[1]:
+            self._fill_factura_combo(range(min(len(self._facturas_list), self.MAX_FACTURA_ITEMS)))
+            self.combo_factura.lineEdit().clear()
+            self.factura_info_form.hide()
+            self.label_factura_info.show()
+        
+        self._selected_row = None
+        self._pending_factura_index = -1
+        if self._pages_built[2]:
+            self.radio_diferencias.setChecked(True)
+        self.combo_motivo.setCurrentIndex(0)
+        self.datos_rectificativa = {}
+        self._resumen_dirty = True
+        self._update_buttons()
+    
     def _create_page_motivo(self) -> QWidget:
         """Crea la página de selección del motivo"""
         page = QWidget()
@@ -108,10 +307,7 @@ class RectificativaDialog(QDialog):
         
         # Título del paso
         step_label = QLabel("Paso 1 de 4: ¿Qué necesitas corregir?")
-        step_font = QFont()
-        step_font.setPointSize(12)
-        step_font.setBold(True)
-        step_label.setFont(step_font)
+        step_label.setFont(self._STEP_FONT)
         layout.addWidget(step_label)
         
         layout.addSpacing(20)
@@ -145,11 +341,11 @@ class RectificativaDialog(QDialog):
         layout.addSpacing(20)
         
         # Área de explicación
-        self.text_explicacion = QTextEdit()
-        self.text_explicacion.setReadOnly(True)
-        self.text_explicacion.setMaximumHeight(200)
-        self.text_explicacion.setStyleSheet("background-color: #f5f5f5; border: 1px solid #ddd; padding: 10px;")
-        layout.addWidget(self.text_explicacion)
+        scroll, self.text_explicacion = self._rich_text_view(
+            "background-color: #f5f5f5; border: 1px solid #ddd; padding: 10px;"
+        )
+        scroll.setMaximumHeight(200)
+        layout.addWidget(scroll)
         
         layout.addStretch()
         
@@ -163,10 +359,7 @@ class RectificativaDialog(QDialog):
         
         # Título del paso
         step_label = QLabel("Paso 2 de 4: ¿Qué factura quieres rectificar?")
-        step_font = QFont()
-        step_font.setPointSize(12)
-        step_font.setBold(True)
-        step_label.setFont(step_font)
+        step_label.setFont(self._STEP_FONT)
         layout.addWidget(step_label)
         
         layout.addSpacing(20)
@@ -178,22 +371,47 @@ class RectificativaDialog(QDialog):
         self.combo_factura = QComboBox()
         self.combo_factura.setEditable(True)
         self.combo_factura.setInsertPolicy(QComboBox.NoInsert)
+        # Modelo de cadenas propio: rellenar el desplegable es un único setStringList.
+        # Al no guardar datos por elemento, la fila de cada opción va en _combo_rows
+        self._factura_model = QStringListModel(self.combo_factura)
+        self.combo_factura.setModel(self._factura_model)
+        self._combo_rows: List[int] = []
         
         # Poblar con facturas disponibles
         if not self.facturas_disponibles.empty:
-            facturas_list = []
-            for _, row in self.facturas_disponibles.iterrows():
-                num_factura = str(row.get("NumFactura", ""))
-                cliente = str(row.get("cliente_nombre", ""))
-                fecha = str(row.get("fecha_emision", ""))
-                facturas_list.append(f"{num_factura} - {cliente} ({fecha})")
+            # Las columnas usadas se extraen una vez como tuplas con nombre en lugar
+            # de crear una Series por fila; las que falten toman su valor por defecto
+            cols = self.facturas_disponibles.reindex(columns=list(self._FACTURA_COLUMNS))
+            for column, default in self._FACTURA_COLUMNS.items():
+                if column not in self.facturas_disponibles.columns:
+                    cols[column] = default
+            self._facturas_rows = list(cols.itertuples(index=False, name="FacturaRow"))
+            facturas_list = [
+                f"{factura.NumFactura} - {factura.cliente_nombre} ({factura.fecha_emision})"
+                for factura in self._facturas_rows
+            ]
+            
+            self._facturas_list = facturas_list
+            self._facturas_folded = [label.casefold() for label in facturas_list]
+            self._fill_factura_combo(range(min(len(facturas_list), self.MAX_FACTURA_ITEMS)))
             
-            self.combo_factura.addItems(facturas_list)
+            # Lo escrito se filtra con debouncing, no en cada pulsación
+            self._factura_filter_timer = QTimer(page)
+            self._factura_filter_timer.setSingleShot(True)
+            self._factura_filter_timer.setInterval(self.FACTURA_FILTER_MS)
+            self._factura_filter_timer.timeout.connect(self._filter_facturas)
+            self.combo_factura.lineEdit().textEdited.connect(self._factura_filter_timer.start)
             
-            # Añadir autocompletado
-            completer = QCompleter(facturas_list)
-            completer.setCaseSensitivity(Qt.CaseInsensitive)
-            self.combo_factura.setCompleter(completer)
+            # El autocompletado ordena todo el histórico: se monta en la siguiente
+            # vuelta del bucle de eventos para que la página se muestre antes
+            QTimer.singleShot(0, self.combo_factura, self._install_factura_completer)
+        
+        # La ficha de la factura se recalcula al dejar de cambiar la selección
+        self._factura_timer = QTimer(page)
+        self._factura_timer.setSingleShot(True)
+        self._factura_timer.setInterval(self.FACTURA_FILTER_MS)
+        self._factura_timer.timeout.connect(self._apply_factura_change)
+        self._pending_factura_index = -1
         
         self.combo_factura.currentIndexChanged.connect(self._on_factura_changed)
         layout.addWidget(self.combo_factura)
@@ -209,6 +427,20 @@ class RectificativaDialog(QDialog):
         self.label_factura_info.setStyleSheet("padding: 10px;")
         info_layout.addWidget(self.label_factura_info)
         
+        # Ficha de la factura: etiquetas de texto plano que solo cambian su texto,
+        # sin que Qt tenga que detectar y analizar HTML en cada selección
+        self.factura_info_form = QWidget()
+        form = QFormLayout(self.factura_info_form)
+        self._info_num, self._info_cli, self._info_fecha, self._info_total = (
+            self._plain_label(), self._plain_label(), self._plain_label(), self._plain_label()
+        )
+        form.addRow("<b>Número:</b>", self._info_num)
+        form.addRow("<b>Cliente:</b>", self._info_cli)
+        form.addRow("<b>Fecha:</b>", self._info_fecha)
+        form.addRow("<b>Total:</b>", self._info_total)
+        self.factura_info_form.hide()
+        info_layout.addWidget(self.factura_info_form)
+        
         info_group.setLayout(info_layout)
         layout.addWidget(info_group)
         
@@ -217,6 +449,39 @@ class RectificativaDialog(QDialog):
         page.setLayout(layout)
         return page
     
+    @staticmethod
+    def _rich_text_view(style: str) -> Tuple[QScrollArea, QLabel]:
+        """
+        Crea un visor de HTML de solo lectura: una QLabel dentro de un área con scroll.
+        
+        Es mucho más ligera que un QTextEdit, que mantiene cursor, historial de
+        deshacer y documento editable aunque sea de solo lectura.
+        
+        Args:
+            style: Hoja de estilo de la etiqueta
+            
+        Returns:
+            Tupla (área con scroll para el layout, etiqueta donde poner el texto)
+        """
+        label = QLabel()
+        label.setTextFormat(Qt.RichText)
+        label.setWordWrap(True)
+        label.setAlignment(Qt.AlignTop | Qt.AlignLeft)
+        label.setStyleSheet(style)
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setFrameShape(QFrame.NoFrame)
+        scroll.setWidget(label)
+        return scroll, label
+    
+    @staticmethod
+    def _plain_label() -> QLabel:
+        """Crea una etiqueta que siempre muestra su texto tal cual"""
+        label = QLabel()
+        label.setTextFormat(Qt.PlainText)
+        label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        return label
+    
     def _create_page_modalidad(self) -> QWidget:
         """Crea la página de selección de modalidad"""
         page = QWidget()
@@ -224,10 +489,7 @@ class RectificativaDialog(QDialog):
         
         # Título del paso
         step_label = QLabel("Paso 3 de 4: ¿Cómo quieres rectificar?")
-        step_font = QFont()
-        step_font.setPointSize(12)
-        step_font.setBold(True)
-        step_label.setFont(step_font)
+        step_label.setFont(self._STEP_FONT)
         layout.addWidget(step_label)
         
         layout.addSpacing(20)
@@ -238,16 +500,19 @@ class RectificativaDialog(QDialog):
         
         # Grupo de botones de radio
         self.button_group_modalidad = QButtonGroup()
+        self.button_group_modalidad.idToggled.connect(self._mark_resumen_dirty)
+        
+        # Una sola rejilla: el botón de cada opción en la columna 0 y su título y
+        # descripción en la columna 1, sin contenedores intermedios
+        grid = QGridLayout()
+        grid.setColumnStretch(1, 1)
         
         # Opción 1: Por Sustitución
         self.radio_sustitucion = QRadioButton()
         self.button_group_modalidad.addButton(self.radio_sustitucion, 0)
         
-        sustitucion_layout = QVBoxLayout()
         sustitucion_title = QLabel("🔄 Por Sustitución (S)")
-        sustitucion_title_font = QFont()
-        sustitucion_title_font.setBold(True)
-        sustitucion_title.setFont(sustitucion_title_font)
+        sustitucion_title.setFont(self._BOLD_FONT)
         sustitucion_desc = QLabel(
             "Anula completamente la factura original y la reemplaza por una nueva.\n"
             "• Usa esta opción cuando hay múltiples errores\n"
@@ -257,28 +522,17 @@ class RectificativaDialog(QDialog):
         sustitucion_desc.setWordWrap(True)
         sustitucion_desc.setStyleSheet("color: #666; margin-left: 20px;")
         
-        sustitucion_container = QWidget()
-        sustitucion_container_layout = QHBoxLayout()
-        sustitucion_container_layout.addWidget(self.radio_sustitucion)
-        sustitucion_container_layout.addLayout(sustitucion_layout)
-        sustitucion_container_layout.addStretch()
-        sustitucion_container.setLayout(sustitucion_container_layout)
-        
-        sustitucion_layout.addWidget(sustitucion_title)
-        sustitucion_layout.addWidget(sustitucion_desc)
-        
-        layout.addWidget(sustitucion_container)
-        layout.addSpacing(15)
+        grid.addWidget(self.radio_sustitucion, 0, 0, Qt.AlignTop)
+        grid.addWidget(sustitucion_title, 0, 1)
+        grid.addWidget(sustitucion_desc, 1, 1)
+        grid.setRowMinimumHeight(2, 15)
         
         # Opción 2: Por Diferencias
         self.radio_diferencias = QRadioButton()
         self.button_group_modalidad.addButton(self.radio_diferencias, 1)
         
-        diferencias_layout = QVBoxLayout()
         diferencias_title = QLabel("📊 Por Diferencias (I)")
-        diferencias_title_font = QFont()
-        diferencias_title_font.setBold(True)
-        diferencias_title.setFont(diferencias_title_font)
+        diferencias_title.setFont(self._BOLD_FONT)
         diferencias_desc = QLabel(
             "Solo ajusta las diferencias (positivas o negativas) sobre la factura original.\n"
             "• La factura original sigue siendo válida\n"
@@ -288,17 +542,11 @@ class RectificativaDialog(QDialog):
         diferencias_desc.setWordWrap(True)
         diferencias_desc.setStyleSheet("color: #666; margin-left: 20px;")
         
-        diferencias_container = QWidget()
-        diferencias_container_layout = QHBoxLayout()
-        diferencias_container_layout.addWidget(self.radio_diferencias)
-        diferencias_container_layout.addLayout(diferencias_layout)
-        diferencias_container_layout.addStretch()
-        diferencias_container.setLayout(diferencias_container_layout)
-        
-        diferencias_layout.addWidget(diferencias_title)
-        diferencias_layout.addWidget(diferencias_desc)
+        grid.addWidget(self.radio_diferencias, 3, 0, Qt.AlignTop)
+        grid.addWidget(diferencias_title, 3, 1)
+        grid.addWidget(diferencias_desc, 4, 1)
         
-        layout.addWidget(diferencias_container)
+        layout.addLayout(grid)
         
         # Seleccionar "Por Diferencias" por defecto
         self.radio_diferencias.setChecked(True)
@@ -315,10 +563,7 @@ class RectificativaDialog(QDialog):
         
         # Título del paso
         step_label = QLabel("Paso 4 de 4: Confirmación")
-        step_font = QFont()
-        step_font.setPointSize(12)
-        step_font.setBold(True)
-        step_label.setFont(step_font)
+        step_label.setFont(self._STEP_FONT)
         layout.addWidget(step_label)
         
         layout.addSpacing(20)
@@ -328,10 +573,10 @@ class RectificativaDialog(QDialog):
         layout.addWidget(desc)
         
         # Área de resumen
-        self.text_resumen = QTextEdit()
-        self.text_resumen.setReadOnly(True)
-        self.text_resumen.setStyleSheet("background-color: #f5f5f5; border: 1px solid #ddd; padding: 15px;")
-        layout.addWidget(self.text_resumen)
+        scroll, self.text_resumen = self._rich_text_view(
+            "background-color: #f5f5f5; border: 1px solid #ddd; padding: 15px;"
+        )
+        layout.addWidget(scroll)
         
         layout.addStretch()
         
@@ -341,78 +586,111 @@ class RectificativaDialog(QDialog):
     def _on_motivo_changed(self, index: int):
         """Maneja el cambio de motivo"""
         motivo = self.combo_motivo.currentData()
+        if motivo == self._last_motivo:
+            return
+        self._last_motivo = motivo
+        self._resumen_dirty = True
         
-        explicaciones = {
-            "R1": """<h3>Error en IVA, descuentos o devoluciones (R1)</h3>
-<p><b>Cuándo usar:</b></p>
-<ul>
-<li>Has aplicado un tipo de IVA incorrecto</li>
-<li>Necesitas aplicar un descuento posterior a la emisión</li>
-<li>El cliente devuelve mercancía (factura de abono)</li>
-<li>Error fundado en derecho</li>
-</ul>
-<p><b>Base legal:</b> Art. 80.1, 80.2 y 80.6 de la Ley del IVA</p>""",
-            
-            "R2": """<h3>Cliente en concurso de acreedores (R2)</h3>
-<p><b>Cuándo usar:</b></p>
-<ul>
-<li>El cliente ha entrado en concurso de acreedores</li>
-<li>No puede pagar la factura por esta causa</li>
-</ul>
-<p><b>Base legal:</b> Art. 80.3 de la Ley del IVA</p>""",
-            
-            "R3": """<h3>Crédito incobrable (R3)</h3>
-<p><b>Cuándo usar:</b></p>
-<ul>
-<li>Has agotado las vías de reclamación</li>
-<li>El crédito se declara total o parcialmente incobrable</li>
-</ul>
-<p><b>Base legal:</b> Art. 80.4 de la Ley del IVA</p>""",
-            
-            "R4": """<h3>Error en datos o descripción (R4)</h3>
-<p><b>Cuándo usar:</b></p>
-<ul>
-<li>Error en el NIF, nombre o dirección del cliente</li>
-<li>Error en la descripción del producto/servicio</li>
-<li>Error en la fecha o número de factura</li>
-<li>Cualquier otro error no incluido en R1, R2 o R3</li>
-</ul>
-<p><b>Base legal:</b> Resto de causas de rectificación</p>"""
-        }
-        
-        if motivo in explicaciones:
-            self.text_explicacion.setHtml(explicaciones[motivo])
+        html = self._EXPLICACIONES_HTML.get(motivo)
+        if html:
+            self.text_explicacion.setText(html)
         else:
             self.text_explicacion.clear()
     
+    def _install_factura_completer(self) -> None:
+        """Asocia al combo el autocompletado con todas las facturas"""
+        # Autocompletado sobre un modelo Qt ordenado: el filtrado se hace en C++.
+        # El combo conserva el orden del histórico (la fila de cada opción está en _combo_rows)
+        completer = QCompleter(self.combo_factura)
+        completer.setModel(QStringListModel(sorted(self._facturas_list, key=str.casefold), completer))
+        completer.setCaseSensitivity(Qt.CaseInsensitive)
+        completer.setModelSorting(QCompleter.CaseInsensitivelySortedModel)
+        completer.setFilterMode(Qt.MatchContains)
+        completer.setCompletionMode(QCompleter.PopupCompletion)
+        completer.setMaxVisibleItems(self.COMPLETER_VISIBLE_ITEMS)
+        # Filas de igual altura y maquetación por lotes: la lista no mide cada
+        # coincidencia al abrirse con miles de facturas
+        popup = completer.popup()
+        popup.setUniformItemSizes(True)
+        popup.setLayoutMode(QListView.Batched)
+        popup.setBatchSize(self.MAX_FACTURA_ITEMS)
+        completer.activated[str].connect(self._select_factura_label)
+        self.combo_factura.setCompleter(completer)
+    
+    def _fill_factura_combo(self, rows) -> None:
+        """Sustituye los elementos del combo por las facturas de esas filas, sin emitir señales"""
+        self._combo_rows = list(rows)
+        with QSignalBlocker(self.combo_factura):
+            self._factura_model.setStringList([self._facturas_list[row] for row in self._combo_rows])
+            self.combo_factura.setCurrentIndex(-1)
+    
+    def _filter_facturas(self) -> None:
+        """Deja en el desplegable las primeras coincidencias con el texto escrito"""
+        line_edit = self.combo_factura.lineEdit()
+        text = line_edit.text()
+        cursor = line_edit.cursorPosition()
+        needle = text.strip().casefold()
+        
+        matches = []
+        for row, label in enumerate(self._facturas_folded):
+            if needle in label:
+                matches.append(row)
+                if len(matches) >= self.MAX_FACTURA_ITEMS:
+                    break
+        self._fill_factura_combo(matches)
+        
+        # Cambiar la lista borra el texto del editor: se restaura lo que el usuario escribía
+        line_edit.setText(text)
+        line_edit.setCursorPosition(cursor)
+    
+    def _select_factura_label(self, label: str) -> None:
+        """Selecciona la factura elegida en el autocompletado aunque no esté en el desplegable"""
+        index = self.combo_factura.findText(label)
+        if index < 0:
+            try:
+                row = self._facturas_list.index(label)
+            except ValueError:
+                return
+            self._fill_factura_combo([row])
+            index = 0
+        self.combo_factura.setCurrentIndex(index)
+    
     def _on_factura_changed(self, index: int):
-        """Maneja el cambio de factura seleccionada"""
-        if index < 0 or self.facturas_disponibles.empty:
+        """Maneja el cambio de factura seleccionada (agrupando cambios seguidos)"""
+        self._pending_factura_index = index
+        self._factura_timer.start()
+    
+    def _flush_factura_change(self) -> None:
+        """Aplica ya un cambio de factura pendiente del temporizador"""
+        if self._factura_timer.isActive():
+            self._factura_timer.stop()
+            self._apply_factura_change()
+    
+    def _apply_factura_change(self):
+        """Carga la factura seleccionada y muestra su información"""
+        index = self._pending_factura_index
+        row = self._combo_rows[index] if 0 <= index < len(self._combo_rows) else None
+        if row is None or row == self._selected_row or self.facturas_disponibles.empty:
             return
         
-        # Obtener la factura seleccionada
-        self.factura_seleccionada = self.facturas_disponibles.iloc[index]
+        # La fila de la opción del combo es la de la factura seleccionada
+        self._selected_row = row
+        self._resumen_dirty = True
         
         # Mostrar información
-        num_factura = self.factura_seleccionada.get("NumFactura", "")
-        cliente = self.factura_seleccionada.get("cliente_nombre", "")
-        fecha = self.factura_seleccionada.get("fecha_emision", "")
-        total = self.factura_seleccionada.get("total_ah", 0)
-        
-        info_html = f"""
-<table style="width: 100%; border-collapse: collapse;">
-<tr><td style="padding: 5px;"><b>Número:</b></td><td style="padding: 5px;">{num_factura}</td></tr>
-<tr><td style="padding: 5px;"><b>Cliente:</b></td><td style="padding: 5px;">{cliente}</td></tr>
-<tr><td style="padding: 5px;"><b>Fecha:</b></td><td style="padding: 5px;">{fecha}</td></tr>
-<tr><td style="padding: 5px;"><b>Total:</b></td><td style="padding: 5px;">{total} €</td></tr>
-</table>
-"""
-        self.label_factura_info.setText(info_html)
+        factura = self._facturas_rows[row]
+        self._info_num.setText(str(factura.NumFactura))
+        self._info_cli.setText(str(factura.cliente_nombre))
+        self._info_fecha.setText(str(factura.fecha_emision))
+        self._info_total.setText(f"{factura.total_ah} €")
+        self.label_factura_info.hide()
+        self.factura_info_form.show()
     
     def _go_previous(self):
         """Va al paso anterior"""
         current_index = self.stacked_widget.currentIndex()
         if current_index > 0:
+            self._ensure_page(current_index - 1)
             self.stacked_widget.setCurrentIndex(current_index - 1)
             self._update_buttons()
     
@@ -424,17 +702,24 @@ class RectificativaDialog(QDialog):
         if not self._validate_current_step():
             return
         
-        if current_index < self.stacked_widget.count() - 1:
-            # Si estamos en el penúltimo paso, generar el resumen
-            if current_index == self.stacked_widget.count() - 2:
-                self._generate_resumen()
-            
+        if current_index < self._n_pages - 1:
+            self._ensure_page(current_index + 1)
             self.stacked_widget.setCurrentIndex(current_index + 1)
             self._update_buttons()
         else:
             # Último paso: crear la factura rectificativa
             self._create_rectificativa()
     
+    def _mark_resumen_dirty(self, *_args) -> None:
+        """Indica que el resumen ya no refleja las opciones elegidas"""
+        self._resumen_dirty = True
+    
+    def _on_page_changed(self, index: int) -> None:
+        """Genera el resumen al mostrar el último paso si ha quedado desfasado"""
+        if index == self._n_pages - 1 and self._resumen_dirty and self._pages_built[index]:
+            self._generate_resumen()
+            self._resumen_dirty = False
+    
     def _validate_current_step(self) -> bool:
         """Valida el paso actual"""
         current_index = self.stacked_widget.currentIndex()
@@ -445,7 +730,9 @@ class RectificativaDialog(QDialog):
                 return False
         
         elif current_index == 1:  # Paso 2: Factura
-            if self.factura_seleccionada is None:
+            # Una selección aún en espera del debouncing debe contar
+            self._flush_factura_change()
+            if self._selected_row is None:
                 QMessageBox.warning(self, "Validación", "Por favor, selecciona la factura que quieres rectificar.")
                 return False
         
@@ -464,56 +751,33 @@ class RectificativaDialog(QDialog):
         self.btn_anterior.setEnabled(current_index > 0)
         
         # Botón Siguiente/Crear
-        if current_index == self.stacked_widget.count() - 1:
-            self.btn_siguiente.setText("✅ Crear Rectificativa")
+        if current_index == self._n_pages - 1:
+            self.btn_siguiente.setText(self._CREATE_TEXT)
         else:
-            self.btn_siguiente.setText("Siguiente ➡️")
+            self.btn_siguiente.setText(self._NEXT_TEXT)
     
     def _generate_resumen(self):
         """Genera el resumen para la confirmación"""
         motivo_text = self.combo_motivo.currentText()
         motivo_code = self.combo_motivo.currentData()
         
-        num_factura = self.factura_seleccionada.get("NumFactura", "")
-        cliente = self.factura_seleccionada.get("cliente_nombre", "")
+        factura = self._facturas_rows[self._selected_row]
+        num_factura = factura.NumFactura
+        cliente = factura.cliente_nombre
         
         modalidad_id = self.button_group_modalidad.checkedId()
         modalidad_text = "Por Sustitución (S)" if modalidad_id == 0 else "Por Diferencias (I)"
         modalidad_code = "S" if modalidad_id == 0 else "I"
         
-        resumen_html = f"""
-<h2>Resumen de la Factura Rectificativa</h2>
-
-<table style="width: 100%; border-collapse: collapse; margin-top: 20px;">
-<tr style="background-color: #f0f0f0;">
-    <td style="padding: 10px; border: 1px solid #ddd;"><b>Motivo:</b></td>
-    <td style="padding: 10px; border: 1px solid #ddd;">{motivo_text}</td>
-</tr>
-<tr>
-    <td style="padding: 10px; border: 1px solid #ddd;"><b>Código:</b></td>
-    <td style="padding: 10px; border: 1px solid #ddd;">{motivo_code}</td>
-</tr>
-<tr style="background-color: #f0f0f0;">
-    <td style="padding: 10px; border: 1px solid #ddd;"><b>Factura Original:</b></td>
-    <td style="padding: 10px; border: 1px solid #ddd;">{num_factura}</td>
-</tr>
-<tr>
-    <td style="padding: 10px; border: 1px solid #ddd;"><b>Cliente:</b></td>
-    <td style="padding: 10px; border: 1px solid #ddd;">{cliente}</td>
-</tr>
-<tr style="background-color: #f0f0f0;">
-    <td style="padding: 10px; border: 1px solid #ddd;"><b>Modalidad:</b></td>
-    <td style="padding: 10px; border: 1px solid #ddd;">{modalidad_text}</td>
-</tr>
-</table>
-
-<div style="margin-top: 20px; padding: 15px; background-color: #e8f5e9; border-left: 4px solid #4caf50;">
-<p><b>✅ Todo listo para crear la factura rectificativa</b></p>
-<p>Al hacer clic en "Crear Rectificativa", se generará una nueva factura con los datos correctos.</p>
-</div>
-"""
+        resumen_html = self._RESUMEN_HTML.format(
+            motivo_text=motivo_text,
+            motivo_code=motivo_code,
+            num_factura=num_factura,
+            cliente=cliente,
+            modalidad_text=modalidad_text,
+        )
         
-        self.text_resumen.setHtml(resumen_html)
+        self.text_resumen.setText(self._RESUMEN_STYLE + resumen_html)
         
         # Guardar los datos para la creación
         self.datos_rectificativa = {
@@ -0,0 +1,79 @@
+"""
+Limitación de frecuencia para manejadores de señales de la interfaz.
+"""
+from __future__ import annotations
+
+import time
+from functools import wraps
+from typing import Any, Callable, TypeVar
+
+from PySide6.QtCore import QObject, QTimer
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class _ThrottleState:
+    """Estado por instancia de un método limitado."""
+
+    __slots__ = ("last_run", "pending", "args")
+
+    def __init__(self) -> None:
+        self.last_run = float("-inf")
+        self.pending = False
+        self.args: tuple = ((), {})
+
+
+def throttled(timeout_ms: int = 200) -> Callable[[F], F]:
+    """
+    Ejecuta un método como mucho una vez cada `timeout_ms` milisegundos.
+
+    La primera llamada se ejecuta en el acto; las que llegan dentro de la ventana
+    se agrupan en una única ejecución diferida con los últimos argumentos, de modo
+    que el estado final nunca se pierde. El valor devuelto solo está disponible
+    cuando la llamada se ejecuta en el acto.
+
+    Args:
+        timeout_ms: Intervalo mínimo entre ejecuciones
+
+    Returns:
+        Decorador de métodos
+    """
+    def decorator(fn: F) -> F:
+        attr = f"_throttle_{fn.__name__}"
+
+        def fire(self: Any, state: _ThrottleState) -> None:
+            state.pending = False
+            state.last_run = time.monotonic()
+            args, kwargs = state.args
+            state.args = ((), {})
+            fn(self, *args, **kwargs)
+
+        @wraps(fn)
+        def wrapper(self, *args: Any, **kwargs: Any) -> Any:
+            state = getattr(self, attr, None)
+            if state is None:
+                state = _ThrottleState()
+                setattr(self, attr, state)
+
+            elapsed_ms = (time.monotonic() - state.last_run) * 1000
+            if not state.pending and elapsed_ms >= timeout_ms:
+                state.last_run = time.monotonic()
+                return fn(self, *args, **kwargs)
+
+            state.args = (args, kwargs)
+            if not state.pending:
+                state.pending = True
+                delay = max(0, int(timeout_ms - elapsed_ms))
+                if isinstance(self, QObject):
+                    # Con contexto: la llamada diferida se descarta si el objeto se destruye
+                    QTimer.singleShot(delay, self, lambda: fire(self, state))
+                else:
+                    QTimer.singleShot(delay, lambda: fire(self, state))
+            return None
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+__all__ = ["throttled"]
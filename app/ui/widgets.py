@@ -3,11 +3,28 @@ Widgets reutilizables de la interfaz.
 """
 from __future__ import annotations
 
-from PySide6.QtCore import QEasingCurve, QPropertyAnimation, Qt
-from PySide6.QtWidgets import QApplication
-from PySide6.QtGui import QColor
+from typing import Optional
+
+from PySide6.QtCore import (
+    QAbstractAnimation,
+    QEasingCurve,
+    QEvent,
+    QModelIndex,
+    QParallelAnimationGroup,
+    QPropertyAnimation,
+    QRect,
+    QSize,
+    QSortFilterProxyModel,
+    Qt,
+    QTimer,
+    QVariantAnimation,
+    Signal,
+)
+from PySide6.QtGui import QColor, QFont, QFontMetrics, QIcon, QPainter
 from PySide6.QtWidgets import (
+    QApplication,
     QCheckBox,
+    QComboBox,
     QFrame,
     QGraphicsDropShadowEffect,
     QGraphicsOpacityEffect,
@@ -17,6 +34,10 @@ from PySide6.QtWidgets import (
     QListWidget,
     QMainWindow,
     QPushButton,
+    QStyle,
+    QStyledItemDelegate,
+    QStyleOptionViewItem,
+    QTableView,
     QTableWidget,
     QSizePolicy,
     QVBoxLayout,
@@ -27,47 +48,64 @@ from PySide6.QtWidgets import (
 class AnimatedButton(QPushButton):
     """Botón con animación de elevación y sombra."""
 
+    # Sombra (desenfoque, desplazamiento vertical) en reposo, al pasar el ratón y al pulsar
+    _BLUR_REST = 18
+    _BLUR_HOVER = 30
+    _BLUR_PRESS = 10
+    _OFFSET_REST = 4
+    _OFFSET_HOVER = 6
+    _OFFSET_PRESS = 2
+    _SHADOW_COLOR = QColor(0, 0, 0, 60)
+    _DURATION = 180
+    _EASING = QEasingCurve(QEasingCurve.OutCubic)
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.setProperty("class", "AnimatedButton")
         self.setStyleSheet("color: white !important;")
 
         self._shadow = QGraphicsDropShadowEffect(self)
-        self._shadow.setBlurRadius(18)
-        color = QColor(0, 0, 0, 60)
-        self._shadow.setColor(color)
-        self._shadow.setOffset(0, 4)
+        self._shadow.setBlurRadius(self._BLUR_REST)
+        self._shadow.setColor(self._SHADOW_COLOR)
+        self._shadow.setOffset(0, self._OFFSET_REST)
         self.setGraphicsEffect(self._shadow)
 
-        self._anim_blur = QPropertyAnimation(self._shadow, b"blurRadius")
-        self._anim_blur.setDuration(180)
-        self._anim_blur.setEasingCurve(QEasingCurve.OutCubic)
+        # La animación se crea al primer uso: muchos botones nunca se sobrevuelan.
+        # Una sola animación de 0 a 1 mueve a la vez desenfoque y desplazamiento
+        self._anim: Optional[QVariantAnimation] = None
+        self._shadow_from = (self._BLUR_REST, self._OFFSET_REST)
+        self._shadow_to = (self._BLUR_REST, self._OFFSET_REST)
 
-        self._anim_offset = QPropertyAnimation(self._shadow, b"yOffset")
-        self._anim_offset.setDuration(180)
-        self._anim_offset.setEasingCurve(QEasingCurve.OutCubic)
+    def _ensure_anim(self):
+        if self._anim is not None:
+            return
+        self._anim = QVariantAnimation(self)
+        self._anim.setDuration(self._DURATION)
+        self._anim.setEasingCurve(self._EASING)
+        self._anim.setStartValue(0.0)
+        self._anim.setEndValue(1.0)
+        self._anim.valueChanged.connect(self._apply_shadow_step)
+
+    def _animate_shadow(self, blur: float, offset: float):
+        self._ensure_anim()
+        if self._shadow_to == (blur, offset) and self._anim.state() == QAbstractAnimation.Running:
+            # Mismo destino en curso (p. ej. enterEvent repetido): no reiniciar la curva
+            return
+        self._anim.stop()
+        self._shadow_from = (self._shadow.blurRadius(), self._shadow.yOffset())
+        self._shadow_to = (blur, offset)
+        self._anim.start()
 
-    def _animate_hover_in(self):
-        self._anim_blur.stop()
-        self._anim_blur.setStartValue(self._shadow.blurRadius())
-        self._anim_blur.setEndValue(30)
-        self._anim_blur.start()
+    def _apply_shadow_step(self, progress: float):
+        (blur_from, offset_from), (blur_to, offset_to) = self._shadow_from, self._shadow_to
+        self._shadow.setBlurRadius(blur_from + (blur_to - blur_from) * progress)
+        self._shadow.setOffset(0, offset_from + (offset_to - offset_from) * progress)
 
-        self._anim_offset.stop()
-        self._anim_offset.setStartValue(self._shadow.yOffset())
-        self._anim_offset.setEndValue(6)
-        self._anim_offset.start()
+    def _animate_hover_in(self):
+        self._animate_shadow(self._BLUR_HOVER, self._OFFSET_HOVER)
 
     def _animate_hover_out(self):
-        self._anim_blur.stop()
-        self._anim_blur.setStartValue(self._shadow.blurRadius())
-        self._anim_blur.setEndValue(18)
-        self._anim_blur.start()
-
-        self._anim_offset.stop()
-        self._anim_offset.setStartValue(self._shadow.yOffset())
-        self._anim_offset.setEndValue(4)
-        self._anim_offset.start()
+        self._animate_shadow(self._BLUR_REST, self._OFFSET_REST)
 
     def enterEvent(self, e):
         self._animate_hover_in()
@@ -78,16 +116,7 @@ class AnimatedButton(QPushButton):
         super().leaveEvent(e)
 
     def mousePressEvent(self, e):
-        self._anim_blur.stop()
-        self._anim_blur.setStartValue(self._shadow.blurRadius())
-        self._anim_blur.setEndValue(10)
-        self._anim_blur.start()
-
-        self._anim_offset.stop()
-        self._anim_offset.setStartValue(self._shadow.yOffset())
-        self._anim_offset.setEndValue(2)
-        self._anim_offset.start()
-
+        self._animate_shadow(self._BLUR_PRESS, self._OFFSET_PRESS)
         super().mousePressEvent(e)
 
     def mouseReleaseEvent(self, e):
@@ -99,17 +128,21 @@ class AnimatedButton(QPushButton):
             self._animate_hover_out()
 
 
+def _status_kind(status: str) -> str:
+    """Devuelve el valor de la propiedad `status` de StatusChip para un estado en mayúsculas."""
+    if status in ("ÉXITO", "SUCCESS"):
+        return "success"
+    if status in ("DUPLICADO", "DUPLICATE", "ATENCION"):
+        return "warning"
+    return "NABO!"
+
+
 class StatusChip(QLabel):
     def __init__(self, status, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.setProperty("class", "StatusChip")
         up = (status or "").upper()
-        if up in ["ÉXITO", "SUCCESS"]:
-            self.setProperty("status", "success")
-        elif up in ["DUPLICADO", "DUPLICATE", "ATENCION"]:
-            self.setProperty("status", "warning")
-        else:
-            self.setProperty("status", "NABO!")
+        self.setProperty("status", _status_kind(up))
         self.setText(up)
         self.setAlignment(Qt.AlignCenter)
         self.setFixedHeight(26)
@@ -131,20 +164,148 @@ class ModernTable(QTableWidget):
         self.horizontalHeader().setStretchLastSection(True)
 
 
+class ModernTableView(QTableView):
+    """Variante model/view de ModernTable (misma estética, sin items por celda)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.setProperty("class", "ModernTable")
+        self.setAlternatingRowColors(True)
+        self.setMouseTracking(True)
+        self.setSelectionBehavior(QTableView.SelectRows)
+        self.verticalHeader().setVisible(False)
+        self.horizontalHeader().setStretchLastSection(True)
+
+
+class StatusChipDelegate(QStyledItemDelegate):
+    """Pinta el estado de la celda como un StatusChip, sin crear un widget por fila."""
+
+    # Mismos colores y medidas que QLabel[class="StatusChip"] en styles.qss:
+    # un delegado no recibe la hoja de estilos
+    _COLORS = {
+        "success": QColor("#21C55D"),
+        "warning": QColor("#F59E0B"),
+        "NABO!": QColor("#EF4444"),
+    }
+    _HEIGHT = 26
+    _MIN_WIDTH = 80
+    _PADDING = 14
+    _FONT_PIXELS = 12
+
+    def _chip_font(self, base: QFont) -> QFont:
+        font = QFont(base)
+        font.setPixelSize(self._FONT_PIXELS)
+        font.setWeight(QFont.DemiBold)
+        return font
+
+    def _chip_width(self, text: str, font: QFont) -> int:
+        return max(QFontMetrics(font).horizontalAdvance(text) + 2 * self._PADDING, self._MIN_WIDTH)
+
+    def paint(self, painter: QPainter, option: QStyleOptionViewItem, index: QModelIndex) -> None:
+        # Fondo, selección y hover de la vista; el texto lo pone la píldora
+        opt = QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+        opt.text = ""
+        style = opt.widget.style() if opt.widget is not None else QApplication.style()
+        style.drawControl(QStyle.CE_ItemViewItem, opt, painter, opt.widget)
+
+        text = (index.data() or "").upper()
+        font = self._chip_font(option.font)
+        height = min(self._HEIGHT, option.rect.height() - 2)
+        rect = QRect(0, 0, min(self._chip_width(text, font), option.rect.width() - 4), height)
+        rect.moveCenter(option.rect.center())
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(self._COLORS[_status_kind(text)])
+        painter.drawRoundedRect(rect, height / 2, height / 2)
+        painter.setPen(Qt.white)
+        painter.setFont(font)
+        painter.drawText(rect, Qt.AlignCenter, text)
+        painter.restore()
+
+    def sizeHint(self, option: QStyleOptionViewItem, index: QModelIndex) -> QSize:
+        text = (index.data() or "").upper()
+        return QSize(self._chip_width(text, self._chip_font(option.font)) + 8, self._HEIGHT + 4)
+
+
+class PdfButtonDelegate(QStyledItemDelegate):
+    """
+    Pinta el botón "Abrir PDF" de cada fila con un único icono compartido.
+    Emite `clicked` con el índice de la fila al soltar el botón izquierdo sobre la celda.
+    """
+
+    clicked = Signal(QModelIndex)
+
+    ICON_SIZE = QSize(20, 20)
+    _FALLBACK_TEXT = "Ver"
+
+    def __init__(self, icon: Optional[QIcon] = None, parent=None):
+        super().__init__(parent)
+        self.icon = icon
+
+    def paint(self, painter: QPainter, option: QStyleOptionViewItem, index: QModelIndex) -> None:
+        opt = QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+        opt.text = ""
+        style = opt.widget.style() if opt.widget is not None else QApplication.style()
+        style.drawControl(QStyle.CE_ItemViewItem, opt, painter, opt.widget)
+
+        if self.icon is not None:
+            rect = QRect(option.rect.topLeft(), self.ICON_SIZE)
+            rect.moveCenter(option.rect.center())
+            self.icon.paint(painter, rect)
+        else:
+            painter.drawText(option.rect, Qt.AlignCenter, self._FALLBACK_TEXT)
+
+    def editorEvent(self, event, model, option: QStyleOptionViewItem, index: QModelIndex) -> bool:
+        if (
+            event.type() == QEvent.MouseButtonRelease
+            and event.button() == Qt.LeftButton
+            and option.rect.contains(event.position().toPoint())
+        ):
+            self.clicked.emit(index)
+            return True
+        return super().editorEvent(event, model, option, index)
+
+    def sizeHint(self, option: QStyleOptionViewItem, index: QModelIndex) -> QSize:
+        return QSize(self.ICON_SIZE.width() + 16, 28)
+
+
 class TableTools(QWidget):
     """
     Barra de herramientas para tablas: búsqueda y densidad.
+
+    Con una vista model/view (QTableView) la búsqueda se hace con un
+    QSortFilterProxyModel, en C++; un QTableWidget no admite modelo externo y
+    se sigue filtrando ocultando filas.
     """
 
-    def __init__(self, table: QTableWidget, parent=None):
+    # Tipos con reglas QMainWindow[density="compact"] en styles.qss
+    DENSITY_WIDGET_TYPES = (QPushButton, QLineEdit, QComboBox, QTableView)
+    # Espera tras la última pulsación antes de filtrar la tabla
+    FILTER_DEBOUNCE_MS = 120
+
+    def __init__(self, table: QTableView, parent=None):
         super().__init__(parent)
         self._table = table
+        self._proxy: Optional[QSortFilterProxyModel] = None
+        if not isinstance(table, QTableWidget):
+            self._proxy = QSortFilterProxyModel(self)
+            self._proxy.setFilterKeyColumn(-1)
+            self._proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
         row = QHBoxLayout(self)
         row.setContentsMargins(0, 0, 0, 8)
         row.setSpacing(8)
         self.search = QLineEdit(self)
         self.search.setPlaceholderText("Buscar…")
         self.search.textChanged.connect(self._apply_filter)
+        self._pending_text = ""
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(self.FILTER_DEBOUNCE_MS)
+        self._filter_timer.timeout.connect(self._do_filter)
         self.compact_toggle = QCheckBox("Vista compacta", self)
         self.compact_toggle.setToolTip(
             "Reduce el espaciado en tablas y controles para mostrar más información en menos espacio"
@@ -158,28 +319,63 @@ class TableTools(QWidget):
         win = self.window()
         if isinstance(win, QMainWindow):
             win.setProperty("density", "compact" if checked else "")
-            app = QApplication.instance()
-            if app:
-                for widget in app.allWidgets():
-                    try:
-                        widget.style().unpolish(widget)
-                        widget.style().polish(widget)
-                    except (RuntimeError, AttributeError):
-                        pass
+            # Solo se repulen los descendientes de la ventana afectados por la
+            # densidad, con el repintado en pausa para hacerlo de una vez
+            win.setUpdatesEnabled(False)
+            try:
+                for widget_type in self.DENSITY_WIDGET_TYPES:
+                    for widget in win.findChildren(widget_type):
+                        style = widget.style()
+                        style.unpolish(widget)
+                        style.polish(widget)
+            finally:
+                win.setUpdatesEnabled(True)
 
     def _apply_filter(self, text: str):
-        txt = (text or "").strip().lower()
-        for r in range(self._table.rowCount()):
-            visible = False
-            for c in range(self._table.columnCount()):
-                it = self._table.item(r, c)
-                if it and txt in str(it.text()).lower():
-                    visible = True
-                    break
-            self._table.setRowHidden(r, not visible)
+        # Cada pulsación reinicia la espera: solo se recorre la tabla con el texto final
+        self._pending_text = text
+        self._filter_timer.start()
+
+    def _do_filter(self):
+        if self._proxy is not None:
+            self._filter_view((self._pending_text or "").strip())
+            return
+        txt = (self._pending_text or "").strip().lower()
+        table = self._table
+        item = table.item
+        cols = range(table.columnCount())
+        table.setUpdatesEnabled(False)
+        table.blockSignals(True)
+        try:
+            for r in range(table.rowCount()):
+                visible = False
+                for c in cols:
+                    it = item(r, c)
+                    if it and txt in str(it.text()).lower():
+                        visible = True
+                        break
+                table.setRowHidden(r, not visible)
+        finally:
+            table.blockSignals(False)
+            table.setUpdatesEnabled(True)
+
+    def _filter_view(self, text: str):
+        # El proxy se intercala sobre el modelo que tenga la vista en ese momento
+        model = self._table.model()
+        if model is None:
+            return
+        if model is not self._proxy:
+            self._proxy.setSourceModel(model)
+            self._table.setModel(self._proxy)
+        self._proxy.setFilterFixedString(text)
 
 
 class StepperWidget(QWidget):
+    _COMPLETED = "completed"
+    _ACTIVE = "active"
+    _PENDING = "pending"
+    _CHECK_MARK = "✓"
+
     def __init__(self, steps, parent=None):
         super().__init__(parent)
         self.steps = steps
@@ -196,6 +392,8 @@ class StepperWidget(QWidget):
         self.step_circles = []
         self.step_lines = []
         self.line_anims = []
+        # Todas las líneas avanzan con un solo grupo: un tick de animación por fotograma
+        self._line_group = QParallelAnimationGroup(self)
 
         for idx, step_name in enumerate(self.steps):
             container = QVBoxLayout()
@@ -207,7 +405,7 @@ class StepperWidget(QWidget):
             circle.setAlignment(Qt.AlignCenter)
             circle.setFixedSize(40, 40)
             circle.setProperty("class", "StepCircle")
-            circle.setProperty("state", "pending")
+            circle.setProperty("state", self._PENDING)
             container.addWidget(circle, alignment=Qt.AlignCenter)
             self.step_circles.append(circle)
 
@@ -226,7 +424,7 @@ class StepperWidget(QWidget):
                 line.setMinimumWidth(60)
                 line.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
                 line.setProperty("class", "StepLine")
-                line.setProperty("state", "pending")
+                line.setProperty("state", self._PENDING)
                 line.setMaximumWidth(0)
                 self.step_lines.append(line)
 
@@ -234,9 +432,14 @@ class StepperWidget(QWidget):
                 anim.setDuration(400)
                 anim.setEasingCurve(QEasingCurve.OutCubic)
                 self.line_anims.append(anim)
+                self._line_group.addAnimation(anim)
 
                 self._layout.addWidget(line, alignment=Qt.AlignVCenter)
 
+        # Último estado aplicado a cada círculo y línea: solo se repulen los que cambian
+        self._circle_states = [self._PENDING] * len(self.step_circles)
+        self._line_states = [self._PENDING] * len(self.step_lines)
+
     def set_current_step(self, step_index):
         self.set_step(step_index)
 
@@ -247,37 +450,44 @@ class StepperWidget(QWidget):
         bounded_index = max(0, min(step_index, len(self.step_circles)))
         self.current_step = bounded_index
 
-        for idx, circle in enumerate(self.step_circles):
-            if idx < bounded_index:
-                state = "completed"
-                circle.setText("✓")
-            elif idx == bounded_index:
-                state = "active"
-                circle.setText(str(idx + 1))
-            else:
-                state = "pending"
-                circle.setText(str(idx + 1))
-
-            circle.setProperty("state", state)
-            circle.style().unpolish(circle)
-            circle.style().polish(circle)
-
-        for idx, line in enumerate(self.step_lines):
-            state = "completed" if idx < bounded_index else "pending"
-            line.setProperty("state", state)
-            line.style().unpolish(line)
-            line.style().polish(line)
-
-            target_width = line.minimumWidth() if state == "completed" else 0
-            current_width = line.maximumWidth()
-            if current_width is None:
-                current_width = line.width()
-
-            anim = self.line_anims[idx]
-            anim.stop()
-            anim.setStartValue(current_width)
-            anim.setEndValue(target_width)
-            anim.start()
+        completed, active, pending = self._COMPLETED, self._ACTIVE, self._PENDING
+        self.setUpdatesEnabled(False)
+        try:
+            for idx, circle in enumerate(self.step_circles):
+                if idx < bounded_index:
+                    state = completed
+                elif idx == bounded_index:
+                    state = active
+                else:
+                    state = pending
+
+                previous = self._circle_states[idx]
+                if state != previous:
+                    # El texto solo depende de si el paso está completado
+                    if state == completed:
+                        circle.setText(self._CHECK_MARK)
+                    elif previous == completed:
+                        circle.setText(str(idx + 1))
+                    self._circle_states[idx] = state
+                    circle.setProperty("state", state)
+                    # polish basta para reevaluar los selectores [state=...] de la hoja de
+                    # estilos; ensurePolished no lo hace y unpolish solo añade trabajo
+                    circle.style().polish(circle)
+
+            self._line_group.stop()
+            for idx, line in enumerate(self.step_lines):
+                state = completed if idx < bounded_index else pending
+                if state != self._line_states[idx]:
+                    self._line_states[idx] = state
+                    line.setProperty("state", state)
+                    line.style().polish(line)
+
+                anim = self.line_anims[idx]
+                anim.setStartValue(line.maximumWidth())
+                anim.setEndValue(line.minimumWidth() if state == completed else 0)
+            self._line_group.start()
+        finally:
+            self.setUpdatesEnabled(True)
 
 
 __all__ = [
@@ -285,6 +495,9 @@ __all__ = [
     "StatusChip",
     "AnimatedNavList",
     "ModernTable",
+    "ModernTableView",
+    "StatusChipDelegate",
+    "PdfButtonDelegate",
     "TableTools",
     "StepperWidget",
 ]
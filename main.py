@@ -12,6 +12,7 @@ import pandas as pd
 from datetime import datetime, timedelta, date
 import platform
 import ctypes
+from functools import lru_cache
 from pathlib import Path
 
 from PySide6.QtWidgets import (
@@ -28,7 +29,7 @@ from PySide6.QtGui import (
 
 from PySide6.QtGui import QDesktopServices
 from PySide6.QtCore import (
-QEasingCurve, QPoint, QPropertyAnimation, QRect, QSettings, QSize, QThread, QTimer, QUrl, Qt, QLocale, QTranslator
+QEasingCurve, QPoint, QPropertyAnimation, QRect, QSettings, QSignalBlocker, QSize, QThread, QTimer, QUrl, Qt, QLocale, QTranslator
 )
 
 from worker import Worker, detect_available_browser
@@ -57,28 +58,43 @@ from app.core.resources import (
 )
 from app.core.settings import get_settings, AppSettings
 from app.core.logging import get_logger, configure_logging
-from app.services.database import init_database, get_connection, execute_many, clear_history, fetch_all
+from app.services.database import init_database, get_connection, execute_many, clear_history, compact_database, db_datetime
 from app.services.maintenance import (
     run_health_checks,
     create_backup,
     check_remote_template_version,
     download_template,
-    compute_file_checksum,
+    get_cached_template_checksum,
 )
+from app.services.invoice_processing import InvoiceProcessingService
 from app.services.stats import StatsService
 from app.ui.widgets import (
     AnimatedButton,
     StatusChip,
     AnimatedNavList,
     ModernTable,
+    ModernTableView,
+    StatusChipDelegate,
+    PdfButtonDelegate,
     TableTools,
     StepperWidget,
 )
+from app.ui.history_model import HistoryTableModel
 from app.ui.dialogs import HealthCheckDialog, JsonViewerDialog, BackupSummaryDialog
+from app.ui.throttling import throttled
 
 
 logger = get_logger("ui.main")
 
+# Tamaños de fuente del combo de ajustes (texto -> px); se construye una sola vez
+_FONT_SIZE_MAP = {
+    "Pequeño (13px)": 13,
+    "Normal (15px)": 15,
+    "Grande (17px)": 17,
+    "Muy Grande (19px)": 19,
+}
+_DEFAULT_FONT_SIZE = 15
+
 # --- Helpers ---
 def _normalize_invoice_id(x):
     s = str(x).strip()
@@ -92,15 +108,56 @@ def _normalize_invoice_id(x):
     return s
 
 
-# Formato monetario (es-ES): 3.976,42€
-def format_eur(value) -> str:
+# Formato monetario (es-ES): 3.976,42€, con la caché de importes del servicio
+format_eur = InvoiceProcessingService.format_currency_eur
+
+
+# Plantilla QSS precompilada: rutas de logos resueltas y colores de acento
+# sustituidos por marcadores. Se reconstruye solo si styles.qss cambia en disco.
+_QSS_ACCENT = "%%ACCENT%%"
+_QSS_ACCENT_DARK = "%%ACCENT_DARK%%"
+_QSS_BG_ACCENT_RE = re.compile(r'background-color:\s*#a0bf6e', re.IGNORECASE)
+_QSS_BG_ACCENT_DARK_RE = re.compile(r'background-color:\s*#87a15d', re.IGNORECASE)
+_QSS_BORDER_ACCENT_RE = re.compile(r'border.*:\s*[^;]*#A0BF6E')
+_QSS_BORDER_ACCENT_DARK_RE = re.compile(r'border.*:\s*[^;]*#87a15D')
+_qss_template_cache = {}
+
+
+def _load_qss_template(qss_path):
+    """Devuelve la plantilla QSS con marcadores de acento, reconstruida solo si el fichero cambió."""
+    mtime = os.stat(qss_path).st_mtime_ns
+    cached = _qss_template_cache.get(qss_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with open(qss_path, "r", encoding="utf-8") as f:
+        qss = f.read()
+
+    logo_light_path = resource_path(os.path.join("resources", "logo_light.png")).replace("\\", "/")
+    logo_dark_path = resource_path(os.path.join("resources", "logo_dark.png")).replace("\\", "/")
+    qss = qss.replace("%%LOGO_LIGHT%%", logo_light_path)
+    qss = qss.replace("%%LOGO_DARK%%", logo_dark_path)
+
+    # Solo en background-color y border: el color del texto no sigue al acento
+    qss = _QSS_BG_ACCENT_RE.sub(f'background-color: {_QSS_ACCENT}', qss)
+    qss = _QSS_BG_ACCENT_DARK_RE.sub(f'background-color: {_QSS_ACCENT_DARK}', qss)
+    qss = _QSS_BORDER_ACCENT_RE.sub(lambda m: m.group(0).replace('#A0BF6E', _QSS_ACCENT), qss)
+    qss = _QSS_BORDER_ACCENT_DARK_RE.sub(lambda m: m.group(0).replace('#87a15D', _QSS_ACCENT_DARK), qss)
+
+    _qss_template_cache[qss_path] = (mtime, qss)
+    return qss
+
+@lru_cache(maxsize=16)
+def _load_svg_icon(svg_path):
+    """QIcon de un SVG, cargado una vez por ruta; None si no existe o no es válido."""
     try:
-        v = float(value)
+        if not os.path.exists(svg_path):
+            return None
+        icon = QIcon(svg_path)
     except Exception:
-        return ""
-    s = f"{v:,.2f}"
-    s = s.replace(",", "X").replace(".", ",").replace("X", ".")
-    return f"{s}€"
+        return None
+    return None if icon.isNull() else icon
+
 
 # [NUEVO] Helper para aplicar sombras
 def apply_shadow(widget, blur=20, offset_y=4, color_str="#000000"):
@@ -508,19 +565,14 @@ class MainWindow(QMainWindow):
             )
         )
 
-        # Intentar cargar icono SVG
+        # Icono SVG compartido con el delegado PDF del histórico: se carga una vez por ruta
         icon = None
-        try:
-            if svg_path and os.path.exists(svg_path):
-                icon = QIcon(svg_path)
-            else:
-                default_svg = os.path.join(RESOURCE_DIR, "ver.pdf.svg")
-                if os.path.exists(default_svg):
-                    icon = QIcon(default_svg)
-        except Exception:
-            icon = None
+        if svg_path:
+            icon = _load_svg_icon(svg_path)
+        if icon is None:
+            icon = _load_svg_icon(os.path.join(RESOURCE_DIR, "ver.pdf.svg"))
 
-        if icon and not icon.isNull():
+        if icon is not None:
             btn.setIcon(icon)
             btn.setIconSize(QSize(20, 20))
             btn.setToolButtonStyle(Qt.ToolButtonIconOnly)
@@ -598,13 +650,7 @@ class MainWindow(QMainWindow):
         app = QApplication.instance()
         if app:
             saved_font_size = self.settings.value("font_size", "Normal (15px)")
-            size_map = {
-                "Pequeño (13px)": 13,
-                "Normal (15px)": 15,
-                "Grande (17px)": 17,
-                "Muy Grande (19px)": 19
-            }
-            font_size = size_map.get(saved_font_size, 15)
+            font_size = _FONT_SIZE_MAP.get(saved_font_size, _DEFAULT_FONT_SIZE)
             font = QFont("Segoe UI Variable", font_size)
             font.setStyleStrategy(QFont.StyleStrategy.PreferQuality)
             app.setFont(font)
@@ -633,6 +679,8 @@ class MainWindow(QMainWindow):
         self.df_factura_historico = None
         self.df_conceptos_historico = None
         # --- [FIN NUEVO] ---
+        # Asistente de rectificativas, reutilizado entre aperturas
+        self._rect_dialog = None
         self.validation_errors = []
         self.post_action_mode = "MARK"
         self._overlay = Overlay(self)
@@ -661,6 +709,7 @@ class MainWindow(QMainWindow):
         # Inicializar lógica de UI después de crear los widgets
         self.ui_logic = MainWindowLogic(self)
         self.ui_logic.setup_connections()
+        self.load_history()
 
         # Atajos de teclado
         self.shortcut_open = QShortcut(QKeySequence("Ctrl+O"), self)
@@ -694,37 +743,12 @@ class MainWindow(QMainWindow):
         if not os.path.exists(qss_path):
             return ""
 
-        with open(qss_path, "r", encoding="utf-8") as f:
-            qss = f.read()
-
-        # Replace placeholders with actual paths
-        logo_light_path = resource_path(os.path.join("resources", "logo_light.png")).replace("\\", "/")
-        logo_dark_path = resource_path(os.path.join("resources", "logo_dark.png")).replace("\\", "/")
-
-        qss = qss.replace("%%LOGO_LIGHT%%", logo_light_path)
-        qss = qss.replace("%%LOGO_DARK%%", logo_dark_path)
-        
-        # Replace color placeholders with current accent color
-        # Calculate darker shade for hover (reduce brightness by ~15%)
-        from PySide6.QtGui import QColor
-        base_color = QColor(COLOR_PRIMARY)
-        darker_color = base_color.darker(115)  # 15% darker
-        
-        # Replace all instances of the default green color with the accent color
-        # IMPORTANTE: Solo reemplazar en background-color, no en color (texto)
-        # Usar regex para ser más preciso y evitar reemplazar el color del texto
-        import re
-        # Reemplazar solo en background-color
-        qss = re.sub(r'background-color:\s*#A0BF6E', f'background-color: {COLOR_PRIMARY}', qss)
-        qss = re.sub(r'background-color:\s*#a0bf6e', f'background-color: {COLOR_PRIMARY.lower()}', qss, flags=re.IGNORECASE)
-        qss = re.sub(r'background-color:\s*#87a15D', f'background-color: {darker_color.name()}', qss)
-        qss = re.sub(r'background-color:\s*#87a15d', f'background-color: {darker_color.name().lower()}', qss, flags=re.IGNORECASE)
-        
-        # También reemplazar en border-color si aparece
-        qss = re.sub(r'border.*:\s*[^;]*#A0BF6E', lambda m: m.group(0).replace('#A0BF6E', COLOR_PRIMARY), qss)
-        qss = re.sub(r'border.*:\s*[^;]*#87a15D', lambda m: m.group(0).replace('#87a15D', darker_color.name()), qss)
+        # La plantilla ya trae logos resueltos; solo quedan los colores de acento
+        qss = _load_qss_template(qss_path)
 
-        return qss
+        # Tono más oscuro para hover (~15% menos brillo)
+        darker_color = QColor(COLOR_PRIMARY).darker(115)
+        return qss.replace(_QSS_ACCENT_DARK, darker_color.name()).replace(_QSS_ACCENT, COLOR_PRIMARY)
 
     # ----- Login gating -----
     # [REVISADO] require_login con centrado y estilo más robustos
@@ -1406,9 +1430,17 @@ class MainWindow(QMainWindow):
         history_layout.setContentsMargins(0, 0, 0, 0)
         history_layout.setSpacing(0)
 
-        # Histórico ahora muestra 8 columnas (incluye importe)
-        self.table_history = ModernTable(0, 9)
-        self.table_history.setHorizontalHeaderLabels(["ID", "Fecha", "Factura", "Empresa Emisora", "Cliente", "Importe", "Estado", "Detalles", "PDF"])
+        # Histórico model/view: Qt solo consulta las celdas visibles y los delegados
+        # pintan estado y botón de PDF sin crear widgets por fila.
+        # MainWindowLogic adopta este modelo y lo rellena
+        self.table_history = ModernTableView()
+        self.table_history.setModel(HistoryTableModel(parent=self.table_history))
+        self.table_history.setItemDelegateForColumn(
+            HistoryTableModel.STATUS_COLUMN, StatusChipDelegate(self.table_history)
+        )
+        pdf_delegate = PdfButtonDelegate(_load_svg_icon(os.path.join(RESOURCE_DIR, "ver.pdf.svg")), self.table_history)
+        pdf_delegate.clicked.connect(self._open_history_pdf)
+        self.table_history.setItemDelegateForColumn(HistoryTableModel.PDF_COLUMN, pdf_delegate)
         # Ajuste de columnas histórico
         hh = self.table_history.horizontalHeader()
         hh.setStretchLastSection(False)
@@ -1425,7 +1457,6 @@ class MainWindow(QMainWindow):
         history_layout.addWidget(TableTools(self.table_history))
         history_layout.addWidget(self.table_history)
         layout.addWidget(history_card)
-        self.load_history()
         return page
 
     # [MODIFICADO] create_config_page ahora usa ConfigGroup y tiene botón Borrar Histórico
@@ -1663,6 +1694,12 @@ class MainWindow(QMainWindow):
         btn_backup.clicked.connect(self.create_backup_archive)
         tools_row.addWidget(btn_backup)
 
+        btn_compact_db = AnimatedButton("🗜️ Compactar base de datos")
+        btn_compact_db.setToolTip("Reescribe la base de datos para devolver al disco el espacio libre.")
+        btn_compact_db.setStyleSheet("padding: 8px 20px; min-height: 32px; font-size: 13px;")
+        btn_compact_db.clicked.connect(self.compact_database_confirmation)
+        tools_row.addWidget(btn_compact_db)
+
         btn_api_viewer = AnimatedButton("🧾 Última respuesta API")
         btn_api_viewer.setToolTip("Visualiza el JSON bruto de la última respuesta de la API.")
         btn_api_viewer.setStyleSheet("padding: 8px 20px; min-height: 32px; font-size: 13px;")
@@ -1822,6 +1859,21 @@ class MainWindow(QMainWindow):
             logger.exception("Error creando copia de seguridad")
             self.show_error(f"No se pudo crear la copia de seguridad: {exc}")
 
+    def compact_database_confirmation(self):
+        reply = QMessageBox.question(self, 'Compactar base de datos',
+                                     "La compactación reescribe la base de datos completa y puede tardar.\n"
+                                     "Durante ese tiempo no se podrán registrar envíos. ¿Continuar?",
+                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+                                     QMessageBox.StandardButton.No)
+        if reply != QMessageBox.StandardButton.Yes:
+            return
+        try:
+            compact_database()
+            self.show_toast("✅ Base de datos compactada.")
+        except Exception as exc:
+            logger.exception("Error compactando la base de datos")
+            self.show_error(f"No se pudo compactar la base de datos: {exc}")
+
     def open_last_api_response(self):
         responses_dir = Path(resource_path("responses"))
         if not responses_dir.exists():
@@ -1860,12 +1912,20 @@ class MainWindow(QMainWindow):
             self.settings.setValue(AppSettings.KEY_TEMPLATE_URL, update_url)
             self.settings.sync()
 
-        checksum = compute_file_checksum(schema_path)
-        result = check_remote_template_version(update_url, checksum)
+        checksum = get_cached_template_checksum(schema_path)
+        # El ETag solo vale mientras la plantilla local sea la que se descargó con él
+        etag = ""
+        if self.settings.value(AppSettings.KEY_TEMPLATE_ETAG_CHECKSUM, "") == checksum:
+            etag = self.settings.value(AppSettings.KEY_TEMPLATE_ETAG, "")
+        pending_path = schema_path.with_name(schema_path.name + ".download")
+        result = check_remote_template_version(update_url, checksum, etag=etag, download_to=pending_path)
         estado = result.get("estado", "INFO")
         detalle = result.get("detalle", "")
 
         if estado == "OK":
+            if result.get("etag"):
+                self.settings.setValue(AppSettings.KEY_TEMPLATE_ETAG, result["etag"])
+                self.settings.setValue(AppSettings.KEY_TEMPLATE_ETAG_CHECKSUM, checksum)
             QMessageBox.information(self, "Actualización de plantillas", detalle or "Todo actualizado.")
             return
 
@@ -1881,12 +1941,23 @@ class MainWindow(QMainWindow):
             QMessageBox.Yes | QMessageBox.No,
             QMessageBox.Yes,
         )
+        downloaded = result.get("descarga")
         if reply != QMessageBox.Yes:
+            if downloaded:
+                Path(downloaded).unlink(missing_ok=True)
             return
 
         try:
             destination = schema_path
-            download_template(update_url, destination)
+            if downloaded:
+                # La versión nueva ya se descargó al comprobarla
+                os.replace(downloaded, destination)
+                new_checksum = get_cached_template_checksum(destination)
+            else:
+                destination, new_checksum = download_template(update_url, destination)
+            if result.get("etag"):
+                self.settings.setValue(AppSettings.KEY_TEMPLATE_ETAG, result["etag"])
+                self.settings.setValue(AppSettings.KEY_TEMPLATE_ETAG_CHECKSUM, new_checksum)
             self.show_toast("✅ Plantilla actualizada correctamente.")
         except Exception as exc:
             logger.exception("Error descargando plantilla")
@@ -2781,107 +2852,86 @@ class MainWindow(QMainWindow):
     # INICIO DEL BLOQUE CORREGIDO (AÑADIDA INDENTACIÓN)
     # ######################################################################
 
+    # Máximo de envíos que muestra la tabla del histórico
+    def _history_where(self, apply_filters=True):
+        """Construye las condiciones WHERE (y sus parámetros) de los filtros del histórico."""
+        query = ""
+        params = []
+        if not apply_filters or not hasattr(self, 'history_filter_empresa'):
+            return query, params
+
+        empresa = self.history_filter_empresa.currentText()
+        if empresa != "Todas las Empresas":
+            query += " AND empresa = ?"
+            params.append(empresa)
+
+        estado = self.history_filter_estado.currentText()
+        if estado != "Todos":
+            query += " AND estado = ?"
+            params.append(estado)
+
+        periodo = self.history_filter_periodo.currentText()
+        if periodo != "Todos":
+            now = datetime.now()
+            if periodo == "1º Trimestre":
+                query += " AND strftime('%m', fecha_envio) IN ('01', '02', '03')"
+            elif periodo == "2º Trimestre":
+                query += " AND strftime('%m', fecha_envio) IN ('04', '05', '06')"
+            elif periodo == "3º Trimestre":
+                query += " AND strftime('%m', fecha_envio) IN ('07', '08', '09')"
+            elif periodo == "4º Trimestre":
+                query += " AND strftime('%m', fecha_envio) IN ('10', '11', '12')"
+            elif periodo in ("Este mes", "Mes anterior"):
+                # Rango sobre fecha_envio (usa su índice) en lugar de strftime() por fila
+                month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+                if periodo == "Mes anterior":
+                    month_end = month_start
+                    month_start = (month_start - timedelta(days=1)).replace(day=1)
+                else:
+                    month_end = (month_start + timedelta(days=32)).replace(day=1)
+                query += " AND fecha_envio >= ? AND fecha_envio < ?"
+                params.extend([db_datetime(month_start), db_datetime(month_end)])
+
+        search_text = self.history_search.text().strip()
+        if search_text:
+            query += " AND (num_factura LIKE ? OR cliente LIKE ? OR empresa LIKE ?)"
+            search_param = f"%{search_text}%"
+            params.extend([search_param, search_param, search_param])
+        return query, params
+
     def load_history(self, apply_filters=True):
-        if not hasattr(self, "table_history"):
+        # La primera carga espera a ui_logic, que se crea tras construir las páginas
+        if not hasattr(self, "table_history") or self.ui_logic is None:
             return
-
-        table = self.table_history
-        table.setUpdatesEnabled(False)
-        rows = []
-        try:
-            query = (
-                "SELECT id, fecha_envio, num_factura, empresa, estado, detalles, pdf_url, "
-                "pdf_local_path, importe, cliente FROM envios WHERE 1=1"
+        where, params = self._history_where(apply_filters)
+        # La primera página va al pool de hilos; las siguientes se piden al desplazarse
+        self.ui_logic.load_history_pages(
+            lambda cursor_date, cursor_id, limit: self.controller.load_history_matching(
+                where, params, limit, cursor_date, cursor_id
             )
-            params = []
-
-            if apply_filters and hasattr(self, 'history_filter_empresa'):
-                empresa = self.history_filter_empresa.currentText()
-                if empresa != "Todas las Empresas":
-                    query += " AND empresa = ?"
-                    params.append(empresa)
-
-                estado = self.history_filter_estado.currentText()
-                if estado != "Todos":
-                    query += " AND estado = ?"
-                    params.append(estado)
-
-                periodo = self.history_filter_periodo.currentText()
-                if periodo != "Todos":
-                    now = datetime.now()
-                    if periodo == "1º Trimestre":
-                        query += " AND strftime('%m', fecha_envio) IN ('01', '02', '03')"
-                    elif periodo == "2º Trimestre":
-                        query += " AND strftime('%m', fecha_envio) IN ('04', '05', '06')"
-                    elif periodo == "3º Trimestre":
-                        query += " AND strftime('%m', fecha_envio) IN ('07', '08', '09')"
-                    elif periodo == "4º Trimestre":
-                        query += " AND strftime('%m', fecha_envio) IN ('10', '11', '12')"
-                    elif periodo == "Este mes":
-                        query += " AND strftime('%Y-%m', fecha_envio) = strftime('%Y-%m', 'now')"
-                    elif periodo == "Mes anterior":
-                        last_month = (now.replace(day=1) - timedelta(days=1))
-                        query += f" AND strftime('%Y-%m', fecha_envio) = '{last_month.strftime('%Y-%m')}'"
-
-                search_text = self.history_search.text().strip()
-                if search_text:
-                    query += " AND (num_factura LIKE ? OR cliente LIKE ? OR empresa LIKE ?)"
-                    search_param = f"%{search_text}%"
-                    params.extend([search_param, search_param, search_param])
-
-            query += " ORDER BY fecha_envio DESC LIMIT 1000"
-            rows = list(fetch_all(query, params))
-
-            table.setRowCount(0)
-
-            for db_id, fecha, num_factura, empresa, estado, detalles, pdf_url, pdf_local_path, importe, cliente in rows:
-                row_index = table.rowCount()
-                table.insertRow(row_index)
-
-                table.setItem(row_index, 0, QTableWidgetItem(str(db_id)))
-                table.setItem(row_index, 1, QTableWidgetItem(fecha))
-                table.setItem(row_index, 2, QTableWidgetItem(num_factura))
-                table.setItem(row_index, 3, QTableWidgetItem(empresa))
-                table.setItem(row_index, 4, QTableWidgetItem(cliente))
-
-                item_importe = QTableWidgetItem(format_eur(importe))
-                item_importe.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                table.setItem(row_index, 5, item_importe)
-
-                chip = StatusChip(estado)
-                table.setCellWidget(row_index, 6, chip)
-
-                table.setItem(row_index, 7, QTableWidgetItem(detalles))
-
-                btn_pdf = self._make_pdf_button(
-                    num_factura,
-                    pdf_url,
-                    local_path=pdf_local_path,
-                    cliente=cliente,
-                    importe=format_eur(importe)
-                )
-                if btn_pdf:
-                    table.setCellWidget(row_index, 8, btn_pdf)
-
-            table.resizeColumnToContents(0)
-            table.resizeColumnToContents(1)
-            table.resizeColumnToContents(2)
-            table.resizeColumnToContents(4)
-            table.resizeColumnToContents(5)
-            table.resizeColumnToContents(7)
-
-            if hasattr(self, 'history_filter_empresa'):
-                empresas_actuales = {self.history_filter_empresa.itemText(i) for i in range(self.history_filter_empresa.count())}
-                empresas_en_bd = {empresa for (_, _, _, empresa, *_rest) in rows if empresa}
-                for emp in sorted(empresas_en_bd - empresas_actuales):
-                    self.history_filter_empresa.addItem(emp)
+        )
 
-            self.update_dashboard_stats()
-        except Exception as e:
-            self.show_toast(f"Error cargando histórico: {str(e)}")
-            logger.exception("Error cargando histórico")
-        finally:
-            table.setUpdatesEnabled(True)
+    def _history_table_updated(self, entries):
+        """Tras cada carga del histórico: empresas del filtro y estadísticas del dashboard."""
+        if hasattr(self, 'history_filter_empresa'):
+            empresas_actuales = {self.history_filter_empresa.itemText(i) for i in range(self.history_filter_empresa.count())}
+            empresas_en_bd = {entry.company for entry in entries if entry.company}
+            for emp in sorted(empresas_en_bd - empresas_actuales):
+                self.history_filter_empresa.addItem(emp)
+        self.update_dashboard_stats()
+
+    def _open_history_pdf(self, index):
+        """Abre el PDF de la fila del histórico cuyo botón se ha pulsado."""
+        entry = index.data(Qt.UserRole)
+        if entry is None:
+            return
+        self._open_invoice_pdf(
+            entry.invoice_id,
+            entry.pdf_url or "",
+            local_path=entry.pdf_local_path,
+            cliente=entry.customer,
+            importe=format_eur(entry.amount)
+        )
     
     def apply_history_filters(self, *args):
         """Aplica los filtros de búsqueda al histórico."""
@@ -2889,17 +2939,30 @@ class MainWindow(QMainWindow):
     
     def clear_history_filters(self):
         """Limpia todos los filtros del histórico."""
-        if hasattr(self, 'history_filter_empresa'):
-            self.history_filter_empresa.setCurrentIndex(0)
-        if hasattr(self, 'history_filter_estado'):
-            self.history_filter_estado.setCurrentIndex(0)
-        if hasattr(self, 'history_filter_periodo'):
-            self.history_filter_periodo.setCurrentIndex(0)
-        if hasattr(self, 'history_search'):
-            self.history_search.clear()
+        # Sin señales: cada cambio programaría su propia recarga antes de la final
+        widgets = [
+            getattr(self, name)
+            for name in ('history_filter_empresa', 'history_filter_estado', 'history_filter_periodo', 'history_search')
+            if hasattr(self, name)
+        ]
+        blockers = [QSignalBlocker(widget) for widget in widgets]
+        try:
+            if hasattr(self, 'history_filter_empresa'):
+                self.history_filter_empresa.setCurrentIndex(0)
+            if hasattr(self, 'history_filter_estado'):
+                self.history_filter_estado.setCurrentIndex(0)
+            if hasattr(self, 'history_filter_periodo'):
+                self.history_filter_periodo.setCurrentIndex(0)
+            if hasattr(self, 'history_search'):
+                self.history_search.clear()
+        finally:
+            for blocker in blockers:
+                blocker.unblock()
         self.queue_history_reload(apply_filters=False, immediate=True)
 
     def queue_history_reload(self, apply_filters=True, immediate=False):
+        # Tras escribir en el historial: las estadísticas memorizadas dejan de valer
+        self.ui_logic.invalidate_stats_cache()
         self._history_pending_apply_filters = apply_filters
         if immediate:
             self.history_reload_timer.stop()
@@ -2912,7 +2975,7 @@ class MainWindow(QMainWindow):
     
     def export_history(self):
         """Exporta el historial a Excel o CSV."""
-        if not hasattr(self, 'table_history') or self.table_history.rowCount() == 0:
+        if not hasattr(self, 'table_history') or self.table_history.model().rowCount() == 0:
             self.show_toast("⚠️ No hay datos en el historial para exportar.")
             return
         
@@ -2930,43 +2993,8 @@ class MainWindow(QMainWindow):
             with get_connection(readonly=True) as conn:
                 cursor = conn.cursor()
 
-                query = "SELECT fecha_envio, num_factura, empresa, cliente, importe, estado, detalles, pdf_url FROM envios WHERE 1=1"
-                params = []
-
-                if hasattr(self, 'history_filter_empresa'):
-                    empresa = self.history_filter_empresa.currentText()
-                    if empresa != "Todas las Empresas":
-                        query += " AND empresa = ?"
-                        params.append(empresa)
-
-                    estado = self.history_filter_estado.currentText()
-                    if estado != "Todos":
-                        query += " AND estado = ?"
-                        params.append(estado)
-
-                    periodo = self.history_filter_periodo.currentText()
-                    if periodo != "Todos":
-                        now = datetime.now()
-                        if periodo == "1º Trimestre":
-                            query += " AND strftime('%m', fecha_envio) IN ('01', '02', '03')"
-                        elif periodo == "2º Trimestre":
-                            query += " AND strftime('%m', fecha_envio) IN ('04', '05', '06')"
-                        elif periodo == "3º Trimestre":
-                            query += " AND strftime('%m', fecha_envio) IN ('07', '08', '09')"
-                        elif periodo == "4º Trimestre":
-                            query += " AND strftime('%m', fecha_envio) IN ('10', '11', '12')"
-                        elif periodo == "Este mes":
-                            query += " AND strftime('%Y-%m', fecha_envio) = strftime('%Y-%m', 'now')"
-                        elif periodo == "Mes anterior":
-                            last_month = (now.replace(day=1) - timedelta(days=1))
-                            query += f" AND strftime('%Y-%m', fecha_envio) = '{last_month.strftime('%Y-%m')}'"
-
-                    search_text = self.history_search.text().strip()
-                    if search_text:
-                        query += " AND (num_factura LIKE ? OR cliente LIKE ? OR empresa LIKE ?)"
-                        search_param = f"%{search_text}%"
-                        params.extend([search_param, search_param, search_param])
-
+                where, params = self._history_where()
+                query = "SELECT fecha_envio, num_factura, empresa, cliente, importe, estado, detalles, pdf_url FROM envios WHERE 1=1" + where
                 query += " ORDER BY fecha_envio DESC"
                 cursor.execute(query, params)
                 rows = cursor.fetchall()
@@ -3055,13 +3083,7 @@ class MainWindow(QMainWindow):
     
     def apply_font_size(self, size_text):
         """Aplica el tamaño de fuente seleccionado."""
-        size_map = {
-            "Pequeño (13px)": 13,
-            "Normal (15px)": 15,
-            "Grande (17px)": 17,
-            "Muy Grande (19px)": 19
-        }
-        font_size = size_map.get(size_text, 15)
+        font_size = _FONT_SIZE_MAP.get(size_text, _DEFAULT_FONT_SIZE)
         self.settings.setValue("font_size", size_text)
         
         # Actualizar fuente global
@@ -3306,6 +3328,8 @@ class MainWindow(QMainWindow):
             self.show_error(f"Error procesando cola offline: {e}")
 
     # [MODIFICADO] update_dashboard_stats ahora es más simple (sin Top 5)
+    # Cada recarga del histórico la llama: se limita a una ejecución cada 200 ms
+    @throttled(200)
     def update_dashboard_stats(self):
         """Actualiza las 4 tarjetas principales del Dashboard desde la DB."""
         if not all([self.total_label, self.success_label, self.month_total_label, self.month_count_label]):
@@ -3587,9 +3611,11 @@ class MainWindow(QMainWindow):
             return
             
         self.toast.setText(message)
-        self.toast.setProperty("class", color_class) # info, success, warning, error
-        self.toast.style().unpolish(self.toast)
-        self.toast.style().polish(self.toast)
+        # Repulir el estilo solo si cambia la clase: recalcular el QSS es lo costoso
+        if self.toast.property("class") != color_class:
+            self.toast.setProperty("class", color_class) # info, success, warning, error
+            self.toast.style().unpolish(self.toast)
+            self.toast.style().polish(self.toast)
         
         self.toast.adjustSize()
         width = self.toast.width() + 40 # Añadir padding horizontal
@@ -3642,10 +3668,14 @@ class MainWindow(QMainWindow):
             )
             return
         
-        # Crear y mostrar el diálogo
-        dialog = RectificativaDialog(self, self.df_factura_historico)
-        dialog.factura_created.connect(self.on_rectificativa_created)
-        dialog.exec()
+        # Crear el diálogo la primera vez; después se reinicia conservando las
+        # páginas ya construidas si el histórico no ha cambiado
+        if self._rect_dialog is None:
+            self._rect_dialog = RectificativaDialog(self, self.df_factura_historico)
+            self._rect_dialog.factura_created.connect(self.on_rectificativa_created)
+        else:
+            self._rect_dialog.reset(self.df_factura_historico)
+        self._rect_dialog.exec()
     
     def on_rectificativa_created(self, datos_rectificativa: dict):
         """Maneja la creación de una factura rectificativa"""
@@ -4,15 +4,20 @@ Configuración de pytest y fixtures compartidas.
 import os
 import sys
 import tempfile
+import uuid
 from pathlib import Path
 from typing import Generator
 
+import pandas as pd
 import pytest
 
 # Añadir el directorio raíz al path para imports
 ROOT_DIR = Path(__file__).parent.parent
 sys.path.insert(0, str(ROOT_DIR))
 
+# Qt sin servidor gráfico: debe fijarse antes de que algún módulo de test cree la aplicación
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
 
 @pytest.fixture
 def temp_dir() -> Generator[Path, None, None]:
@@ -28,11 +33,74 @@ def temp_db_path(temp_dir: Path) -> Path:
 
 
 @pytest.fixture
-def mock_db_path(temp_db_path: Path, monkeypatch):
-    """Mockea la ruta de la base de datos para tests."""
+def mock_db_path(monkeypatch):
+    """
+    Mockea la ruta de la base de datos con una base SQLite en memoria compartida.
+    Cada test usa un nombre propio; la base desaparece al cerrar sus conexiones.
+    """
+    from app.services.database import close_all_connections
+    
+    uri = f"file:memdb_{uuid.uuid4().hex}?mode=memory&cache=shared"
+    monkeypatch.setattr("app.core.resources.DB_PATH", uri)
+    yield uri
+    close_all_connections()
+
+
+@pytest.fixture(scope="session")
+def initialized_db() -> Generator[str, None, None]:
+    """
+    Base SQLite en memoria compartida con el esquema creado una sola vez por sesión.
+    Una conexión propia la mantiene viva aunque los tests cierren las del pool.
+    """
+    import sqlite3
+    from app.services.database import init_database
+    
+    uri = f"file:memdb_{uuid.uuid4().hex}?mode=memory&cache=shared"
+    keeper = sqlite3.connect(uri, uri=True)
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("app.core.resources.DB_PATH", uri)
+        init_database()
+    yield uri
+    keeper.close()
+
+
+@pytest.fixture
+def clean_db(initialized_db: str, monkeypatch) -> str:
+    """
+    Apunta a la base de sesión tras vaciar sus tablas.
+    La conexión del hilo se reutiliza de un test a otro en lugar de reabrirse.
+    """
+    from app.services.database import get_connection
+    
+    monkeypatch.setattr("app.core.resources.DB_PATH", initialized_db)
+    with get_connection() as conn:
+        # sqlite_sequence: los ids AUTOINCREMENT vuelven a empezar en 1
+        conn.executescript(
+            "DELETE FROM envios; DELETE FROM offline_queue; DELETE FROM sqlite_sequence;"
+        )
+    return initialized_db
+
+
+@pytest.fixture
+def file_db_path(temp_db_path: Path, monkeypatch):
+    """Mockea la ruta de la base de datos con un fichero real (WAL, VACUUM, bases heredadas)."""
+    from app.services.database import close_all_connections
+    
     monkeypatch.setattr("app.core.resources.DB_PATH", str(temp_db_path))
-    monkeypatch.setattr("app.services.database.DB_PATH", str(temp_db_path))
-    return temp_db_path
+    yield temp_db_path
+    close_all_connections()
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    """QApplication compartida para tests que crean widgets: se inicializa una vez por sesión."""
+    from PySide6.QtCore import QEvent
+    from PySide6.QtWidgets import QApplication
+    
+    app = QApplication.instance() or QApplication([])
+    yield app
+    # Liberar los widgets pendientes de deleteLater antes de cerrar el intérprete
+    app.sendPostedEvents(None, QEvent.DeferredDelete)
 
 
 @pytest.fixture
@@ -47,11 +115,9 @@ def sample_invoice_data():
     }
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_dataframe():
-    """DataFrame de ejemplo con datos de facturas."""
-    import pandas as pd
-    
+    """DataFrame de ejemplo con datos de facturas (compartido por la sesión: no modificar)."""
     data = {
         "NumFactura": ["25001", "25002", "25003"],
         "empresa_emisora": ["Company A", "Company B", "Company A"],
@@ -61,11 +127,9 @@ def sample_dataframe():
     return pd.DataFrame(data)
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_conceptos_dataframe():
-    """DataFrame de ejemplo con conceptos."""
-    import pandas as pd
-    
+    """DataFrame de ejemplo con conceptos (compartido por la sesión: no modificar)."""
     data = {
         "NumFactura": ["25001", "25001", "25002"],
         "descripcion": ["Servicio 1", "Servicio 2", "Servicio 3"],
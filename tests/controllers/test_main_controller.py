@@ -0,0 +1,377 @@
+"""
+Tests para el controlador principal.
+"""
+import pytest
+
+from app.controllers.main_controller import MainController
+from app.services.database import init_database, execute_many, fetch_all
+
+
+@pytest.fixture
+def controller(mock_db_path):
+    """Controlador sobre una base de datos temporal inicializada."""
+    init_database()
+    return MainController()
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_update_pdf_paths_in_history(controller, temp_dir):
+    """Test de actualización de rutas de PDF con un único recorrido del directorio."""
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)",
+        [
+            ("2025-01-01 12:00:00", "25001", "Company_A", "OK"),
+            ("2025-01-02 12:00:00", "25001", "Company_A", "OK"),
+            ("2025-01-02 12:00:00", "25002", "Company_B", "OK"),
+        ]
+    )
+    pdf_dir = temp_dir / "pdfs"
+    pdf_dir.mkdir()
+    pdf_path = pdf_dir / "Company_A_25001_20250102_120000.pdf"
+    pdf_path.write_bytes(b"%PDF")
+    (pdf_dir / "Company_A_25001_20250102_120000.txt").write_text("x")
+    
+    summary = [
+        {"num_factura": "25001", "empresa": "Company_A"},
+        {"num_factura": "25002", "empresa": "Company_B"},
+    ]
+    updated = controller.update_pdf_paths_in_history(summary, str(pdf_dir))
+    
+    assert updated == 1
+    rows = fetch_all("SELECT fecha_envio, pdf_local_path FROM envios WHERE num_factura = '25001' ORDER BY fecha_envio")
+    assert rows[0][1] is None
+    assert rows[1][1] == str(pdf_path)
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_update_pdf_paths_in_history_case_insensitive_fs(controller, temp_dir, monkeypatch):
+    """Test de que los nombres de PDF se comparan con os.path.normcase (Windows no distingue mayúsculas)."""
+    import os
+    
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)",
+        [("2025-01-01 12:00:00", "25001", "Company_A", "OK")]
+    )
+    pdf_path = temp_dir / "COMPANY_A_25001_20250101_120000.PDF"
+    pdf_path.write_bytes(b"%PDF")
+    summary = [{"num_factura": "25001", "empresa": "Company_A"}]
+    
+    assert controller.update_pdf_paths_in_history(summary, str(temp_dir)) == 0
+    
+    monkeypatch.setattr(os.path, "normcase", str.lower)
+    assert controller.update_pdf_paths_in_history(summary, str(temp_dir)) == 1
+    assert fetch_all("SELECT pdf_local_path FROM envios")[0][0] == str(pdf_path)
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_get_history_stats(controller):
+    """Test de estadísticas agregadas por estado."""
+    from decimal import Decimal
+    
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, estado, importe) VALUES (?, ?, ?, ?, ?)",
+        [
+            ("2025-01-01 12:00:00", "25001", "Company A", "OK", 100.0),
+            ("2025-01-02 12:00:00", "25002", "Company A", "ERROR", 50.0),
+            ("2025-01-03 12:00:00", "25003", "Company B", "OK", 25.5),
+            ("2025-01-04 12:00:00", "25004", "Company A", "PENDIENTE", None),
+        ]
+    )
+    
+    stats = controller.get_history_stats()
+    assert stats.total_invoices == 4
+    assert stats.successful_invoices == 2
+    assert stats.failed_invoices == 1
+    assert stats.pending_invoices == 1
+    assert stats.total_amount == Decimal("175.5")
+    
+    stats_a = controller.get_history_stats(company="Company A")
+    assert stats_a.total_invoices == 3
+    assert stats_a.total_amount == Decimal("150.0")
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_load_history_converts_types(controller):
+    """Test de conversión de fecha e importe al cargar el historial."""
+    from datetime import datetime
+    from decimal import Decimal
+    
+    from app.models.history import HistoryFilter
+    
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, cliente, estado, importe) VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            ("2025-01-01 12:00:00", "25001", "Company A", "Customer 1", "OK", 100.5),
+            ("2025-01-02 12:00:00", "25002", "Company B", "Customer 2", "ERROR", None),
+        ]
+    )
+    
+    entries = controller.load_history()
+    assert [entry.invoice_id for entry in entries] == ["25002", "25001"]
+    assert entries[1].send_date == datetime(2025, 1, 1, 12, 0, 0)
+    assert entries[1].amount == Decimal("100.5")
+    assert entries[0].amount == Decimal("0")
+    
+    filtered = controller.load_history(HistoryFilter(company="Company A"))
+    assert [entry.invoice_id for entry in filtered] == ["25001"]
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_load_history_matching_applies_view_conditions(controller):
+    """Test de carga con condiciones WHERE de la vista y límite de entradas."""
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)",
+        [
+            ("2025-01-01 12:00:00", "25001", "Company A", "OK"),
+            ("2025-01-02 12:00:00", "25002", "Company A", "ERROR"),
+            ("2025-01-03 12:00:00", "25003", "Company A", "OK"),
+        ]
+    )
+    
+    entries = controller.load_history_matching(" AND estado = ?", ["OK"])
+    assert [entry.invoice_id for entry in entries] == ["25003", "25001"]
+    
+    latest = controller.load_history_matching("", [], limit=1)
+    assert [entry.invoice_id for entry in latest] == ["25003"]
+    
+    following = controller.load_history_matching(
+        " AND estado = ?", ["OK"], limit=1, cursor_date=latest[0].send_date, cursor_id=latest[0].id
+    )
+    assert [entry.invoice_id for entry in following] == ["25001"]
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_load_history_shares_repeated_strings(controller):
+    """Test de que los valores repetidos comparten el mismo objeto str."""
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, cliente, estado) VALUES (?, ?, ?, ?, ?)",
+        [
+            ("2025-01-01 12:00:00", "25001", "Company A", "Customer 1", "OK"),
+            ("2025-01-02 12:00:00", "25002", "Company A", "Customer 1", "OK"),
+        ]
+    )
+    
+    first, second = controller.load_history()
+    assert first.company is second.company
+    assert first.customer is second.customer
+    assert first.status is second.status
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_filter_lists_cached_until_save(controller):
+    """Test de listas de empresas/clientes cacheadas e invalidadas al guardar."""
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, cliente, estado) VALUES (?, ?, ?, ?, ?)",
+        [
+            ("2025-01-01 12:00:00", "25001", "Company B", "Customer 2", "OK"),
+            ("2025-01-02 12:00:00", "25002", "Company A", None, "OK"),
+            ("2025-01-03 12:00:00", "25003", "Company B", "Customer 1", "OK"),
+        ]
+    )
+    
+    assert controller.get_companies_list() == ["Company A", "Company B"]
+    assert controller.get_customers_list() == ["Customer 1", "Customer 2"]
+    
+    controller.save_to_history([{"num_factura": "25004", "empresa": "Company C", "cliente": "Customer 3"}])
+    
+    assert controller.get_companies_list() == ["Company A", "Company B", "Company C"]
+    assert controller.get_customers_list() == ["Customer 1", "Customer 2", "Customer 3"]
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_save_to_history_columnar_matches_row_path(controller, monkeypatch):
+    """Test de que la ruta columnar guarda lo mismo que la ruta fila a fila."""
+    summary = [
+        {"num_factura": "25001.0", "empresa": "Company A", "cliente": "Customer 1", "estado": "OK", "importe": "1.234,56"},
+        {"NumFactura": 25002, "empresa_emisora": "Company B", "status": "ERROR", "total": 99.5},
+        {"num_factura": "Int_25003", "empresa": "Company A", "importe": 10, "pdf_url": "https://example.com/f.pdf"},
+    ]
+    select = "SELECT num_factura, empresa, cliente, estado, detalles, pdf_url, importe FROM envios ORDER BY id"
+    
+    monkeypatch.setattr(MainController, "COLUMNAR_MIN_ROWS", 10_000)
+    controller.save_to_history(summary, "facturas.xlsx")
+    row_path = fetch_all(select)
+    
+    from app.services.database import execute
+    execute("DELETE FROM envios")
+    
+    monkeypatch.setattr(MainController, "COLUMNAR_MIN_ROWS", 1)
+    controller.save_to_history(summary, "facturas.xlsx")
+    columnar_path = fetch_all(select)
+    
+    assert columnar_path == row_path
+    assert row_path[0][0] == "25001"
+    assert row_path[0][6] == 1234.56
+
+
+@pytest.mark.unit
+def test_history_rows_columnar_matches_scalar_with_missing_values(controller):
+    """Test de que las rutas columnar y escalar tratan igual None, NaN y los ids enteros."""
+    import math
+    
+    summary = [
+        {"num_factura": 25001, "empresa": None, "empresa_emisora": "Company B", "estado": float("nan"), "importe": None},
+        {"NumFactura": 25002, "status": "OK", "total": float("nan"), "cliente": None, "cliente_nombre": "Customer 2"},
+        {"num_factura": None, "NumFactura": 25003, "empresa": "Company A", "mensaje": float("nan")},
+    ]
+    
+    columnar = controller._history_rows_columnar(summary, "2025-01-01 12:00:00", "facturas.xlsx")
+    scalar = [controller._history_row(item, "2025-01-01 12:00:00", "facturas.xlsx") for item in summary]
+    
+    def normalized(rows):
+        # NaN != NaN: se compara como marcador
+        return [
+            tuple("NaN" if isinstance(value, float) and math.isnan(value) else value for value in row)
+            for row in rows
+        ]
+    
+    assert normalized(columnar) == normalized(scalar)
+    assert [row[1] for row in columnar] == ["25001", "25002", "None"]
+    assert columnar[0][2] is None
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_load_history_page_keyset(controller):
+    """Test de paginación por (fecha_envio, id) sin perder envíos con la misma fecha."""
+    from app.models.history import HistoryFilter
+    
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)",
+        [
+            ("2025-01-01 12:00:00", "25001", "Company A", "OK"),
+            ("2025-01-02 12:00:00", "25002", "Company A", "OK"),
+            ("2025-01-02 12:00:00", "25003", "Company B", "OK"),
+            ("2025-01-02 12:00:00", "25004", "Company A", "OK"),
+            ("2025-01-03 12:00:00", "25005", "Company A", "OK"),
+        ]
+    )
+    
+    seen = []
+    page = controller.load_history_page(limit=2)
+    while page:
+        seen.extend(entry.invoice_id for entry in page)
+        last = page[-1]
+        page = controller.load_history_page(cursor_date=last.send_date, limit=2, cursor_id=last.id)
+    
+    assert seen == ["25005", "25004", "25003", "25002", "25001"]
+    
+    filtered = controller.load_history_page(HistoryFilter(company="Company A"), limit=10)
+    assert [entry.invoice_id for entry in filtered] == ["25005", "25004", "25002", "25001"]
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_history_reads_cached_until_write(controller):
+    """Test de que estadísticas y combos se memorizan hasta la siguiente escritura."""
+    assert controller.get_history_stats().total_invoices == 0
+    assert controller.get_companies_list() == []
+    
+    # Escritura externa al controlador: la caché sigue sirviendo el resultado anterior
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)",
+        [("2025-01-01 12:00:00", "25001", "Company A", "OK")]
+    )
+    assert controller.get_history_stats().total_invoices == 0
+    
+    controller.save_to_history([{"num_factura": "25002", "empresa": "Company B", "estado": "OK"}])
+    
+    assert controller.get_history_stats().total_invoices == 2
+    assert controller.get_history_stats(company="Company B").total_invoices == 1
+    assert controller.get_companies_list() == ["Company A", "Company B"]
+    
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)",
+        [("2025-01-03 12:00:00", "25003", "Company C", "OK")]
+    )
+    controller.invalidate_caches()
+    assert controller.get_history_stats().total_invoices == 3
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_get_dashboard_bundle(controller):
+    """Test del refresco completo del panel en una sola llamada."""
+    from app.models.history import HistoryFilter
+    
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, estado, cliente) VALUES (?, ?, ?, ?, ?)",
+        [
+            ("2025-01-01 12:00:00", "25001", "Company A", "OK", "Acme"),
+            ("2025-01-02 12:00:00", "25002", "Company B", "ERROR", "Beta"),
+        ]
+    )
+    
+    bundle = controller.get_dashboard_bundle(HistoryFilter(company="Company B"), company="Company A")
+    
+    assert [entry.invoice_id for entry in bundle.entries] == ["25002"]
+    assert bundle.stats.total_invoices == 1
+    assert bundle.companies == ["Company A", "Company B"]
+    assert bundle.customers == ["Acme", "Beta"]
+    assert controller.get_dashboard_bundle(with_entries=False).entries == []
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_load_history_search_text(controller):
+    """Test de búsqueda por subcadena con el índice de texto y con LIKE (textos cortos)."""
+    from app.models.history import HistoryFilter
+    
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, estado, cliente) VALUES (?, ?, ?, ?, ?)",
+        [
+            ("2025-01-01 12:00:00", "25001", "Company A", "OK", "Acme \"Sur\""),
+            ("2025-01-02 12:00:00", "25002", "Company B", "OK", "Beta"),
+        ]
+    )
+    
+    def search(text):
+        return [entry.invoice_id for entry in controller.load_history(HistoryFilter(search_text=text))]
+    
+    assert search("5002") == ["25002"]
+    assert search("acme \"s") == ["25001"]
+    assert search("company") == ["25002", "25001"]
+    assert search("B") == ["25002"]
+
+
+@pytest.mark.unit
+def test_validate_excel_file_cache_keyed_on_frames(controller, temp_dir):
+    """Test de que la validación memorizada exige los mismos DataFrames y devuelve copias."""
+    from types import SimpleNamespace
+    
+    import pandas as pd
+    
+    excel_path = temp_dir / "facturas.xlsx"
+    excel_path.write_bytes(b"xlsx")
+    calls = []
+    
+    def validate(df_factura, df_conceptos):
+        calls.append(df_factura)
+        return False, ["error"]
+    
+    controller.invoice_service = SimpleNamespace(validate_invoice_data=validate)
+    df_factura, df_conceptos = pd.DataFrame(), pd.DataFrame()
+    
+    _, errors = controller.validate_excel_file(str(excel_path), df_factura, df_conceptos)
+    errors.append("mutado")
+    _, errors = controller.validate_excel_file(str(excel_path), df_factura, df_conceptos)
+    assert len(calls) == 1
+    assert errors == ["error"]
+    assert controller.validation_errors is not errors
+    
+    controller.validate_excel_file(str(excel_path), pd.DataFrame(), df_conceptos)
+    assert len(calls) == 2
+    
+    for i in range(controller.VALIDATION_CACHE_SIZE + 1):
+        other = temp_dir / f"otro_{i}.xlsx"
+        other.write_bytes(b"xlsx")
+        controller.validate_excel_file(str(other), df_factura, df_conceptos)
+    assert len(controller._validation_cache) == controller.VALIDATION_CACHE_SIZE
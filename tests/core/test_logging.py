@@ -0,0 +1,86 @@
+"""
+Tests para el logging estructurado en JSONL.
+"""
+import json
+import logging
+
+import pytest
+
+from app.core.logging import JsonLinesHandler
+
+
+@pytest.fixture
+def json_logger(temp_dir):
+    """Logger aislado con un JsonLinesHandler sobre un fichero temporal."""
+    path = temp_dir / "events.jsonl"
+    handler = JsonLinesHandler(path)
+    logger = logging.getLogger("tests.json_lines")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(handler)
+    yield logger, handler, path
+    logger.removeHandler(handler)
+    handler.close()
+
+
+@pytest.mark.unit
+def test_json_lines_handler_writes_on_flush(json_logger):
+    """Test de escritura de una línea JSON por registro."""
+    logger, handler, path = json_logger
+    
+    logger.info("Factura %s enviada", "25001")
+    logger.warning("Atención: ñandú")
+    handler.flush()
+    
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 2
+    first = json.loads(lines[0])
+    assert first["message"] == "Factura 25001 enviada"
+    assert first["level"] == "INFO"
+    assert json.loads(lines[1])["message"] == "Atención: ñandú"
+
+
+@pytest.mark.unit
+def test_json_lines_handler_close_drains_queue(json_logger):
+    """Test de que al cerrar se escriben todos los registros encolados."""
+    logger, handler, path = json_logger
+    
+    for i in range(500):
+        logger.info("evento %d", i)
+    handler.close()
+    logger.info("tras cerrar")
+    
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 500
+    assert json.loads(lines[-1])["message"] == "evento 499"
+
+
+@pytest.mark.unit
+def test_json_lines_handler_fields_and_extras(json_logger):
+    """Test de campos emitidos y de conservación de los `extra`."""
+    logger, handler, path = json_logger
+    
+    logger.info("con extra", extra={"invoice_id": "25001"})
+    handler.flush()
+    
+    entry = json.loads(path.read_text(encoding="utf-8").splitlines()[0])
+    assert entry["invoice_id"] == "25001"
+    assert entry["funcName"] == "test_json_lines_handler_fields_and_extras"
+    assert "args" not in entry
+    assert "exc_info" not in entry
+
+
+@pytest.mark.unit
+def test_json_lines_handler_falls_back_per_entry(json_logger):
+    """Test de que un evento que orjson rechaza se escribe con json sin perder el lote."""
+    logger, handler, path = json_logger
+    
+    logger.info("antes")
+    logger.info("claves no str", extra={"totals": {25001: 1}, "big": 2 ** 70})
+    logger.info("después")
+    handler.flush()
+    
+    entries = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [entry["message"] for entry in entries] == ["antes", "claves no str", "después"]
+    assert entries[1]["totals"] == {"25001": 1}
+    assert entries[1]["big"] == 2 ** 70
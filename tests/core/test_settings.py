@@ -0,0 +1,95 @@
+"""
+Tests para el wrapper de QSettings.
+"""
+import sys
+
+import pytest
+
+from PySide6.QtCore import QSettings
+
+from app.core.settings import AppSettings, get_settings
+
+
+@pytest.fixture
+def app_settings(temp_dir):
+    """AppSettings sobre un fichero de configuración temporal."""
+    if sys.platform == "win32":
+        pytest.skip("El formato nativo en Windows es el registro")
+    QSettings.setPath(QSettings.NativeFormat, QSettings.UserScope, str(temp_dir))
+    get_settings.cache_clear()
+    yield AppSettings()
+    get_settings.cache_clear()
+
+
+@pytest.mark.unit
+def test_get_settings_returns_single_instance(app_settings):
+    """Test de que get_settings reutiliza la misma instancia."""
+    assert get_settings() is get_settings()
+
+
+@pytest.mark.unit
+def test_settings_value_cached_and_default(app_settings, monkeypatch):
+    """Test de valores por defecto y de lecturas servidas desde memoria."""
+    assert app_settings.value(AppSettings.KEY_THEME, "light") == "light"
+    
+    app_settings.set_value(AppSettings.KEY_THEME, "dark")
+    monkeypatch.setattr(app_settings._settings, "value", lambda *args: pytest.fail("lectura no cacheada"))
+    
+    assert app_settings.value(AppSettings.KEY_THEME, "light") == "dark"
+
+
+@pytest.mark.unit
+def test_settings_skips_unchanged_writes(app_settings, monkeypatch):
+    """Test de que escribir el mismo valor no vuelve a tocar QSettings."""
+    app_settings.set_value(AppSettings.KEY_SPACING, 8)
+    
+    app_settings.sync()
+    
+    writes = []
+    monkeypatch.setattr(app_settings._settings, "setValue", lambda key, value: writes.append(key))
+    app_settings.set_value(AppSettings.KEY_SPACING, 8)
+    app_settings.sync()
+    app_settings.set_value(AppSettings.KEY_SPACING, 12)
+    app_settings.sync()
+    
+    assert writes == [AppSettings.KEY_SPACING]
+
+
+@pytest.mark.unit
+def test_settings_writes_deferred_until_sync(app_settings):
+    """Test de escrituras agrupadas: QSettings solo se actualiza al volcar."""
+    app_settings.set_value(AppSettings.KEY_THEME, "dark")
+    app_settings.set_value(AppSettings.KEY_THEME, "light")
+    app_settings.set_value(AppSettings.KEY_ACCENT_COLOR, "#ff0000")
+    
+    assert not app_settings._settings.contains(AppSettings.KEY_THEME)
+    assert app_settings.value(AppSettings.KEY_THEME) == "light"
+    
+    app_settings.sync()
+    
+    reloaded = QSettings(AppSettings.ORGANIZATION, AppSettings.APPLICATION)
+    assert reloaded.value(AppSettings.KEY_THEME) == "light"
+    assert reloaded.value(AppSettings.KEY_ACCENT_COLOR) == "#ff0000"
+
+
+@pytest.mark.unit
+def test_settings_set_value_from_worker_thread(qapp, app_settings):
+    """Test de que una escritura desde otro hilo programa el volcado en el hilo de la aplicación."""
+    import threading
+    
+    from PySide6.QtTest import QTest
+    
+    worker = threading.Thread(target=app_settings.set_value, args=(AppSettings.KEY_THEME, "dark"))
+    worker.start()
+    worker.join()
+    
+    assert app_settings._flush_timer is None
+    qapp.processEvents()
+    timer = app_settings._flush_timer
+    assert timer is not None
+    assert timer.thread() is qapp.thread()
+    assert timer.isActive()
+    
+    QTest.qWait(AppSettings.FLUSH_DELAY_MS * 2)
+    assert not timer.isActive()
+    assert app_settings._settings.value(AppSettings.KEY_THEME) == "dark"
@@ -0,0 +1,45 @@
+"""
+Tests para los modelos del historial.
+"""
+import pickle
+
+import pytest
+from decimal import Decimal
+from datetime import datetime
+
+from app.models.history import HistoryEntry, HistoryFilter
+
+
+def _entry() -> HistoryEntry:
+    return HistoryEntry(1, "25001", "Company A", "Customer 1", "OK", datetime(2025, 1, 1, 12, 0, 0), Decimal("10.00"))
+
+
+@pytest.mark.unit
+def test_history_entry_slots_and_immutability():
+    """Test de que HistoryEntry no tiene __dict__ y no admite cambios."""
+    entry = _entry()
+    
+    assert not hasattr(entry, "__dict__")
+    assert entry.is_successful
+    with pytest.raises(Exception):
+        entry.status = "ERROR"
+
+
+@pytest.mark.unit
+def test_history_entry_hashable_and_picklable():
+    """Test de igualdad, hash y serialización de HistoryEntry."""
+    entry = _entry()
+    
+    assert len({entry, _entry()}) == 1
+    assert pickle.loads(pickle.dumps(entry)) == entry
+
+
+@pytest.mark.unit
+def test_history_filter_mutable():
+    """Test de que HistoryFilter se sigue rellenando campo a campo."""
+    filters = HistoryFilter()
+    filters.company = "Company A"
+    
+    assert filters.company == "Company A"
+    with pytest.raises(AttributeError):
+        filters.unknown = "x"
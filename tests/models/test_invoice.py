@@ -239,6 +239,36 @@ def test_invoice_immutability():
         invoice.invoice_id = "25002"
 
 
+@pytest.mark.unit
+def test_invoice_lines_stored_as_tuple():
+    """Test de que las líneas se guardan como tupla: no se pueden alterar ni invalidan los totales."""
+    customer = Customer(name="Test", tax_id="B12345678")
+    line = InvoiceLine("Servicio", Decimal("1"), Decimal("100.00"), Decimal("21.0"))
+    
+    invoice = Invoice("25001", "Test Company", customer, date(2025, 1, 1), [line])
+    
+    assert invoice.lines == (line,)
+    assert invoice.total_amount == Decimal("121.00")
+    with pytest.raises(AttributeError):
+        invoice.lines.append(line)
+    assert invoice == Invoice("25001", "Test Company", customer, date(2025, 1, 1), (line,))
+    assert hash(invoice) == hash(Invoice("25001", "Test Company", customer, date(2025, 1, 1), (line,)))
+
+
+@pytest.mark.unit
+def test_invoice_totals_computed_once():
+    """Test de que los totales de la factura se calculan en una sola pasada y se reutilizan."""
+    customer = Customer(name="Test", tax_id="B12345678")
+    line = InvoiceLine("Servicio", Decimal("2"), Decimal("100.00"), Decimal("21.0"), Decimal("15.0"))
+    invoice = Invoice("25001", "Test Company", customer, date(2025, 1, 1), [line])
+    
+    total = invoice.total_amount
+    
+    assert total == Decimal("212.00")
+    assert invoice.total_amount is total
+    assert invoice.subtotal is invoice._cached()[0]
+
+
 @pytest.mark.unit
 def test_validation_error_creation():
     """Test de creación de error de validación."""
@@ -266,3 +296,37 @@ def test_processing_result_creation():
     assert result.invoice_id == "25001"
     assert result.status == "success"
     assert result.timestamp is not None
+
+
+@pytest.mark.unit
+def test_invoice_line_slots_keep_cached_amounts_out_of_equality():
+    """Test de que InvoiceLine no tiene __dict__ y el importe cacheado no afecta a la igualdad."""
+    line = InvoiceLine(
+        description="Servicio",
+        quantity=Decimal("2"),
+        unit_price=Decimal("100.00"),
+        tax_rate=Decimal("21.0")
+    )
+    
+    assert not hasattr(line, "__dict__")
+    assert line.total == Decimal("242.00")
+    assert line == InvoiceLine("Servicio", Decimal("2"), Decimal("100.00"), Decimal("21.0"))
+    assert hash(line) == hash(InvoiceLine("Servicio", Decimal("2"), Decimal("100.00"), Decimal("21.0")))
+
+
+@pytest.mark.unit
+def test_cached_totals_are_not_dataclass_fields():
+    """Test de que los importes cacheados no aparecen en fields() ni en asdict()."""
+    import pickle
+    from dataclasses import asdict, fields
+    
+    line = InvoiceLine("Servicio", Decimal("2"), Decimal("100.00"), Decimal("21.0"))
+    customer = Customer(name="Test", tax_id="B12345678")
+    invoice = Invoice("25001", "Test Company", customer, date(2025, 1, 1), (line,))
+    invoice.total_amount
+    
+    assert [f.name for f in fields(InvoiceLine)] == ["description", "quantity", "unit_price", "tax_rate", "retention_rate"]
+    assert "_cache" not in asdict(line)
+    assert "_cache" not in asdict(invoice)
+    assert "_cache" not in {f.name for f in fields(Invoice)}
+    assert pickle.loads(pickle.dumps(invoice)).total_amount == invoice.total_amount
@@ -9,20 +9,27 @@ from app.services.database import (
     get_connection,
     execute,
     execute_many,
+    execute_many_chunked,
+    bulk_transaction,
     fetch_all,
     fetch_one,
-    clear_history
+    clear_history,
+    compact_database,
+    db_datetime,
+    history_fts_query,
+    SCHEMA_VERSION,
+    iter_rows,
 )
 
 
 @pytest.mark.unit
 @pytest.mark.database
-def test_init_database(mock_db_path):
+def test_init_database(file_db_path):
     """Test de inicialización de la base de datos."""
     init_database()
     
     # Verificar que el archivo de BD existe
-    assert Path(mock_db_path).exists()
+    assert Path(file_db_path).exists()
     
     # Verificar que las tablas existen
     with get_connection() as conn:
@@ -43,10 +50,8 @@ def test_init_database(mock_db_path):
 
 @pytest.mark.unit
 @pytest.mark.database
-def test_execute_and_fetch(mock_db_path):
+def test_execute_and_fetch(clean_db):
     """Test de inserción y consulta de datos."""
-    init_database()
-    
     # Insertar datos de prueba
     execute(
         "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)",
@@ -63,10 +68,8 @@ def test_execute_and_fetch(mock_db_path):
 
 @pytest.mark.unit
 @pytest.mark.database
-def test_execute_many(mock_db_path):
+def test_execute_many(clean_db):
     """Test de inserción múltiple."""
-    init_database()
-    
     # Insertar múltiples registros
     data = [
         ("2025-01-01 12:00:00", "25001", "Company A", "OK"),
@@ -86,10 +89,8 @@ def test_execute_many(mock_db_path):
 
 @pytest.mark.unit
 @pytest.mark.database
-def test_fetch_one(mock_db_path):
+def test_fetch_one(clean_db):
     """Test de consulta de un solo registro."""
-    init_database()
-    
     execute(
         "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)",
         ("2025-01-01 12:00:00", "25001", "Test Company", "OK")
@@ -103,10 +104,8 @@ def test_fetch_one(mock_db_path):
 
 @pytest.mark.unit
 @pytest.mark.database
-def test_fetch_one_not_found(mock_db_path):
+def test_fetch_one_not_found(clean_db):
     """Test de consulta que no encuentra resultados."""
-    init_database()
-    
     row = fetch_one("SELECT num_factura FROM envios WHERE num_factura = ?", ("99999",))
     
     assert row is None
@@ -114,19 +113,17 @@ def test_fetch_one_not_found(mock_db_path):
 
 @pytest.mark.unit
 @pytest.mark.database
-def test_clear_history(mock_db_path):
+def test_clear_history(clean_db):
     """Test de limpieza del historial."""
-    init_database()
-    
-    # Insertar datos
-    execute(
-        "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)",
-        ("2025-01-01 12:00:00", "25001", "Test Company", "OK")
+    # Insertar datos suficientes para ocupar muchas páginas
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, estado, detalles) VALUES (?, ?, ?, ?, ?)",
+        [("2025-01-01 12:00:00", f"25{i:03d}", "Test Company", "OK", "x" * 2000) for i in range(200)]
     )
     
     # Verificar que hay datos
     rows = fetch_all("SELECT COUNT(*) FROM envios")
-    assert rows[0][0] == 1
+    assert rows[0][0] == 200
     
     # Limpiar historial
     clear_history()
@@ -134,14 +131,73 @@ def test_clear_history(mock_db_path):
     # Verificar que no hay datos
     rows = fetch_all("SELECT COUNT(*) FROM envios")
     assert rows[0][0] == 0
+    # Base nueva: el espacio se recupera entero con incremental_vacuum, sin VACUUM completo
+    with get_connection() as conn:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
 
 
 @pytest.mark.unit
 @pytest.mark.database
-def test_connection_context_manager(mock_db_path):
-    """Test del context manager de conexión."""
+def test_clear_history_leaves_legacy_database_uncompacted(file_db_path):
+    """Test de que vaciar una base creada sin auto_vacuum no lanza un VACUUM completo."""
+    import sqlite3
+    
+    legacy = sqlite3.connect(file_db_path)
+    legacy.execute("CREATE TABLE envios (id INTEGER PRIMARY KEY AUTOINCREMENT, fecha_envio TEXT NOT NULL, num_factura TEXT, empresa TEXT, estado TEXT, detalles TEXT, pdf_url TEXT, excel_path TEXT)")
+    legacy.executemany(
+        "INSERT INTO envios (fecha_envio, num_factura, detalles) VALUES (?, ?, ?)",
+        [("2025-01-01 12:00:00", f"25{i:03d}", "x" * 2000) for i in range(200)]
+    )
+    legacy.commit()
+    legacy.close()
     init_database()
+    pages_before = fetch_one("PRAGMA page_count")[0]
+    
+    clear_history()
+    
+    with get_connection() as conn:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+        # Las páginas liberadas quedan en la lista libre para reutilizarse
+        assert conn.execute("PRAGMA freelist_count").fetchone()[0] > 0
+        assert conn.execute("PRAGMA page_count").fetchone()[0] == pages_before
+    assert fetch_all("SELECT COUNT(*) FROM envios")[0][0] == 0
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_compact_database_enables_incremental_vacuum(file_db_path):
+    """Test de compactación explícita de una base creada sin auto_vacuum."""
+    import sqlite3
     
+    legacy = sqlite3.connect(file_db_path)
+    legacy.execute("CREATE TABLE envios (id INTEGER PRIMARY KEY AUTOINCREMENT, fecha_envio TEXT NOT NULL, num_factura TEXT, empresa TEXT, estado TEXT, detalles TEXT, pdf_url TEXT, excel_path TEXT)")
+    legacy.executemany(
+        "INSERT INTO envios (fecha_envio, num_factura, detalles) VALUES (?, ?, ?)",
+        [("2025-01-01 12:00:00", f"25{i:03d}", "x" * 2000) for i in range(200)]
+    )
+    legacy.commit()
+    legacy.close()
+    
+    init_database()
+    clear_history()
+    pages_before = fetch_one("PRAGMA page_count")[0]
+    with get_connection() as conn:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+        
+        compact_database()
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+        pages_after = conn.execute("PRAGMA page_count").fetchone()[0]
+    # El VACUUM se ha volcado al fichero principal, que ya no arrastra las páginas libres
+    assert pages_after < pages_before
+    assert Path(file_db_path).stat().st_size == pages_after * fetch_one("PRAGMA page_size")[0]
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_connection_context_manager(clean_db):
+    """Test del context manager de conexión."""
     # Usar el context manager
     with get_connection() as conn:
         cursor = conn.cursor()
@@ -156,10 +212,8 @@ def test_connection_context_manager(mock_db_path):
 
 @pytest.mark.unit
 @pytest.mark.database
-def test_readonly_connection(mock_db_path):
+def test_readonly_connection(clean_db):
     """Test de conexión en modo solo lectura."""
-    init_database()
-    
     # Insertar datos con conexión normal
     execute(
         "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)",
@@ -172,3 +226,202 @@ def test_readonly_connection(mock_db_path):
         cursor.execute("SELECT num_factura FROM envios WHERE num_factura = ?", ("25001",))
         result = cursor.fetchone()
         assert result[0] == "25001"
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_readonly_connection_on_memory_uri_rejects_writes(clean_db):
+    """Test de que la conexión readonly sobre una URI en memoria no admite escrituras."""
+    import sqlite3
+    
+    with get_connection(readonly=True) as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM envios")
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_init_database_enables_wal(file_db_path):
+    """Test de activación del modo WAL."""
+    init_database()
+    
+    with get_connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_execute_many_chunked_single_transaction(clean_db, monkeypatch):
+    """Test de inserción por bloques con una sola transacción."""
+    monkeypatch.setattr("app.services.database.EXECUTE_MANY_CHUNK", 2)
+    
+    data = (
+        (f"2025-01-0{i} 12:00:00", f"2500{i}", "Company A", "OK")
+        for i in range(1, 6)
+    )
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)",
+        data
+    )
+    
+    rows = fetch_all("SELECT COUNT(*) FROM envios")
+    assert rows[0][0] == 5
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_execute_many_rolls_back_on_error(clean_db):
+    """Test de que un error deshace todo el lote."""
+    data = [
+        ("2025-01-01 12:00:00", "25001", "Company A", "OK"),
+        (None, "25002", "Company A", "OK"),  # fecha_envio es NOT NULL
+    ]
+    with pytest.raises(Exception):
+        execute_many(
+            "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)",
+            data
+        )
+    
+    rows = fetch_all("SELECT COUNT(*) FROM envios")
+    assert rows[0][0] == 0
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_execute_many_chunked_commits_per_block(clean_db):
+    """Test de importación por bloques que confirma cada bloque por separado."""
+    data = [
+        ("2025-01-01 12:00:00", "25001", "Company A", "OK"),
+        ("2025-01-02 12:00:00", "25002", "Company A", "OK"),
+        (None, "25003", "Company A", "OK"),  # fecha_envio es NOT NULL
+    ]
+    with pytest.raises(Exception):
+        execute_many_chunked(
+            "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)",
+            data,
+            chunk=2
+        )
+    
+    rows = fetch_all("SELECT COUNT(*) FROM envios")
+    assert rows[0][0] == 2
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_bulk_transaction_groups_writes(clean_db):
+    """Test de transacción única para escrituras en varias tablas."""
+    insert = "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)"
+    
+    with bulk_transaction() as conn:
+        execute(insert, ("2025-01-01 12:00:00", "25001", "Company A", "OK"))
+        execute_many(insert, [("2025-01-02 12:00:00", "25002", "Company A", "OK")])
+        assert conn.in_transaction
+    assert fetch_all("SELECT COUNT(*) FROM envios")[0][0] == 2
+    
+    with pytest.raises(RuntimeError):
+        with bulk_transaction():
+            execute(insert, ("2025-01-03 12:00:00", "25003", "Company A", "OK"))
+            raise RuntimeError("fallo")
+    assert fetch_all("SELECT COUNT(*) FROM envios")[0][0] == 2
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_history_fts_follows_envios(clean_db):
+    """Test de que el índice de texto sigue a inserciones, cambios y borrados."""
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, estado, cliente) VALUES (?, ?, ?, ?, ?)",
+        [
+            ("2025-01-01 12:00:00", "Int_25003", "Company A", "OK", "Cliente Uno"),
+            ("2025-01-02 12:00:00", "25004", "Company B", "OK", "Cliente Dos"),
+        ]
+    )
+    match = "SELECT rowid FROM envios_fts WHERE envios_fts MATCH ? ORDER BY rowid"
+    
+    assert fetch_all(match, [history_fts_query("5003")]) == [(1,)]
+    assert fetch_all(match, [history_fts_query("cliente")]) == [(1,), (2,)]
+    
+    execute("UPDATE envios SET cliente = 'Otro' WHERE id = 2")
+    assert fetch_all(match, [history_fts_query("cliente")]) == [(1,)]
+    
+    execute("DELETE FROM envios WHERE id = 1")
+    assert fetch_all(match, [history_fts_query("5003")]) == []
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_connection_reused_and_uncommitted_discarded(clean_db):
+    """Test de reutilización de la conexión del hilo y descarte de lo no confirmado."""
+    insert = "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)"
+    
+    with get_connection() as conn:
+        conn.execute(insert, ("2025-01-01 12:00:00", "25001", "Company A", "OK"))
+        # Un bloque anidado comparte conexión y no deshace la transacción exterior
+        with get_connection() as inner:
+            assert inner is conn
+        assert conn.in_transaction
+    
+    with get_connection() as conn_again:
+        assert conn_again is conn
+        assert conn_again.execute("SELECT COUNT(*) FROM envios").fetchone()[0] == 0
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_init_database_migrates_and_sets_user_version(file_db_path):
+    """Test de migración de una tabla antigua y de arranques posteriores sin DDL."""
+    import sqlite3
+    
+    legacy = sqlite3.connect(file_db_path)
+    legacy.execute("CREATE TABLE envios (id INTEGER PRIMARY KEY AUTOINCREMENT, fecha_envio TEXT NOT NULL, num_factura TEXT, empresa TEXT, estado TEXT, detalles TEXT, pdf_url TEXT, excel_path TEXT)")
+    legacy.commit()
+    legacy.close()
+    
+    init_database()
+    
+    with get_connection() as conn:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(envios)")}
+        assert {"importe", "cliente", "pdf_local_path"} <= columns
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {"idx_envios_fecha_cover", "idx_queue_estado_intentos"} <= indexes
+        assert "idx_estado" not in indexes
+        
+        traced = []
+        conn.set_trace_callback(traced.append)
+        init_database()
+        conn.set_trace_callback(None)
+    
+    assert not any("CREATE" in stmt for stmt in traced)
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_datetime_params_and_named_rows(clean_db):
+    """Test de fechas formateadas con db_datetime (formato de texto de siempre) y filas por nombre."""
+    from datetime import datetime
+    
+    execute(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)",
+        (db_datetime(datetime(2025, 1, 2, 12, 30, 0, 123456)), "25001", "Company A", "OK")
+    )
+    
+    row = fetch_one("SELECT fecha_envio, num_factura FROM envios", as_rows=True)
+    assert row["fecha_envio"] == "2025-01-02 12:30:00"
+    assert row["num_factura"] == "25001"
+    assert fetch_all("SELECT COUNT(*) FROM envios WHERE fecha_envio >= ?", [db_datetime(datetime(2025, 1, 2))])[0][0] == 1
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_iter_rows_batches(clean_db):
+    """Test de lectura por bloques con iter_rows."""
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)",
+        [(f"2025-01-01 12:00:{i:02d}", f"250{i:02d}", "Company A", "OK") for i in range(7)]
+    )
+    
+    rows = iter_rows("SELECT num_factura FROM envios ORDER BY id", batch=3)
+    
+    assert next(rows) == ("25000",)
+    assert [row[0] for row in rows] == [f"250{i:02d}" for i in range(1, 7)]
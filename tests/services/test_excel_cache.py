@@ -0,0 +1,83 @@
+"""
+Tests para la caché de lecturas de Excel.
+"""
+import os
+import time
+
+import pytest
+
+from app.services import excel_cache
+from app.services.excel_cache import clear_excel_cache, load_excel_cached
+
+
+@pytest.fixture
+def excel_file(temp_dir, sample_dataframe, sample_conceptos_dataframe, monkeypatch):
+    """Crea un Excel de facturas y aísla la caché en un directorio temporal."""
+    import pandas as pd
+    
+    monkeypatch.setattr(excel_cache, "CACHE_DIR", temp_dir / "cache")
+    clear_excel_cache()
+    
+    path = temp_dir / "facturas.xlsx"
+    with pd.ExcelWriter(path) as writer:
+        sample_dataframe.to_excel(writer, sheet_name="Facturas", index=False)
+        sample_conceptos_dataframe.to_excel(writer, sheet_name="Conceptos", index=False)
+    yield path
+    clear_excel_cache()
+
+
+@pytest.mark.unit
+def test_load_excel_cached_reuses_result(excel_file):
+    """Test de que la segunda lectura devuelve los DataFrames memorizados."""
+    first = load_excel_cached(str(excel_file))
+    second = load_excel_cached(str(excel_file))
+    
+    assert first[0] is second[0]
+    assert first[1] is second[1]
+
+
+@pytest.mark.unit
+def test_load_excel_cached_uses_disk_cache(excel_file, temp_dir):
+    """Test de recuperación desde la caché en disco tras vaciar la memoria."""
+    df_factura, _ = load_excel_cached(str(excel_file))
+    assert list((temp_dir / "cache").glob("excel_*.pkl"))
+    
+    clear_excel_cache()
+    df_factura_disk, _ = load_excel_cached(str(excel_file))
+    
+    assert df_factura_disk.equals(df_factura)
+
+
+@pytest.mark.unit
+def test_load_excel_cached_invalidates_on_change(excel_file):
+    """Test de invalidación cuando cambia el archivo."""
+    first, _ = load_excel_cached(str(excel_file))
+    
+    st = os.stat(excel_file)
+    os.utime(excel_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    second, _ = load_excel_cached(str(excel_file))
+    
+    assert first is not second
+
+
+@pytest.mark.unit
+def test_disk_cache_keeps_latest_version_per_path(excel_file, temp_dir):
+    """Test de que al guardar se borran la versión anterior del archivo y las entradas caducadas."""
+    cache_dir = temp_dir / "cache"
+    cache_dir.mkdir()
+    stale = cache_dir / "excel_0123456789abcdef_0123456789abcdef.pkl"
+    stale.write_bytes(b"")
+    old = time.time() - (excel_cache.EXCEL_CACHE_MAX_AGE_DAYS + 1) * 86400
+    os.utime(stale, (old, old))
+    
+    load_excel_cached(str(excel_file))
+    first = set(cache_dir.glob("excel_*.pkl"))
+    assert len(first) == 1
+    
+    st = os.stat(excel_file)
+    os.utime(excel_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    load_excel_cached(str(excel_file))
+    second = set(cache_dir.glob("excel_*.pkl"))
+    
+    assert len(second) == 1
+    assert second != first
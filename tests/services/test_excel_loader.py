@@ -0,0 +1,29 @@
+"""
+Tests para la lectura de libros Excel de facturas.
+"""
+import pytest
+
+from app.services.excel_loader import EXCEL_ENGINE, read_invoice_workbook
+
+
+@pytest.mark.unit
+def test_excel_engine_detected():
+    """Test de selección del motor de lectura."""
+    assert EXCEL_ENGINE in ("calamine", "openpyxl")
+
+
+@pytest.mark.unit
+def test_read_invoice_workbook(temp_dir, sample_dataframe, sample_conceptos_dataframe):
+    """Test de lectura de ambas hojas en una sola llamada."""
+    import pandas as pd
+    
+    path = temp_dir / "facturas.xlsx"
+    with pd.ExcelWriter(path) as writer:
+        sample_dataframe.to_excel(writer, sheet_name="Facturas", index=False)
+        sample_conceptos_dataframe.to_excel(writer, sheet_name="Conceptos", index=False)
+    
+    df_factura, df_conceptos = read_invoice_workbook(str(path))
+    
+    assert list(df_factura.columns) == list(sample_dataframe.columns)
+    assert len(df_factura) == 3
+    assert len(df_conceptos) == 3
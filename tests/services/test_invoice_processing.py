@@ -1,6 +1,7 @@
 """
 Tests para el servicio de procesamiento de facturas.
 """
+import pandas as pd
 import pytest
 from decimal import Decimal
 
@@ -39,6 +40,18 @@ def test_format_currency_eur():
     assert service.format_currency_eur("invalid") == ""
 
 
+@pytest.mark.unit
+def test_format_currency_eur_large_and_negative():
+    """Test de formateo de importes grandes, negativos y no finitos."""
+    service = InvoiceProcessingService()
+    
+    assert service.format_currency_eur(1234567.891) == "1.234.567,89€"
+    assert service.format_currency_eur(-1500) == "-1.500,00€"
+    assert service.format_currency_eur(Decimal("42.1")) == "42,10€"
+    assert service.format_currency_eur(float("nan")) == ""
+    assert service.format_currency_eur(-0.0) == "0,00€"
+
+
 @pytest.mark.unit
 def test_parse_amount_from_decimal():
     """Test de parseo de importe desde Decimal."""
@@ -111,6 +124,21 @@ def test_extract_pdf_url_nested():
     assert "invoice.pdf" in url
 
 
+@pytest.mark.unit
+def test_extract_pdf_url_nested_keeps_document_order():
+    """Test de que gana la primera URL de PDF en orden de documento."""
+    service = InvoiceProcessingService()
+    
+    item = {
+        "meta": [1, True, None, {"info": "https://example.com/page"}],
+        "docs": [
+            {"links": ("https://example.com/a.pdf", "https://example.com/b.pdf")},
+            "https://example.com/c.pdf",
+        ],
+    }
+    assert service.extract_pdf_url(item) == "https://example.com/a.pdf"
+
+
 @pytest.mark.unit
 def test_extract_pdf_url_not_found():
     """Test de extracción de URL cuando no existe."""
@@ -137,8 +165,6 @@ def test_validate_invoice_data_valid(sample_dataframe, sample_conceptos_datafram
 @pytest.mark.unit
 def test_validate_invoice_data_missing_columns():
     """Test de validación con columnas faltantes."""
-    import pandas as pd
-    
     service = InvoiceProcessingService()
     
     # DataFrame sin columna requerida
@@ -154,8 +180,6 @@ def test_validate_invoice_data_missing_columns():
 @pytest.mark.unit
 def test_validate_invoice_data_no_concepts():
     """Test de validación de factura sin conceptos."""
-    import pandas as pd
-    
     service = InvoiceProcessingService()
     
     df_factura = pd.DataFrame({
@@ -211,3 +235,130 @@ def test_calculate_invoice_totals_with_retention(sample_conceptos_dataframe):
     assert iva == Decimal("105")
     # Retención 15%: 500 * 0.15 = 75
     assert ret == Decimal("75")
+
+
+@pytest.mark.unit
+def test_validate_invoice_data_reports_all_missing_concepts():
+    """Test de que se informan todas las facturas sin conceptos, en orden."""
+    service = InvoiceProcessingService()
+    
+    df_factura = pd.DataFrame({
+        "NumFactura": ["25001", 25002.0, "25003"],
+        "empresa_emisora": ["Company A", "Company B", "Company A"],
+        "cliente_nombre": ["Customer 1", "Customer 2", "Customer 3"]
+    })
+    
+    df_conceptos = pd.DataFrame({
+        "NumFactura": ["25002.0"],
+        "descripcion": ["Service"],
+        "cantidad": [1],
+        "precio_unitario": [100]
+    })
+    
+    is_valid, errors = service.validate_invoice_data(df_factura, df_conceptos)
+    
+    assert not is_valid
+    assert [error.invoice_id for error in errors] == ["25001", "25003"]
+    assert all(error.field_name == "conceptos" for error in errors)
+
+
+@pytest.mark.unit
+def test_validate_invoice_data_required_text_truthiness():
+    """Test de que empresa y cliente faltan como con `not valor` (None y "" faltan, NaN no)."""
+    service = InvoiceProcessingService()
+    
+    df_factura = pd.DataFrame({
+        "NumFactura": ["25001", "25002", "25003"],
+        "empresa_emisora": ["Company A", "Company B", ""],
+        "cliente_nombre": pd.Series([None, float("nan"), "Customer 3"], dtype=object)
+    })
+    df_conceptos = pd.DataFrame({
+        "NumFactura": ["25001", "25002", "25003"],
+        "descripcion": ["Service"] * 3,
+        "cantidad": [1] * 3,
+        "precio_unitario": [100] * 3
+    })
+    
+    is_valid, errors = service.validate_invoice_data(df_factura, df_conceptos)
+    
+    assert not is_valid
+    assert [(error.invoice_id, error.field_name) for error in errors] == [
+        ("25001", "cliente_nombre"),
+        ("25003", "empresa_emisora"),
+    ]
+    
+    # Columna numérica de Excel con huecos: NaN sigue contando como presente
+    df_factura["cliente_nombre"] = [1.0, float("nan"), 0.0]
+    _, errors = service.validate_invoice_data(df_factura, df_conceptos)
+    assert [(error.invoice_id, error.field_name) for error in errors] == [
+        ("25003", "empresa_emisora"),
+        ("25003", "cliente_nombre"),
+    ]
+
+
+@pytest.mark.unit
+def test_normalize_invoice_id_series_matches_scalar():
+    """Test de equivalencia entre la normalización vectorizada y la escalar."""
+    service = InvoiceProcessingService()
+    values = ["25042", "25042.0", " 25042.00 ", 25042, 25042.0, "Int_25003", "INT25_005", "0", "0.0", "25042", None]
+    series = pd.Series(values, dtype=object, index=range(10, 10 + len(values)))
+    
+    result = service.normalize_invoice_id_series(series)
+    
+    assert list(result) == [service.normalize_invoice_id(v) for v in values]
+    assert list(result.index) == list(series.index)
+
+
+@pytest.mark.unit
+def test_parse_amount_series_matches_scalar():
+    """Test de equivalencia entre el parseo de importes vectorizado y el escalar."""
+    service = InvoiceProcessingService()
+    values = ["1.234,56", "1234,56", "1.234,56 €", "$ 99", "1234.56", "1,234.56", "1\u00a0234,56", 1234, 1234.56, Decimal("10.50"), "invalid", None, float("nan")]
+    
+    result = service.parse_amount_series(pd.Series(values, dtype=object))
+    
+    assert result.equals(pd.Series([float(service.parse_amount(v)) for v in values]))
+
+
+@pytest.mark.unit
+def test_calculate_totals_by_invoice(sample_conceptos_dataframe):
+    """Test de totales de todas las facturas en una pasada, iguales a los individuales."""
+    service = InvoiceProcessingService()
+    
+    totals = service.calculate_totals_by_invoice(sample_conceptos_dataframe)
+    
+    assert set(totals) == {"25001", "25002"}
+    for invoice_id, expected in totals.items():
+        assert service.calculate_invoice_totals(sample_conceptos_dataframe, invoice_id) == expected
+    assert totals["25002"] == (Decimal("500"), Decimal("105"), Decimal("75"))
+
+
+@pytest.mark.unit
+def test_calculate_all_totals_returns_float_frame(sample_conceptos_dataframe):
+    """Test de totales por lotes como DataFrame float64 indexado por factura."""
+    service = InvoiceProcessingService()
+    conceptos = sample_conceptos_dataframe.assign(NumFactura=["25002.0", "25001", "25002"])
+    
+    totals = service.calculate_all_totals(conceptos)
+    
+    assert list(totals.index) == ["25002", "25001"]
+    assert totals.index.name == "NumFactura"
+    assert list(totals.columns) == ["base_imponible", "total_iva", "total_retencion"]
+    assert (totals.dtypes == "float64").all()
+    assert totals.loc["25002"].tolist() == [600.0, 126.0, 75.0]
+
+
+@pytest.mark.unit
+def test_read_summary_file(temp_dir):
+    """Test de lectura de summary.json con y sin la clave de proformas."""
+    service = InvoiceProcessingService()
+    
+    summary = temp_dir / "summary.json"
+    summary.write_text('{"proformas_procesadas": [{"num_factura": "25001", "importe": NaN}]}', encoding="utf-8")
+    items = service.read_summary_file(str(summary))
+    assert [item["num_factura"] for item in items] == ["25001"]
+    
+    summary.write_text('[{"num_factura": "ñ1"}]', encoding="utf-8")
+    assert service.read_summary_file(str(summary)) == [{"num_factura": "ñ1"}]
+    
+    assert service.read_summary_file(str(temp_dir / "missing.json")) == []
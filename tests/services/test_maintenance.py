@@ -0,0 +1,42 @@
+"""
+Tests para los servicios de mantenimiento.
+"""
+import pytest
+
+# maintenance consulta la plantilla remota con requests
+pytest.importorskip("requests")
+
+from app.services import maintenance
+
+
+@pytest.mark.unit
+def test_check_writable_probes_and_removes_file(temp_dir, monkeypatch):
+    """Test de que la comprobación crea y borra un fichero aunque os.access diga que sí."""
+    monkeypatch.setattr(maintenance.os, "access", lambda *args, **kwargs: True)
+    
+    maintenance._check_writable(temp_dir, ".write_test")
+    
+    assert list(temp_dir.iterdir()) == []
+    with pytest.raises(OSError):
+        maintenance._check_writable(temp_dir / "no_existe", ".write_test")
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_create_backup_uses_current_paths(file_db_path, temp_dir, monkeypatch):
+    """Test de que el backup copia la base de datos y users.json configurados al llamar."""
+    import zipfile
+    
+    from app.core import resources
+    from app.services.database import init_database
+    
+    init_database()
+    users_path = temp_dir / "users.json"
+    users_path.write_text("{}", encoding="utf-8")
+    monkeypatch.setattr(resources, "USERS_PATH", str(users_path))
+    
+    archive = maintenance.create_backup(temp_dir / "backups")
+    
+    with zipfile.ZipFile(archive) as zf:
+        assert sorted(zf.namelist()) == ["factunabo_history.db", "manifest.sha256", "users.json"]
+        assert zf.read("users.json") == b"{}"
@@ -0,0 +1,95 @@
+"""
+Tests para el servicio de cola offline.
+"""
+import pytest
+
+from app.services.database import init_database, fetch_one
+from app.services.offline_service import OfflineQueueService
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_mark_as_failed_increments_until_max_retries(mock_db_path):
+    """Test de reintentos: PENDIENTE hasta alcanzar max_retries, luego FALLIDO."""
+    init_database()
+    service = OfflineQueueService()
+    queue_id = service.add_to_queue(b"<xml/>", "25001", "Company A", "2025", "B12345678", "key")
+    
+    service.mark_as_failed(queue_id, "timeout", max_retries=2)
+    assert fetch_one("SELECT intentos, estado FROM offline_queue WHERE id = ?", (queue_id,)) == (1, "PENDIENTE")
+    
+    service.mark_as_failed(queue_id, "timeout", max_retries=2)
+    assert fetch_one("SELECT intentos, estado FROM offline_queue WHERE id = ?", (queue_id,)) == (2, "FALLIDO")
+    
+    # Un id inexistente no falla
+    service.mark_as_failed(9999, "timeout")
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_add_many_and_mark_many_as_sent(mock_db_path):
+    """Test de alta y marcado en bloque."""
+    init_database()
+    service = OfflineQueueService()
+    
+    added = service.add_many_to_queue(
+        (b"<xml/>", f"2500{i}", "Company A", "2025", "B12345678", "key") for i in range(3)
+    )
+    assert added == 3
+    assert service.get_total_pending() == 3
+    
+    ids = [item.id for item in service.get_pending_items()]
+    service.mark_many_as_sent(ids[:2])
+    
+    assert service.get_queue_stats() == {"ENVIADO": 2, "PENDIENTE": 1}
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_clear_sent_items_returns_deleted_count(mock_db_path):
+    """Test de borrado de enviados devolviendo cuántos se eliminaron."""
+    init_database()
+    service = OfflineQueueService()
+    service.add_many_to_queue(
+        (b"<xml/>", f"2500{i}", "Company A", "2025", "B12345678", "key") for i in range(3)
+    )
+    service.mark_many_as_sent(item.id for item in service.get_pending_items(limit=2))
+    
+    assert service.clear_sent_items() == 2
+    assert service.clear_sent_items() == 0
+    assert service.get_total_pending() == 1
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_pending_items_query_uses_partial_index(mock_db_path):
+    """Test de que la consulta de pendientes se resuelve con el índice parcial."""
+    from app.services.database import get_connection
+    
+    init_database()
+    with get_connection() as conn:
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM offline_queue "
+            "WHERE estado = 'PENDIENTE' ORDER BY fecha_creacion ASC LIMIT 50"
+        ).fetchall()
+    
+    details = " ".join(row[-1] for row in plan)
+    assert "idx_queue_pending" in details
+    assert "TEMP B-TREE" not in details
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_get_pending_items_returns_datetimes(mock_db_path):
+    """Test de que las fechas de la cola llegan ya convertidas por SQLite."""
+    from datetime import datetime
+    
+    init_database()
+    service = OfflineQueueService()
+    queue_id = service.add_to_queue(b"<xml/>", "25001", "Company A", "2025", "B12345678", "key")
+    service.mark_as_failed(queue_id, "timeout")
+    
+    item = service.get_pending_items()[0]
+    assert isinstance(item.created_at, datetime)
+    assert isinstance(item.last_attempt, datetime)
+    assert item.attempts == 1
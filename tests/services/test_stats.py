@@ -0,0 +1,31 @@
+"""
+Tests para el servicio de estadísticas del dashboard.
+"""
+import pytest
+from datetime import datetime
+
+from app.services.database import init_database, execute_many
+from app.services.stats import StatsService
+
+
+@pytest.mark.unit
+@pytest.mark.database
+def test_dashboard_stats_counts_current_month(mock_db_path):
+    """Test de totales: éxitos históricos y envíos correctos del mes en curso."""
+    init_database()
+    now = datetime.now()
+    execute_many(
+        "INSERT INTO envios (fecha_envio, estado, importe) VALUES (?, ?, ?)",
+        [
+            (now, "ÉXITO", 10.0),
+            (now, "OK", 5.0),
+            (now, "ERROR", 3.0),
+            (now.replace(year=now.year - 1), "ÉXITO", 1.0),
+        ]
+    )
+    
+    stats = StatsService().get_dashboard_stats(force=True)
+    
+    assert stats.total_success == 2
+    assert stats.month_count == 2
+    assert stats.month_total == 15.0
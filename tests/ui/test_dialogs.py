@@ -0,0 +1,28 @@
+"""
+Tests para los diálogos reutilizables.
+"""
+import json
+
+import pytest
+
+from app.ui import dialogs
+from app.ui.dialogs import _format_json
+
+
+@pytest.mark.ui
+def test_format_json_indents_and_keeps_non_ascii():
+    """Test de formato con indentación de 2 espacios y sin escapar acentos."""
+    raw = json.dumps({"cliente": "Peña", "lineas": [1, 2]}).encode("utf-8")
+    
+    text = _format_json(raw)
+    
+    assert text == json.dumps({"cliente": "Peña", "lineas": [1, 2]}, indent=2, ensure_ascii=False)
+
+
+@pytest.mark.ui
+def test_format_json_large_file_shown_as_is(monkeypatch):
+    """Test de que un JSON mayor que el límite no se reformatea."""
+    monkeypatch.setattr(dialogs, "JSON_REFORMAT_LIMIT", 8)
+    raw = b'{"a": 1, "b": 2}'
+    
+    assert _format_json(raw) == raw.decode("utf-8")
@@ -0,0 +1,134 @@
+"""
+Tests para el modelo de la tabla de historial.
+"""
+import pytest
+from datetime import datetime
+from decimal import Decimal
+
+from PySide6.QtCore import Qt
+
+from app.models.history import HistoryEntry
+from app.ui.history_model import HistoryTableModel
+
+
+def _entry(entry_id: int, invoice_id: str) -> HistoryEntry:
+    return HistoryEntry(
+        id=entry_id,
+        invoice_id=invoice_id,
+        company="Company A",
+        customer="Customer 1",
+        status="OK",
+        send_date=datetime(2025, 1, 1, 12, 0, 0),
+        amount=Decimal("1234.56"),
+    )
+
+
+@pytest.mark.ui
+def test_history_model_dimensions():
+    """Test de filas y columnas del modelo."""
+    model = HistoryTableModel([_entry(1, "25001"), _entry(2, "25002")])
+    
+    assert model.rowCount() == 2
+    assert model.columnCount() == len(HistoryTableModel.HEADERS)
+
+
+@pytest.mark.ui
+def test_history_model_display_data():
+    """Test de los valores mostrados por columna."""
+    model = HistoryTableModel([_entry(1, "25001")])
+    
+    assert model.data(model.index(0, 2)) == "25001"
+    assert model.data(model.index(0, 1)) == "2025-01-01 12:00:00"
+    assert model.data(model.index(0, HistoryTableModel.AMOUNT_COLUMN)) == "1.234,56€"
+    assert model.data(model.index(0, 7)) == ""
+    assert model.data(model.index(0, HistoryTableModel.PDF_COLUMN)) == ""
+    assert model.data(model.index(0, HistoryTableModel.PDF_COLUMN), Qt.ToolTipRole) == "Abrir PDF"
+    assert model.headerData(2, Qt.Horizontal) == "Factura"
+
+
+@pytest.mark.ui
+def test_history_model_set_entries():
+    """Test de sustitución del contenido del modelo."""
+    model = HistoryTableModel([_entry(1, "25001")])
+    model.set_entries([_entry(2, "25002"), _entry(3, "25003"), _entry(4, "25004")])
+    
+    assert model.rowCount() == 3
+    assert model.entry_at(0).invoice_id == "25002"
+    assert model.entry_at(5) is None
+
+
+@pytest.mark.ui
+def test_history_model_fetch_more_pages():
+    """Test de carga incremental por páginas con cursor (fecha, id)."""
+    entries = [_entry(i, f"25{i:03d}") for i in range(5, 0, -1)]
+    calls = []
+    
+    def loader(cursor_date, cursor_id, limit):
+        calls.append((cursor_date, cursor_id, limit))
+        remaining = [e for e in entries if cursor_id is None or e.id < cursor_id]
+        return remaining[:limit]
+    
+    model = HistoryTableModel()
+    model.update_entries(loader(None, None, 2), loader, page_size=2)
+    
+    assert model.rowCount() == 2
+    assert model.canFetchMore()
+    
+    model.fetchMore()
+    model.fetchMore()
+    
+    assert model.rowCount() == 5
+    assert not model.canFetchMore()
+    assert calls[1] == (datetime(2025, 1, 1, 12, 0, 0), 4, 2)
+    assert [model.entry_at(i).id for i in range(5)] == [5, 4, 3, 2, 1]
+
+
+@pytest.mark.ui
+def test_history_model_update_entries_applies_diff():
+    """Test de actualización incremental por id sin reiniciar el modelo."""
+    model = HistoryTableModel([_entry(5, "25005"), _entry(4, "25004"), _entry(3, "25003"), _entry(1, "25001")])
+    events = []
+    model.modelReset.connect(lambda: events.append("reset"))
+    model.rowsRemoved.connect(lambda parent, first, last: events.append(("removed", first, last)))
+    model.rowsInserted.connect(lambda parent, first, last: events.append(("inserted", first, last)))
+    model.dataChanged.connect(lambda top, bottom, roles: events.append(("changed", top.row())))
+    
+    updated = HistoryEntry(
+        id=3,
+        invoice_id="25003",
+        company="Company A",
+        customer="Customer 1",
+        status="ERROR",
+        send_date=datetime(2025, 1, 1, 12, 0, 0),
+        amount=Decimal("1234.56"),
+    )
+    model.update_entries([_entry(6, "25006"), _entry(5, "25005"), updated, _entry(2, "25002"), _entry(1, "25001")])
+    
+    assert [model.entry_at(i).id for i in range(model.rowCount())] == [6, 5, 3, 2, 1]
+    assert model.data(model.index(2, HistoryTableModel.STATUS_COLUMN)) == "ERROR"
+    assert "reset" not in events
+    assert events == [("removed", 1, 1), ("inserted", 0, 0), ("inserted", 3, 3), ("changed", 2)]
+
+
+@pytest.mark.ui
+def test_history_model_update_entries_diffs_first_page():
+    """Test de que recargar la primera página aplica diferencias sin reiniciar el modelo."""
+    entries = [_entry(i, f"25{i:03d}") for i in range(5, 0, -1)]
+    
+    def loader(cursor_date, cursor_id, limit):
+        return [e for e in entries if cursor_id is None or e.id < cursor_id][:limit]
+    
+    model = HistoryTableModel()
+    model.update_entries(loader(None, None, 2), loader, page_size=2)
+    model.fetchMore()
+    events = []
+    model.modelReset.connect(lambda: events.append("reset"))
+    model.rowsRemoved.connect(lambda parent, first, last: events.append(("removed", first, last)))
+    model.rowsInserted.connect(lambda parent, first, last: events.append(("inserted", first, last)))
+    
+    entries.insert(0, _entry(6, "25006"))
+    model.update_entries(loader(None, None, 2), loader, page_size=2)
+    
+    assert [model.entry_at(i).id for i in range(model.rowCount())] == [6, 5]
+    assert events == [("removed", 1, 3), ("inserted", 0, 0)]
+    assert model.canFetchMore()
@@ -0,0 +1,211 @@
+"""
+Tests de la ventana principal sobre sus widgets reales.
+"""
+import pytest
+
+from PySide6.QtCore import QThreadPool, Qt
+
+# main importa el worker de envío, que necesita selenium
+main = pytest.importorskip("main")
+
+
+@pytest.fixture
+def window(qapp, mock_db_path, monkeypatch):
+    """Ventana principal sobre una base de datos temporal."""
+    monkeypatch.setattr(main, "detect_available_browser", lambda: ("chrome", ""))
+    # La ventana aplica fuente y hoja de estilos a toda la aplicación
+    font, style_sheet = qapp.font(), qapp.styleSheet()
+    win = main.MainWindow()
+    # La carga inicial del historial no debe llegar en mitad del test
+    QThreadPool.globalInstance().waitForDone()
+    qapp.processEvents()
+    yield win
+    QThreadPool.globalInstance().waitForDone()
+    win.close()
+    win.deleteLater()
+    qapp.setStyleSheet(style_sheet)
+    qapp.setFont(font)
+
+
+def _wait_history(qapp):
+    QThreadPool.globalInstance().waitForDone()
+    qapp.processEvents()
+
+
+def _column(table, column):
+    model = table.model()
+    return [model.index(row, column).data() for row in range(model.rowCount())]
+
+
+@pytest.mark.ui
+@pytest.mark.database
+def test_load_history_fills_history_table(qapp, window):
+    """Test de que la carga en segundo plano rellena la tabla de historial visible."""
+    from app.services.database import execute_many
+    from app.ui.history_model import HistoryTableModel
+    from app.ui.widgets import PdfButtonDelegate, StatusChipDelegate
+    
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, cliente, estado, importe) VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            ("2025-01-01 12:00:00", "25001", "Company A", "Customer 1", "ÉXITO", 100.5),
+            ("2025-01-02 12:00:00", "25002", "Company B", "Customer 2", "ERROR", None),
+        ]
+    )
+    
+    window.load_history()
+    _wait_history(qapp)
+    
+    table = window.table_history
+    assert table.model() is window.ui_logic.history_model
+    assert _column(table, 2) == ["25002", "25001"]
+    assert _column(table, HistoryTableModel.AMOUNT_COLUMN)[1] == main.format_eur(100.5)
+    assert isinstance(table.itemDelegateForColumn(HistoryTableModel.STATUS_COLUMN), StatusChipDelegate)
+    assert isinstance(table.itemDelegateForColumn(HistoryTableModel.PDF_COLUMN), PdfButtonDelegate)
+    assert window.history_filter_empresa.findText("Company B") >= 0
+
+
+@pytest.mark.ui
+@pytest.mark.database
+def test_load_history_applies_window_filters(qapp, window):
+    """Test de que los filtros de la ventana se aplican en la carga de la tabla."""
+    from app.services.database import execute_many
+    
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, cliente, estado) VALUES (?, ?, ?, ?, ?)",
+        [
+            ("2025-01-01 12:00:00", "25001", "Company A", "Customer 1", "ÉXITO"),
+            ("2025-01-02 12:00:00", "25002", "Company B", "Customer 2", "ERROR"),
+        ]
+    )
+    
+    window.history_filter_estado.blockSignals(True)
+    window.history_filter_estado.setCurrentText("ERROR")
+    window.history_filter_estado.blockSignals(False)
+    window.load_history()
+    _wait_history(qapp)
+    
+    assert _column(window.table_history, 2) == ["25002"]
+
+
+@pytest.mark.ui
+@pytest.mark.database
+def test_ui_logic_history_load_reaches_window_table(qapp, window):
+    """Test de que una carga de MainWindowLogic se vuelca en la tabla de la ventana."""
+    from app.services.database import execute_many
+    
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)",
+        [("2025-01-01 12:00:00", "25001", "Company A", "ÉXITO")]
+    )
+    
+    window.ui_logic.load_history_with_filters(None)
+    _wait_history(qapp)
+    
+    assert _column(window.table_history, 2) == ["25001"]
+
+
+@pytest.mark.ui
+@pytest.mark.database
+def test_pdf_column_click_opens_row_pdf(qapp, window, monkeypatch):
+    """Test de que pulsar la celda PDF abre el PDF de esa fila."""
+    from PySide6.QtTest import QTest
+    
+    from app.services.database import execute_many
+    from app.ui.history_model import HistoryTableModel
+    
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, cliente, estado, pdf_url) VALUES (?, ?, ?, ?, ?, ?)",
+        [("2025-01-01 12:00:00", "25001", "Company A", "Customer 1", "ÉXITO", "https://example.com/25001.pdf")]
+    )
+    window.load_history()
+    _wait_history(qapp)
+    opened = []
+    monkeypatch.setattr(window, "_open_invoice_pdf", lambda *args, **kwargs: opened.append((args, kwargs)))
+    
+    table = window.table_history
+    table.resize(1200, 400)
+    table.show()
+    rect = table.visualRect(table.model().index(0, HistoryTableModel.PDF_COLUMN))
+    QTest.mouseClick(table.viewport(), Qt.LeftButton, pos=rect.center())
+    
+    assert opened[0][0] == ("25001", "https://example.com/25001.pdf")
+    assert opened[0][1]["cliente"] == "Customer 1"
+
+
+@pytest.mark.ui
+@pytest.mark.database
+def test_history_table_pages_on_scroll(qapp, window):
+    """Test de que la tabla de la ventana carga el histórico por páginas."""
+    from app.services.database import execute_many
+    
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)",
+        [(f"2025-01-0{i} 12:00:00", f"2500{i}", "Company A", "ÉXITO") for i in range(1, 6)]
+    )
+    window.ui_logic.controller.HISTORY_PAGE_SIZE = 2
+    
+    window.load_history()
+    _wait_history(qapp)
+    model = window.table_history.model()
+    assert model.rowCount() < 5
+    
+    while model.canFetchMore():
+        model.fetchMore()
+    assert _column(window.table_history, 2) == ["25005", "25004", "25003", "25002", "25001"]
+
+
+@pytest.mark.ui
+@pytest.mark.database
+def test_history_reload_keeps_selection(qapp, window):
+    """Test de que recargar el histórico actualiza filas sin reiniciar el modelo ni perder la selección."""
+    from app.services.database import execute_many
+    
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)",
+        [
+            ("2025-01-01 12:00:00", "25001", "Company A", "ÉXITO"),
+            ("2025-01-02 12:00:00", "25002", "Company A", "ÉXITO"),
+        ]
+    )
+    window.load_history()
+    _wait_history(qapp)
+    table = window.table_history
+    table.selectRow(1)
+    resets = []
+    window.ui_logic.history_model.modelReset.connect(lambda: resets.append(True))
+    
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)",
+        [("2025-01-03 12:00:00", "25003", "Company A", "ÉXITO")]
+    )
+    window.load_history()
+    _wait_history(qapp)
+    
+    assert _column(table, 2) == ["25003", "25002", "25001"]
+    assert resets == []
+    assert [index.row() for index in table.selectionModel().selectedRows()] == [2]
+
+
+@pytest.mark.ui
+@pytest.mark.database
+def test_history_pdf_column_shares_one_icon(qapp, window):
+    """Test de que la columna PDF del histórico pinta un único icono compartido, sin widgets por fila."""
+    import os
+    
+    from app.services.database import execute_many
+    from app.ui.history_model import HistoryTableModel
+    
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)",
+        [(f"2025-01-0{i} 12:00:00", f"2500{i}", "Company A", "ÉXITO") for i in range(1, 4)]
+    )
+    window.load_history()
+    _wait_history(qapp)
+    
+    table = window.table_history
+    model = table.model()
+    column = HistoryTableModel.PDF_COLUMN
+    assert all(table.indexWidget(model.index(row, column)) is None for row in range(model.rowCount()))
+    delegate = table.itemDelegateForColumn(column)
+    assert delegate.icon is main._load_svg_icon(os.path.join(main.RESOURCE_DIR, "ver.pdf.svg"))
@@ -0,0 +1,213 @@
+"""
+Tests para los auxiliares de la lógica de la ventana principal.
+"""
+import pytest
+
+from PySide6.QtWidgets import QComboBox
+
+from app.ui.main_window_logic import _sync_combo_items
+
+
+def _items(combo):
+    return [combo.itemText(i) for i in range(combo.count())]
+
+
+@pytest.mark.ui
+def test_sync_combo_items_applies_diff_and_keeps_selection(qapp):
+    """Test de actualización incremental sin señales si la selección se mantiene."""
+    combo = QComboBox()
+    combo.addItems(["Todas", "A", "B", "D"])
+    combo.setCurrentIndex(2)
+    changes = []
+    combo.currentTextChanged.connect(changes.append)
+    
+    _sync_combo_items(combo, "Todas", ["B", "C", "D", "E"])
+    
+    assert _items(combo) == ["Todas", "B", "C", "D", "E"]
+    assert combo.currentText() == "B"
+    assert changes == []
+
+
+@pytest.mark.ui
+def test_sync_combo_items_removed_selection_falls_back_to_sentinel(qapp):
+    """Test de vuelta al centinela, con señal, si la selección desaparece."""
+    combo = QComboBox()
+    combo.addItems(["Todos", "A", "B"])
+    combo.setCurrentIndex(1)
+    changes = []
+    combo.currentTextChanged.connect(changes.append)
+    
+    _sync_combo_items(combo, "Todos", ["B"])
+    
+    assert _items(combo) == ["Todos", "B"]
+    assert changes == ["Todos"]
+
+
+@pytest.mark.ui
+@pytest.mark.database
+def test_populate_filter_combos_skips_until_history_changes(qapp, mock_db_path):
+    """Test de que los combos solo se recalculan tras una escritura en el historial."""
+    from types import SimpleNamespace
+    
+    from app.services.database import init_database
+    from app.ui.main_window_logic import MainWindowLogic
+    
+    init_database()
+    ui = SimpleNamespace(combo_filter_company=QComboBox(), combo_filter_customer=QComboBox())
+    logic = MainWindowLogic(ui)
+    calls = []
+    logic.controller.get_companies_list = lambda: calls.append("e") or ["A"]
+    logic.controller.get_customers_list = lambda: ["X"]
+    
+    logic.populate_filter_combos()
+    logic.populate_filter_combos()
+    assert calls == ["e"]
+    assert _items(ui.combo_filter_company) == ["Todas", "A"]
+    
+    logic.invalidate_stats_cache()
+    logic.populate_filter_combos()
+    assert calls == ["e", "e"]
+
+
+@pytest.mark.ui
+@pytest.mark.database
+def test_dashboard_period_days_read_from_item_data(qapp, mock_db_path):
+    """Test de que los días del periodo se guardan como dato de cada elemento del combo."""
+    from types import SimpleNamespace
+    
+    from app.services.database import init_database
+    from app.ui.main_window_logic import MainWindowLogic
+    
+    init_database()
+    prefilled = QComboBox()
+    prefilled.addItems(["Todo", "Últimos 7 días", "Últimos 30 días"])
+    prefilled.setCurrentIndex(1)
+    ui = SimpleNamespace(combo_dashboard_period=prefilled)
+    logic = MainWindowLogic(ui)
+    
+    logic.setup_connections()
+    
+    assert [(prefilled.itemText(i), prefilled.itemData(i)) for i in range(prefilled.count())] == list(
+        MainWindowLogic.DASHBOARD_PERIODS
+    )
+    assert prefilled.currentData() == 7
+    assert logic._dashboard_filters() == (None, 7)
+    
+    empty = QComboBox()
+    logic._setup_dashboard_periods(empty)
+    assert [(empty.itemText(i), empty.itemData(i)) for i in range(empty.count())] == list(
+        MainWindowLogic.DASHBOARD_PERIODS
+    )
+
+
+@pytest.mark.ui
+@pytest.mark.database
+def test_load_history_runs_off_gui_thread_and_drops_stale_results(qapp, mock_db_path):
+    """Test de carga en segundo plano aplicando solo el resultado de la última petición."""
+    import threading
+    from types import SimpleNamespace
+    
+    from PySide6.QtCore import QThreadPool
+    
+    from app.services.database import init_database
+    from app.ui.main_window_logic import MainWindowLogic
+    
+    init_database()
+    logic = MainWindowLogic(SimpleNamespace())
+    threads = []
+    
+    def load(filters):
+        threads.append(threading.current_thread())
+        return [] if filters is None else [SimpleNamespace(id=1)]
+    
+    logic.controller.load_history = load
+    applied = []
+    logic._populate_history_table = applied.append
+    
+    logic.load_history_with_filters(object())
+    logic.load_history_with_filters(None)
+    QThreadPool.globalInstance().waitForDone()
+    qapp.processEvents()
+    
+    assert all(thread is not threading.main_thread() for thread in threads)
+    assert applied == [[]]
+
+
+@pytest.mark.ui
+@pytest.mark.database
+def test_paged_history_first_page_loads_off_gui_thread(qapp, mock_db_path):
+    """Test de que la vista paginada pide la primera página en segundo plano y el resto al desplazarse."""
+    import threading
+    from types import SimpleNamespace
+    
+    from PySide6.QtCore import QThreadPool
+    from PySide6.QtWidgets import QTableView
+    
+    from app.services.database import execute_many, init_database
+    from app.ui.history_model import HistoryTableModel
+    from app.ui.main_window_logic import MainWindowLogic
+    
+    init_database()
+    execute_many(
+        "INSERT INTO envios (fecha_envio, num_factura, empresa, estado) VALUES (?, ?, ?, ?)",
+        [(f"2025-01-0{i} 12:00:00", f"2500{i}", "Company A", "ÉXITO") for i in range(1, 6)]
+    )
+    view = QTableView()
+    view.setModel(HistoryTableModel())
+    logic = MainWindowLogic(SimpleNamespace(table_history=view))
+    logic.setup_connections()
+    logic.controller.HISTORY_PAGE_SIZE = 2
+    threads = []
+    load_page = logic.controller.load_history_page
+    
+    def record_page(*args):
+        threads.append(threading.current_thread())
+        return load_page(*args)
+    
+    logic.controller.load_history_page = record_page
+    
+    logic.load_history_with_filters(None)
+    assert logic.history_model.rowCount() == 0
+    QThreadPool.globalInstance().waitForDone()
+    qapp.processEvents()
+    
+    model = logic.history_model
+    assert threads[0] is not threading.main_thread()
+    # La vista puede pedir ya la página siguiente si caben más filas a la vista
+    assert model.rowCount() in (2, 4)
+    while model.canFetchMore():
+        model.fetchMore()
+    assert len(threads) == 3
+    assert [model.entry_at(i).invoice_id for i in range(model.rowCount())] == [
+        "25005", "25004", "25003", "25002", "25001"
+    ]
+
+
+@pytest.mark.ui
+def test_populate_history_table_uses_view_model(qapp):
+    """Test de que la lógica rellena el modelo que ya trae la vista de la ventana."""
+    from types import SimpleNamespace
+    from datetime import datetime
+    from decimal import Decimal
+    
+    from PySide6.QtWidgets import QTableView
+    
+    from app.models.history import HistoryEntry
+    from app.ui.history_model import HistoryTableModel
+    from app.ui.main_window_logic import MainWindowLogic
+    
+    view = QTableView()
+    view_model = HistoryTableModel()
+    view.setModel(view_model)
+    updated = []
+    ui = SimpleNamespace(table_history=view, _history_table_updated=updated.append)
+    logic = MainWindowLogic(ui)
+    logic.setup_connections()
+    entries = [HistoryEntry(1, "25001", "A", "X", "ÉXITO", datetime(2025, 1, 1), Decimal("1"))]
+    
+    logic._populate_history_table(entries)
+    
+    assert logic.history_model is view_model
+    assert view.model() is view_model
+    assert view_model.entry_at(0) == entries[0]
+    assert updated == [entries]
@@ -0,0 +1,221 @@
+"""
+Tests para el asistente de facturas rectificativas.
+"""
+import pandas as pd
+import pytest
+
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QLabel
+
+from app.ui.rectificativa_dialog import RectificativaDialog
+
+
+def _facturas():
+    return pd.DataFrame({
+        "NumFactura": ["F-001", "F-002"],
+        "cliente_nombre": ["Peña S.L.", "Acme"],
+        "fecha_emision": ["2024-01-10", "2024-02-20"],
+        "total_ah": [121.0, 60.5],
+    })
+
+
+@pytest.mark.ui
+def test_factura_info_shown_as_plain_text(qapp):
+    """Test de que la ficha de la factura muestra sus datos como texto plano."""
+    dialog = RectificativaDialog(None, _facturas())
+    dialog._ensure_page(1)
+    
+    # La factura más reciente queda en la primera fila
+    dialog.combo_factura.setCurrentIndex(0)
+    dialog._flush_factura_change()
+    
+    assert dialog._info_num.text() == "F-002"
+    assert dialog._info_cli.text() == "Acme"
+    assert dialog._info_total.text() == "60.5 €"
+    assert dialog._info_num.textFormat() == Qt.PlainText
+    
+    dialog.combo_factura.setCurrentIndex(1)
+    dialog._flush_factura_change()
+    
+    assert dialog._info_cli.text() == "Peña S.L."
+    assert dialog.factura_seleccionada["NumFactura"] == "F-001"
+
+
+@pytest.mark.ui
+def test_facturas_rows_fill_missing_columns(qapp):
+    """Test de que las columnas ausentes toman su valor por defecto."""
+    dialog = RectificativaDialog(None, pd.DataFrame({"NumFactura": ["F-001"]}))
+    dialog._ensure_page(1)
+    
+    factura = dialog._facturas_rows[0]
+    
+    assert (factura.NumFactura, factura.cliente_nombre, factura.total_ah) == ("F-001", "", 0)
+    assert dialog._facturas_list == ["F-001 -  ()"]
+    assert dialog.factura_seleccionada is None
+
+
+@pytest.mark.ui
+def test_pages_built_on_first_visit(qapp):
+    """Test de que las páginas se construyen al avanzar hasta ellas."""
+    dialog = RectificativaDialog(None, _facturas())
+    
+    assert dialog._pages_built == [True, False, False, False]
+    assert not hasattr(dialog, "combo_factura")
+    
+    dialog.combo_motivo.setCurrentIndex(1)
+    dialog._go_next()
+    
+    assert dialog._pages_built == [True, True, False, False]
+    assert dialog.stacked_widget.currentWidget() is dialog.page_factura
+    assert dialog.stacked_widget.count() == 4
+    
+    dialog._go_previous()
+    
+    assert dialog.stacked_widget.currentWidget() is dialog.page_motivo
+
+
+@pytest.mark.ui
+def test_factura_completer_installed_after_page_shows(qapp):
+    """Test de que el autocompletado se monta en la siguiente vuelta del bucle de eventos."""
+    dialog = RectificativaDialog(None, _facturas())
+    dialog._ensure_page(1)
+    
+    assert dialog.combo_factura.count() == 2
+    
+    qapp.processEvents()
+    
+    completer = dialog.combo_factura.completer()
+    assert completer.model().stringList() == sorted(dialog._facturas_list, key=str.casefold)
+    assert completer.maxVisibleItems() == RectificativaDialog.COMPLETER_VISIBLE_ITEMS
+    assert completer.popup().uniformItemSizes()
+
+
+@pytest.mark.ui
+def test_motivo_explanation_not_reset_when_unchanged(qapp, monkeypatch):
+    """Test de que volver a emitir el mismo motivo no rehace la explicación."""
+    dialog = RectificativaDialog(None, _facturas())
+    dialog.combo_motivo.setCurrentIndex(1)
+    calls = []
+    monkeypatch.setattr(dialog.text_explicacion, "setText", calls.append)
+    
+    dialog._on_motivo_changed(1)
+    
+    assert calls == []
+    assert "(R1)" in dialog.text_explicacion.text()
+
+
+@pytest.mark.ui
+def test_step_fonts_shared_between_dialogs(qapp):
+    """Test de que las fuentes de los títulos se crean una sola vez por proceso."""
+    first = RectificativaDialog(None, _facturas())
+    step_font = RectificativaDialog._STEP_FONT
+    second = RectificativaDialog(None, _facturas())
+    second._ensure_page(1)
+    
+    assert RectificativaDialog._STEP_FONT is step_font
+    assert step_font.bold() and step_font.pointSize() == 12
+    assert first.page_motivo.findChild(QLabel).font() == step_font
+    assert second.page_factura.findChild(QLabel).font() == step_font
+
+
+@pytest.mark.ui
+def test_facturas_sorted_by_date_without_empty_rows(qapp):
+    """Test de que el histórico se ordena por fecha descendente y sin filas vacías."""
+    facturas = pd.DataFrame({
+        "NumFactura": ["F-001", None, "F-003", "F-002"],
+        "fecha_emision": ["2024-01-10", None, "sin fecha", "2024-02-20"],
+    })
+    original = facturas.copy()
+    
+    dialog = RectificativaDialog(None, facturas)
+    
+    assert dialog.facturas_disponibles["NumFactura"].tolist() == ["F-002", "F-001", "F-003"]
+    assert list(dialog.facturas_disponibles.index) == [0, 1, 2]
+    assert facturas.equals(original)
+
+
+@pytest.mark.ui
+def test_resumen_regenerated_only_after_changes(qapp, monkeypatch):
+    """Test de que el resumen solo se rehace al volver al último paso tras un cambio."""
+    dialog = RectificativaDialog(None, _facturas())
+    calls = []
+    generate = dialog._generate_resumen
+    monkeypatch.setattr(dialog, "_generate_resumen", lambda: (calls.append(1), generate()))
+    
+    dialog.combo_motivo.setCurrentIndex(1)
+    dialog._go_next()
+    dialog.combo_factura.setCurrentIndex(0)
+    dialog._go_next()
+    dialog._go_next()
+    
+    assert calls == [1]
+    assert dialog.datos_rectificativa["factura_rectificativa_tipo"] == "I"
+    
+    dialog._go_previous()
+    dialog._go_next()
+    
+    assert calls == [1]
+    
+    dialog._go_previous()
+    dialog.radio_sustitucion.setChecked(True)
+    dialog._go_next()
+    
+    assert calls == [1, 1]
+    assert dialog.datos_rectificativa["factura_rectificativa_tipo"] == "S"
+
+
+@pytest.mark.ui
+def test_reset_reuses_pages_for_same_history(qapp):
+    """Test de que reiniciar con el mismo histórico conserva el combo y limpia la selección."""
+    facturas = _facturas()
+    dialog = RectificativaDialog(None, facturas)
+    dialog.combo_motivo.setCurrentIndex(1)
+    dialog._go_next()
+    combo = dialog.combo_factura
+    dialog.combo_factura.setCurrentIndex(0)
+    dialog._go_next()
+    
+    dialog.reset(facturas)
+    
+    assert dialog.stacked_widget.currentIndex() == 0
+    assert dialog.combo_motivo.currentIndex() == 0
+    assert dialog.combo_factura is combo
+    assert dialog.combo_factura.currentIndex() == -1
+    assert dialog.factura_seleccionada is None
+    assert dialog.datos_rectificativa == {}
+
+
+@pytest.mark.ui
+def test_reset_rebuilds_factura_page_for_new_history(qapp):
+    """Test de que un histórico distinto vuelve a construir la página de factura."""
+    dialog = RectificativaDialog(None, _facturas())
+    dialog._ensure_page(1)
+    
+    dialog.reset(pd.DataFrame({"NumFactura": ["F-009"], "fecha_emision": ["2024-05-01"]}))
+    
+    assert dialog._pages_built[1] is False
+    
+    dialog._ensure_page(1)
+    
+    assert dialog._facturas_list == ["F-009 -  (2024-05-01)"]
+    assert dialog.combo_factura.count() == 1
+
+
+@pytest.mark.ui
+def test_filter_facturas_keeps_typed_text_and_rows(qapp):
+    """Test de que el filtro deja las coincidencias con su fila y conserva lo escrito."""
+    dialog = RectificativaDialog(None, _facturas())
+    dialog._ensure_page(1)
+    line_edit = dialog.combo_factura.lineEdit()
+    line_edit.setText("peña")
+    
+    dialog._filter_facturas()
+    
+    assert dialog._factura_model.stringList() == ["F-001 - Peña S.L. (2024-01-10)"]
+    assert dialog._combo_rows == [1]
+    assert line_edit.text() == "peña"
+    
+    dialog.combo_factura.setCurrentIndex(0)
+    dialog._flush_factura_change()
+    
+    assert dialog.factura_seleccionada["NumFactura"] == "F-001"
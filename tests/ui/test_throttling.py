@@ -0,0 +1,32 @@
+"""
+Tests para la limitación de frecuencia de manejadores de la interfaz.
+"""
+import pytest
+
+from PySide6.QtTest import QTest
+
+from app.ui.throttling import throttled
+
+
+class _Counter:
+    def __init__(self):
+        self.calls = []
+
+    @throttled(50)
+    def refresh(self, value):
+        self.calls.append(value)
+
+
+@pytest.mark.ui
+def test_throttled_runs_first_call_and_one_trailing_call(qapp):
+    """Test de ejecución inmediata y una sola ejecución diferida con los últimos argumentos."""
+    counter = _Counter()
+    
+    for value in range(5):
+        counter.refresh(value)
+    
+    assert counter.calls == [0]
+    
+    QTest.qWait(120)
+    
+    assert counter.calls == [0, 4]
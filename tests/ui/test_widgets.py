@@ -0,0 +1,198 @@
+"""
+Tests para los widgets reutilizables.
+"""
+import pytest
+
+from PySide6.QtCore import QSortFilterProxyModel
+from PySide6.QtGui import QPalette, QStandardItem, QStandardItemModel
+from PySide6.QtWidgets import QDialog, QLabel, QMainWindow, QPushButton, QTableView, QTableWidget, QTableWidgetItem, QVBoxLayout, QWidget
+
+from app.ui.widgets import AnimatedButton, StatusChipDelegate, StepperWidget, TableTools
+
+
+def _window_with_tools(rows):
+    window = QMainWindow()
+    central = QWidget()
+    layout = QVBoxLayout(central)
+    table = QTableWidget(len(rows), 2)
+    for r, values in enumerate(rows):
+        for c, value in enumerate(values):
+            table.setItem(r, c, QTableWidgetItem(value))
+    tools = TableTools(table)
+    layout.addWidget(tools)
+    layout.addWidget(table)
+    layout.addWidget(QPushButton("Enviar"))
+    window.setCentralWidget(central)
+    return window, tools, table
+
+
+@pytest.mark.ui
+def test_toggle_density_repolishes_only_window_widgets(qapp, monkeypatch):
+    """Test de que la densidad solo repule widgets de la ventana afectados por ella."""
+    window, tools, _table = _window_with_tools([("F-001", "Acme")])
+    dialog = QDialog()
+    outside = QPushButton("Fuera", dialog)
+    polished = []
+    style = window.style()
+    monkeypatch.setattr(style, "polish", polished.append, raising=False)
+    
+    tools.compact_toggle.setChecked(True)
+    
+    assert window.property("density") == "compact"
+    assert any(isinstance(w, QPushButton) for w in polished)
+    assert outside not in polished
+    assert tools not in polished
+    assert window.updatesEnabled()
+
+
+@pytest.mark.ui
+def test_apply_filter_waits_for_last_keystroke(qapp):
+    """Test de que el filtro solo recorre la tabla con el último texto escrito."""
+    _window, tools, table = _window_with_tools([("F-001", "Acme"), ("F-002", "Peña")])
+    
+    tools._apply_filter("a")
+    tools._apply_filter("peñ")
+    
+    assert tools._filter_timer.isActive()
+    assert not table.isRowHidden(0)
+    
+    tools._filter_timer.stop()
+    tools._do_filter()
+    
+    assert table.isRowHidden(0)
+    assert not table.isRowHidden(1)
+
+
+@pytest.mark.ui
+def test_filter_view_uses_proxy_model(qapp):
+    """Test de que una vista model/view se filtra con un proxy en lugar de ocultar filas."""
+    source = QStandardItemModel(0, 2)
+    for values in (("F-001", "Acme"), ("F-002", "Peña")):
+        source.appendRow([QStandardItem(value) for value in values])
+    view = QTableView()
+    view.setModel(source)
+    tools = TableTools(view)
+    
+    tools._apply_filter(" PEÑA ")
+    tools._filter_timer.stop()
+    tools._do_filter()
+    
+    proxy = view.model()
+    assert isinstance(proxy, QSortFilterProxyModel)
+    assert proxy.sourceModel() is source
+    assert proxy.rowCount() == 1
+    assert proxy.index(0, 0).data() == "F-002"
+
+
+@pytest.mark.ui
+def test_animated_button_creates_animations_on_first_hover(qapp):
+    """Test de que las animaciones de sombra se crean solo al primer uso."""
+    button = AnimatedButton("Enviar")
+    
+    assert button._anim is None
+    
+    button._animate_hover_in()
+    
+    assert button._anim.easingCurve() == AnimatedButton._EASING
+    assert button._shadow_to == (AnimatedButton._BLUR_HOVER, AnimatedButton._OFFSET_HOVER)
+
+
+@pytest.mark.ui
+def test_animated_button_keeps_running_animation_for_same_target(qapp):
+    """Test de que pedir de nuevo el mismo destino no reinicia la animación en curso."""
+    button = AnimatedButton("Enviar")
+    button._animate_hover_in()
+    button._anim.setCurrentTime(90)
+    
+    button._animate_hover_in()
+    
+    assert button._anim.currentTime() == 90
+    
+    button._animate_hover_out()
+    
+    assert button._anim.currentTime() == 0
+    assert button._shadow_to == (AnimatedButton._BLUR_REST, AnimatedButton._OFFSET_REST)
+
+
+@pytest.mark.ui
+def test_animated_button_shadow_step_interpolates_blur_and_offset(qapp):
+    """Test de que cada paso de la animación ajusta desenfoque y desplazamiento juntos."""
+    button = AnimatedButton("Enviar")
+    button._animate_shadow(AnimatedButton._BLUR_PRESS, AnimatedButton._OFFSET_PRESS)
+    button._anim.stop()
+    
+    button._apply_shadow_step(0.5)
+    
+    assert button._shadow.blurRadius() == pytest.approx(14)
+    assert button._shadow.yOffset() == pytest.approx(3)
+    
+    button._apply_shadow_step(1.0)
+    
+    assert button._shadow.blurRadius() == pytest.approx(AnimatedButton._BLUR_PRESS)
+    assert button._shadow.yOffset() == pytest.approx(AnimatedButton._OFFSET_PRESS)
+
+
+@pytest.mark.ui
+def test_stepper_repolishes_only_changed_states(qapp, monkeypatch):
+    """Test de que avanzar un paso solo repule los círculos y líneas que cambian."""
+    stepper = StepperWidget(["Cargar", "Validar", "Listo"])
+    polished = []
+    monkeypatch.setattr(stepper.style(), "polish", polished.append, raising=False)
+    
+    stepper.set_step(1)
+    
+    assert [c.property("state") for c in stepper.step_circles] == ["completed", "active", "pending"]
+    assert [l.property("state") for l in stepper.step_lines] == ["completed", "pending"]
+    assert set(polished) == {stepper.step_circles[0], stepper.step_circles[1], stepper.step_lines[0]}
+    assert stepper._line_group.animationCount() == 2
+
+
+@pytest.mark.ui
+def test_stepper_sets_text_only_on_completion_changes(qapp, monkeypatch):
+    """Test de que el texto de los círculos solo se reescribe al completar o descompletar un paso."""
+    stepper = StepperWidget(["Cargar", "Validar", "Listo"])
+    stepper.set_step(2)
+    calls = []
+    for circle in stepper.step_circles:
+        monkeypatch.setattr(circle, "setText", lambda text, c=circle: (calls.append(c), QLabel.setText(c, text)))
+    
+    stepper.set_step(1)
+    
+    assert calls == [stepper.step_circles[1]]
+    assert [c.text() for c in stepper.step_circles] == ["✓", "2", "3"]
+
+
+@pytest.mark.ui
+def test_stepper_state_style_applied_on_step_change(qapp):
+    """Test de que el cambio de estado reevalúa los selectores [state=...] de la hoja de estilos."""
+    stepper = StepperWidget(["Cargar", "Validar"])
+    stepper.setStyleSheet('QLabel[state="active"] { color: #ff0000; } QLabel[state="completed"] { color: #0000ff; }')
+    stepper.show()
+    qapp.processEvents()
+    circle = stepper.step_circles[0]
+    
+    assert circle.palette().color(QPalette.WindowText).name() == "#ff0000"
+    
+    stepper.set_step(1)
+    
+    assert circle.palette().color(QPalette.WindowText).name() == "#0000ff"
+
+
+@pytest.mark.ui
+def test_status_chip_delegate_paints_status_color(qapp):
+    """Test de que el delegado pinta la píldora con el color del estado."""
+    source = QStandardItemModel(0, 1)
+    for status in ("ÉXITO", "ERROR"):
+        source.appendRow(QStandardItem(status))
+    view = QTableView()
+    view.setModel(source)
+    view.setItemDelegateForColumn(0, StatusChipDelegate(view))
+    view.resize(300, 200)
+    view.setColumnWidth(0, 200)
+    
+    image = view.viewport().grab().toImage()
+    
+    for row, color in ((0, "#21c55d"), (1, "#ef4444")):
+        rect = view.visualRect(source.index(row, 0))
+        # A la izquierda del texto, dentro de la píldora
+        assert image.pixelColor(rect.center().x() - 30, rect.center().y()).name() == color